@@ -0,0 +1,147 @@
+"""
+Shared tooling for the benchmarks. The benchmarks are not part of the default test suite, run them with
+
+    python -m pytest benchmarks/ -v
+
+The benchmarks marked `large` take several minutes, they are skipped unless `--bench-large` is used.
+
+The per-call timings are printed at the end of the session and saved as json in `benchmarks/results/`, so that the
+results of two versions can be compared with `--bench-compare=benchmarks/results/<file>.json`.
+
+A baseline is committed in `benchmarks/baseline-py<x.y>.json`, to track regressions with
+`--bench-compare=benchmarks/baseline-py3.11.json`. The timings depend on the machine: to get meaningful ratios, create
+a baseline on your own machine first, by running the benchmarks on the reference version with
+`--bench-save=<baseline file>`.
+"""
+import json
+import platform
+import timeit
+from collections import OrderedDict
+from os import makedirs
+from os.path import dirname, exists, join
+
+import pytest
+
+pytest_plugins = ["pytester"]
+
+RESULTS_DIR = join(dirname(__file__), 'results')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', 'pytest-steps benchmarks')
+    group.addoption('--bench-save', default=None,
+                    help="The json file where to save the results. Default: benchmarks/results/<version>-py<x.y>.json")
+    group.addoption('--bench-compare', default=None,
+                    help="A json file saved by a previous run (for example the committed "
+                         "benchmarks/baseline-py<x.y>.json), to compare the results with.")
+    group.addoption('--bench-large', action='store_true', default=False,
+                    help="Also run the benchmarks marked `large`, that take several minutes.")
+
+
+class BenchResults(OrderedDict):
+    """
+    The results of all benchmarks in the session: a dictionary benchmark id -> dict of measures.
+    """
+    def __init__(self, config):
+        OrderedDict.__init__(self)
+        self.config = config
+
+    def default_save_path(self):
+        from pytest_steps import __version__
+        return join(RESULTS_DIR, "%s-py%s.json" % (__version__, '.'.join(platform.python_version_tuple()[:2])))
+
+    def save(self):
+        from pytest_steps import __version__
+        path = self.config.getoption('bench_save') or self.default_save_path()
+        if not exists(dirname(path)):
+            makedirs(dirname(path))
+        with open(path, 'w') as f:
+            json.dump(OrderedDict([('version', __version__),
+                                   ('python', platform.python_version()),
+                                   ('pytest', pytest.__version__),
+                                   ('results', self)]), f, indent=2)
+        return path
+
+    def load_reference(self):
+        path = self.config.getoption('bench_compare')
+        if path is None:
+            return None
+        with open(path) as f:
+            return json.load(f)['results']
+
+
+_BENCH_RESULTS_KEY = '_pytest_steps_bench_results'
+
+
+def pytest_configure(config):
+    reference = config.getoption('bench_compare')
+    if reference is not None and not exists(reference):
+        raise pytest.UsageError("No benchmark baseline found at %r. Create one by running the benchmarks on the "
+                                "reference version with `--bench-save=%s`, or use the committed "
+                                "benchmarks/baseline-py<x.y>.json." % (reference, reference))
+    setattr(config, _BENCH_RESULTS_KEY, BenchResults(config))
+    config.addinivalue_line('markers', "large: a benchmark at a large scale, only run with --bench-large")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('bench_large'):
+        return
+    skip_large = pytest.mark.skip(reason="large benchmark, use --bench-large to run it")
+    for item in items:
+        if item.get_closest_marker('large') is not None:
+            item.add_marker(skip_large)
+
+
+@pytest.fixture
+def bench(request):
+    """
+    Returns a function `bench(func, number=None, **extra_measures)` that measures the time per call of `func` (the
+    best of 5 repeats), records it under the current test id, and returns it in seconds. Additional measures can be
+    recorded with keyword arguments.
+    """
+    results = getattr(request.config, _BENCH_RESULTS_KEY)
+
+    def _bench(func, number=None, **extra_measures):
+        timer = timeit.Timer(func)
+        if number is None:
+            # calibrate so that each repeat lasts at least 0.05s
+            number, _ = timer.autorange() if hasattr(timer, 'autorange') else (1000, None)
+            number = max(1, number // 4)
+        per_call = min(timer.repeat(repeat=5, number=number)) / number
+        record(per_call_s=per_call, **extra_measures)
+        return per_call
+
+    def record(**measures):
+        results.setdefault(request.node.nodeid.split('::', 1)[-1], OrderedDict()).update(measures)
+
+    _bench.record = record
+    return _bench
+
+
+def pytest_terminal_summary(terminalreporter):
+    results = getattr(terminalreporter.config, _BENCH_RESULTS_KEY, None)
+    if not results:
+        return
+    reference = results.load_reference()
+
+    terminalreporter.write_sep('=', 'pytest-steps benchmarks')
+    for bench_id, measures in results.items():
+        line = "%-90s %s" % (bench_id, ', '.join("%s=%s" % (k, _fmt(k, v)) for k, v in measures.items()))
+        if reference is not None and 'per_call_s' in measures:
+            ref = reference.get(bench_id, {}).get('per_call_s')
+            if ref:
+                line += "  (x%.2f vs reference)" % (measures['per_call_s'] / ref)
+            else:
+                line += "  (not in reference)"
+        terminalreporter.write_line(line)
+    terminalreporter.write_line("results saved to %s" % results.save())
+
+
+def _fmt(name, value):
+    if name.endswith('_s') and isinstance(value, float):
+        if abs(value) < 1e-3:
+            return "%.3fus" % (value * 1e6)
+        elif abs(value) < 1:
+            return "%.3fms" % (value * 1e3)
+        return "%.3fs" % value
+    return str(value)
@@ -0,0 +1,119 @@
+"""
+End-to-end benchmarks of the collection of `@test_steps` functions combined with stacked `@pytest.mark.parametrize`,
+as the number of steps and parameters grows.
+
+For each configuration the following measures are recorded:
+
+ - `collect_s` / `peak_mem_mb`: time and peak python memory of a `--collect-only` run on the test module
+ - `baseline_collect_s` / `baseline_peak_mem_mb`: the same for an equivalent module where the steps are parametrized
+   with a plain `@pytest.mark.parametrize`, that is, the cost of pytest's own parametrization
+ - `decoration_s`: the time spent in the `@test_steps` decorator itself (`get_generator_decorator` or
+   `get_parametrize_decorator`), measured outside of pytest
+ - `steps_overhead_s`: `collect_s - baseline_collect_s`, the cost added by pytest-steps to the collection
+
+The configurations at a larger scale (about 200k items) take several minutes, they are only run with `--bench-large`.
+"""
+import gc
+import timeit
+import tracemalloc
+
+import pytest
+
+from pytest_steps import test_steps
+
+
+TEMPLATE = """
+import pytest
+from pytest_steps import test_steps
+
+STEPS = ['step%s' % i for i in range({n_steps})]
+
+
+{decorator}
+@pytest.mark.parametrize('a', range({n_a}))
+@pytest.mark.parametrize('b', range({n_b}))
+def test_foo(a, b{extra_args}):
+{body}
+"""
+
+MODES = {
+    'generator': dict(decorator="@test_steps(*STEPS)", extra_args="",
+                      body="    for _ in STEPS:\n        yield"),
+    'parametrizer': dict(decorator="@test_steps(*STEPS)", extra_args=", test_step",
+                         body="    pass"),
+    'baseline': dict(decorator="@pytest.mark.parametrize('test_step', STEPS)", extra_args=", test_step",
+                     body="    pass"),
+}
+
+
+def _collect(testdir, mode, n_steps, n_a, n_b, repeat=3):
+    """
+    Creates the test module for `mode` and collects it. Returns the number of items, the collection time (best of
+    `repeat` runs) and the peak memory in MB.
+    """
+    testdir.makepyfile(TEMPLATE.format(n_steps=n_steps, n_a=n_a, n_b=n_b, **MODES[mode]))
+
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        start = timeit.default_timer()
+        rec = testdir.inline_run('--collect-only', '-p', 'no:cacheprovider')
+        durations.append(timeit.default_timer() - start)
+    duration = min(durations)
+    n_items = len(rec.getcalls('pytest_collection_finish')[0].session.items)
+
+    # measure memory in a separate run, since tracemalloc slows execution down
+    tracemalloc.start()
+    try:
+        testdir.inline_run('--collect-only', '-p', 'no:cacheprovider')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return n_items, duration, peak / 1e6
+
+
+def _decorate(mode, n_steps, n_a, n_b):
+    """ Returns the time spent in the `@test_steps` decorator only """
+    steps = ['step%s' % i for i in range(n_steps)]
+    if mode == 'generator':
+        def test_foo(a, b):
+            for _ in steps:
+                yield
+    else:
+        def test_foo(a, b, test_step):
+            pass
+    test_foo = pytest.mark.parametrize('a', range(n_a))(pytest.mark.parametrize('b', range(n_b))(test_foo))
+
+    start = timeit.default_timer()
+    test_steps(*steps)(test_foo)
+    return timeit.default_timer() - start
+
+
+def _record_collection(bench, testdir, mode, n_steps, n_a, n_b, repeat=3):
+    """ Collects the test module for `mode` and the baseline module, and records the measures """
+    n_items, collect_s, peak_mem_mb = _collect(testdir, mode, n_steps, n_a, n_b, repeat)
+    _, baseline_collect_s, baseline_peak_mem_mb = _collect(testdir, 'baseline', n_steps, n_a, n_b, repeat)
+    assert n_items == n_steps * n_a * n_b
+
+    bench.record(n_items=n_items,
+                 collect_s=collect_s,
+                 baseline_collect_s=baseline_collect_s,
+                 steps_overhead_s=collect_s - baseline_collect_s,
+                 decoration_s=_decorate(mode, n_steps, n_a, n_b),
+                 peak_mem_mb=round(peak_mem_mb, 1),
+                 baseline_peak_mem_mb=round(baseline_peak_mem_mb, 1))
+
+
+@pytest.mark.parametrize('n_a, n_b', [(10, 10), (30, 30)], ids=['params=100', 'params=900'])
+@pytest.mark.parametrize('n_steps', [5, 20], ids=['steps=5', 'steps=20'])
+@pytest.mark.parametrize('mode', ['generator', 'parametrizer'])
+def test_collection_scaling(bench, testdir, mode, n_steps, n_a, n_b):
+    _record_collection(bench, testdir, mode, n_steps, n_a, n_b)
+
+
+@pytest.mark.large
+@pytest.mark.parametrize('mode', ['generator', 'parametrizer'])
+def test_collection_large(bench, testdir, mode):
+    """ 200k items (20 steps x 10000 parameter combinations), collected once """
+    _record_collection(bench, testdir, mode, 20, 100, 100, repeat=1)
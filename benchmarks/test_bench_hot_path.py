@@ -0,0 +1,202 @@
+"""
+Micro-benchmarks of the code executed by `@test_steps` for each step, across parameter counts and sizes.
+"""
+import numpy as np
+import pytest
+
+from pytest_steps import test_steps
+from pytest_steps.steps import cross_steps_fixture_decorate
+from pytest_steps.steps_common import get_pytest_node_hash_id, get_steps_instance_key, StepsItemInfo, \
+    STEPS_ITEM_INFO_FIELD, STEPS_INSTANCE_KEY_FIELD, finalize_instance, hash_param_value
+from pytest_steps.steps_generator import StepMonitorsContainer, StepsMonitor, GENERATOR_MODE_STEP_ARGNAME, \
+    _OnePerStepFixtureProxy
+
+
+def _test_function():
+    """ The test function that the fake items below represent """
+
+
+class _FakeCallSpec(object):
+    def __init__(self, params):
+        self.params = params
+        self.id = '-'.join(params)
+
+
+class _FakeConfig(object):
+    def getoption(self, name, default=None):
+        return default
+
+
+class _FakeItem(object):
+    """ A minimal stand-in for a pytest item, exposing what the steps machinery uses """
+    session = None
+    config = _FakeConfig()
+    obj = staticmethod(_test_function)
+    function = staticmethod(_test_function)
+
+    def __init__(self, params, with_info):
+        self.callspec = _FakeCallSpec(params)
+        if with_info:
+            # as done by the plugin at collection time: the instance key is computed and stored on the item
+            key = get_steps_instance_key(self, GENERATOR_MODE_STEP_ARGNAME)
+            setattr(self, STEPS_ITEM_INFO_FIELD, StepsItemInfo(GENERATOR_MODE_STEP_ARGNAME, 0, key))
+
+    def forget_instance_key(self):
+        """ Removes the instance key stored on the item, so that the next call has to compute it """
+        self.__dict__.pop(STEPS_INSTANCE_KEY_FIELD, None)
+
+
+def _with_key(item, with_info, func):
+    """
+    Returns a function calling `func`. If the item was not collected, the instance key stored on the item by the
+    previous call is removed first, so that each call computes it like the first step of a test instance would.
+    """
+    if with_info:
+        return func
+
+    def _call():
+        item.forget_instance_key()
+        return func()
+
+    return _call
+
+
+class _FakeRequest(object):
+    def __init__(self, node):
+        self.node = node
+        self.session = node.session
+        self.config = node.config
+
+    def addfinalizer(self, finalizer):
+        pass
+
+
+def make_params(n_params, kind):
+    """ Returns a parameters dictionary with the step parameter and `n_params` other parameters of the given kind """
+    if kind == 'int':
+        value = 1
+    elif kind == 'dict':
+        value = {('key%s' % i): list(range(10)) for i in range(100)}
+    elif kind == 'array':
+        value = np.arange(100000)
+    else:
+        raise ValueError(kind)
+    params = {('p%s' % i): value for i in range(n_params)}
+    params[GENERATOR_MODE_STEP_ARGNAME] = 'step'
+    return params
+
+
+N_PARAMS = [1, 10, 50]
+KINDS = ['int', 'dict', 'array']
+
+
+@pytest.mark.parametrize('kind', KINDS)
+@pytest.mark.parametrize('n_params', N_PARAMS)
+def test_get_pytest_node_hash_id(bench, n_params, kind):
+    """ Computing the step-independent id from scratch (done once per item at collection time) """
+    item = _FakeItem(make_params(n_params, kind), with_info=False)
+    bench(lambda: get_pytest_node_hash_id(item, params_to_ignore=(GENERATOR_MODE_STEP_ARGNAME,)))
+
+
+CONTAINERS = {
+    'flat_dict': {('key%s' % i): i for i in range(1000)},
+    'dict_of_lists': {('key%s' % i): list(range(10)) for i in range(100)},
+    'nested_dicts': {('key%s' % i): {'a': [1, 2, (3, 'x')], 'b': 'str', 'c': 1.5} for i in range(100)},
+}
+
+
+@pytest.mark.parametrize('method', ['default', 'repr'])
+@pytest.mark.parametrize('container', sorted(CONTAINERS))
+def test_hash_container_param(bench, container, method):
+    """ Hashing a container parameter with the default hash functions, compared with hashing its repr """
+    value = CONTAINERS[container]
+    if method == 'default':
+        bench(lambda: hash_param_value(value))
+    else:
+        bench(lambda: hash(repr(value)))
+
+
+@pytest.mark.parametrize('with_info', [True, False], ids=['collected', 'not_collected'])
+def test_get_steps_instance_key(bench, with_info):
+    """ Getting the step-independent id when running a step """
+    item = _FakeItem(make_params(10, 'dict'), with_info=with_info)
+    bench(_with_key(item, with_info, lambda: get_steps_instance_key(item, GENERATOR_MODE_STEP_ARGNAME)))
+
+
+@pytest.mark.parametrize('with_info', [True, False], ids=['collected', 'not_collected'])
+def test_get_execution_monitor(bench, with_info):
+    """ Retrieving the StepsMonitor of an instance in generator mode """
+    def test_gen():
+        while True:
+            yield
+
+    container = StepMonitorsContainer(test_gen, ['step'])
+    item = _FakeItem(make_params(10, 'dict'), with_info=with_info)
+    bench(_with_key(item, with_info, lambda: container.get_execution_monitor(item, (), {})))
+
+
+@pytest.mark.parametrize('n_one_per_step', [0, 10])
+def test_steps_monitor_execute(bench, n_one_per_step):
+    """ Executing one step of a generator, with some `@one_fixture_per_step` fixtures to replace """
+    def test_gen(*args):
+        while True:
+            yield
+
+    first_args = tuple(_OnePerStepFixtureProxy(object()) for _ in range(n_one_per_step))
+    next_args = tuple(_OnePerStepFixtureProxy(object()) for _ in range(n_one_per_step))
+    monitor = StepsMonitor(['step'], test_gen, first_args, {})
+    bench(lambda: monitor.execute('step', next_args, {}))
+
+
+def step_a(steps_data):
+    pass
+
+
+@test_steps(step_a)
+def _test_params_mode(test_step, steps_data):
+    """ A parametrizer-mode test function, so that the `steps_data` fixture is created in this module """
+
+
+def test_results_fixture(bench):
+    """ Getting the StepsDataHolder of an instance in parametrizer mode """
+    # the fixture function created by @test_steps above, unwrapped from pytest.fixture
+    results_fixture = globals()['steps_data'].__pytest_wrapped__.obj
+    request = _FakeRequest(_FakeItem(make_params(10, 'dict'), with_info=True))
+    bench(lambda: results_fixture(request))
+
+
+def test_one_fixture_per_step_proxy_attribute(bench):
+    """ Accessing an attribute of a `@one_fixture_per_step` fixture through its proxy """
+    class Fixture(object):
+        def __init__(self):
+            self.attr = 1
+
+    proxy = _OnePerStepFixtureProxy(Fixture())
+    bench(lambda: proxy.attr)
+
+
+@pytest.mark.parametrize('is_generator', [False, True], ids=['function', 'generator'])
+def test_cross_steps_fixture_hit(bench, is_generator):
+    """ Getting a `@cross_steps_fixture` value that is already cached """
+    if is_generator:
+        def my_fixture():
+            yield object()
+
+        def call(request):
+            gen = fixture(request=request)
+            next(gen)
+    else:
+        def my_fixture():
+            return object()
+
+        def call(request):
+            fixture(request=request)
+
+    fixture = cross_steps_fixture_decorate(my_fixture)
+    item = _FakeItem(make_params(10, 'dict'), with_info=True)
+    request = _FakeRequest(item)
+    call(request)  # the first call creates the cached value
+    try:
+        bench(lambda: call(request))
+    finally:
+        finalize_instance(get_steps_instance_key(item, GENERATOR_MODE_STEP_ARGNAME))
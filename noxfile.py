@@ -161,6 +161,15 @@ def tests(session: PowerSession, coverage, pkg_specs):
         session.run2("genbadge coverage -i %s -o %s" % (Folders.coverage_xml, Folders.coverage_badge))
 
 
+@power_session(python=PY38, logsdir=Folders.runlogs)
+def benchmarks(session: PowerSession):
+    """Run the benchmarks and save the results in benchmarks/results/. Use `-- --bench-compare=<file>` to compare."""
+
+    session.install_reqs(setup=True, install=True, tests=True)
+    session.run2("pip install -e . --no-deps")
+    session.run2("python -m pytest -v benchmarks/ %s" % " ".join(session.posargs))
+
+
 @power_session(python=PY38, logsdir=Folders.runlogs)
 def flake8(session: PowerSession):
     """Launch flake8 qualimetry."""
@@ -5,6 +5,9 @@
 from .steps import test_steps, cross_steps_fixture, CROSS_STEPS_MARK  # noqa
 from .steps_generator import optional_step, one_fixture_per_step  # noqa
 from .steps_parametrizer import StepsDataHolder, depends_on  # noqa
+from .steps_memoize import memoize_step  # noqa
+from .steps_common import register_param_hasher, unregister_param_hasher, hash_by_buffer, hash_by_identity, \
+    step_params  # noqa
 
 try:
     # -- Distribution mode --
@@ -23,6 +26,14 @@ __all__ = [
     'steps',
     'steps_generator',
     'steps_parametrizer',
+    'steps_checkpoint',
+    'steps_memoize',
+    'steps_circuit_breaker',
+    'steps_timing',
+    'steps_profile',
+    'steps_memory',
+    'steps_resources',
+    'steps_trace',
     'steps_harvest',
     'steps_harvest_df_utils',
     # all symbols imported above
@@ -31,9 +42,15 @@ __all__ = [
     'CROSS_STEPS_MARK',
     # -- for tests
     'test_steps',
+    'step_params',
+    'register_param_hasher',
+    'unregister_param_hasher',
+    'hash_by_buffer',
+    'hash_by_identity',
     # ---- specific to parametrizer mode
     'StepsDataHolder',
     'depends_on',
+    'memoize_step',
     # ---- specific to generator mode
     'optional_step',
     'one_fixture_per_step'
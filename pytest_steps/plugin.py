@@ -2,9 +2,537 @@
 #          + All contributors to <https://github.com/smarie/python-pytest-steps>
 #
 # License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+import os
+
 import pytest
 from pytest_steps.steps import cross_steps_fixture
-from pytest_steps.steps_generator import one_fixture_per_step
+from pytest_steps.steps_generator import one_fixture_per_step, monitors_counter, skip_step_before_setup, \
+    GENERATOR_MODE_STEP_ARGNAME, STEPS_FORK_OPTION, short_circuit_step_before_setup as short_circuit_generator_step
+from pytest_steps.steps_parametrizer import HOLDERS_MAXSIZE_OPTION, steps_outcomes, check_dependencies_before_setup, \
+    resume_step_before_setup, save_checkpoint_after_call, get_dependencies_closure, \
+    short_circuit_step_before_setup as short_circuit_parametrizer_step
+from pytest_steps.steps_circuit_breaker import steps_circuit_breaker, MAXFAIL_PER_STEP_OPTION
+from pytest_steps.steps_timing import steps_timer, steps_durations, get_step_timing_report, STEPS_DURATIONS_OPTION
+from pytest_steps.steps_memory import steps_memory_tracker, steps_memory, get_step_memory_report, \
+    STEPS_MEMORY_OPTION, tracemalloc
+from pytest_steps.steps_resources import steps_resources_tracker, steps_resources, get_step_resources_report, \
+    save_step_resources_in_results_bag, STEPS_RESOURCES_OPTION, RESOURCES_FIELDS, resource
+from pytest_steps.steps_profile import steps_profiler, STEPS_PROFILE_OPTION, STEPS_PROFILE_DIR_OPTION, \
+    STEPS_PROFILE_DIR_DEFAULT
+from pytest_steps.steps_trace import steps_trace, get_step_trace_report, STEPS_TRACE_OPTION
+from pytest_steps.steps_checkpoint import steps_checkpoints, CHECKPOINTS_DIR, CHECKPOINT_OPTION, RESUME_OPTION
+from pytest_steps.steps_memoize import steps_memoize_cache, MEMOIZE_DIR, MEMOIZE_MAXSIZE_OPTION, \
+    MEMOIZE_MAXSIZE_DEFAULT, NO_MEMOIZE_OPTION
+from pytest_steps.steps_common import STEPS_FIELD, set_steps_items_info, get_steps_item_info, finalize_instance, \
+    finalize_all_instances, iter_steps_instances_names, order_steps_items, STEPS_ORDERS, add_steps_prerequisites, \
+    select_failed_instances
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('steps', 'pytest-steps')
+    group.addoption('--steps-holders-maxsize', dest=HOLDERS_MAXSIZE_OPTION, type=int, default=None,
+                    help="The maximum number of live StepsDataHolder objects per test function in parametrizer mode. "
+                         "By default there is no limit: a holder is evicted after the last step of its test instance.")
+    group.addoption('--steps-no-xdist-group', dest=NO_XDIST_GROUP_OPTION, action='store_true', default=False,
+                    help="Do not send all steps of a test instance to the same pytest-xdist worker. By default, "
+                         "when step items are collected, `--dist load` is replaced with `--dist loadgroup`, and each "
+                         "test instance is a group.")
+    group.addoption('--steps-order', dest=STEPS_ORDER_OPTION, choices=STEPS_ORDERS, default=None,
+                    help="Reorder the steps of each test function. 'depth-first' runs all steps of a test instance "
+                         "before the next instance, so that only one instance per function is alive at a time. "
+                         "'breadth-first' runs the first step of all instances, then the second step, etc. By "
+                         "default the order is the one created by pytest from the stacked parametrize marks.")
+    group.addoption('--steps-only-selected', dest=ONLY_SELECTED_OPTION, action='store_true', default=False,
+                    help="Do not add the steps needed by the selected steps (for example with -k or a node id). By "
+                         "default the previous steps (generator mode) or the steps that they depend on (explicit "
+                         "mode) of the selected test instances are executed too.")
+    group.addoption('--steps-lf', dest=LAST_FAILED_OPTION, action='store_true', default=False,
+                    help="Steps-aware version of --lf: rerun only the test instances where a step failed in the "
+                         "previous session, from their first step up to the failed step. The other tests are "
+                         "deselected unless they failed.")
+    group.addoption('--steps-lf-all', dest=LAST_FAILED_ALL_OPTION, action='store_true', default=False,
+                    help="Same as --steps-lf, but the steps after the failed step are executed too.")
+    group.addoption('--steps-maxfail-per-step', dest=MAXFAIL_PER_STEP_OPTION, type=int, default=None,
+                    metavar='K',
+                    help="Once a step of a test function has failed in K test instances, skip it in all the "
+                         "remaining test instances before its setup, as well as the steps that depend on it. A "
+                         "summary of the short-circuited steps is displayed at the end of the session.")
+    group.addoption('--steps-durations', dest=STEPS_DURATIONS_OPTION, type=int, default=None, metavar='N',
+                    help="Show the N slowest steps (p50/p95/max wall-clock time of the step body across test "
+                         "instances) and the N slowest test instances (total time of their steps). N=0 for all.")
+    group.addoption('--steps-profile', dest=STEPS_PROFILE_OPTION, action='store_true', default=False,
+                    help="Profile the body of each step with cProfile. The profiles are merged by step across test "
+                         "instances, written as one .pstats file per step, and the top functions of each step are "
+                         "displayed at the end of the session.")
+    group.addoption('--steps-profile-dir', dest=STEPS_PROFILE_DIR_OPTION, default=STEPS_PROFILE_DIR_DEFAULT,
+                    help="The directory where the .pstats files of --steps-profile are written. Default: '%s'."
+                         % STEPS_PROFILE_DIR_DEFAULT)
+    group.addoption('--steps-memory', dest=STEPS_MEMORY_OPTION, action='store_true', default=False,
+                    help="Measure the memory allocated by the body of each step with tracemalloc snapshots, and "
+                         "display the net and peak allocated bytes per step, with the top allocation sites of the "
+                         "worst steps, at the end of the session. This slows down the tests.")
+    group.addoption('--steps-resources', dest=STEPS_RESOURCES_OPTION, action='store_true', default=False,
+                    help="Measure the OS resources used by the body of each step (max RSS, page faults, context "
+                         "switches, and on linux the read and written bytes), display them per step at the end of the "
+                         "session, and store them in the pytest-harvest results bags if it is installed.")
+    group.addoption('--steps-trace', dest=STEPS_TRACE_OPTION, default=None, metavar='PATH',
+                    help="Write a JSON file in the Chrome trace event format, where each test instance is a track and "
+                         "the setup, body and teardown of each step are spans. It can be opened with "
+                         "chrome://tracing or https://ui.perfetto.dev.")
+    group.addoption('--steps-fork', dest=STEPS_FORK_OPTION, action='store_true', default=False,
+                    help="In generator mode, fork the process to create each branch of a step parametrized with "
+                         "`step_params`, so that the common steps run only once. By default the first branch "
+                         "continues the generator, and the common steps are executed again for the next branches.")
+    group.addoption('--steps-checkpoint', dest=CHECKPOINT_OPTION, action='store_true', default=False,
+                    help="In parametrizer mode, save the StepsDataHolder of each test instance in the pytest cache "
+                         "directory after each successful step, so that the instance can be resumed later with "
+                         "--steps-resume.")
+    group.addoption('--steps-resume', dest=RESUME_OPTION, action='store_true', default=False,
+                    help="In parametrizer mode, skip the steps that already passed in a previous session run with "
+                         "--steps-checkpoint (or --steps-resume), and restore the StepsDataHolder of each test "
+                         "instance from its last checkpoint. Implies --steps-checkpoint.")
+    group.addoption('--steps-memoize-maxsize', dest=MEMOIZE_MAXSIZE_OPTION, type=int,
+                    default=MEMOIZE_MAXSIZE_DEFAULT,
+                    help="The maximum size in megabytes of the disk cache of the steps decorated with @memoize_step. "
+                         "When it is exceeded the least recently used entries are removed. Default: %s MB."
+                         % MEMOIZE_MAXSIZE_DEFAULT)
+    group.addoption('--steps-no-memoize', dest=NO_MEMOIZE_OPTION, action='store_true', default=False,
+                    help="Execute the steps decorated with @memoize_step normally, without using their disk cache.")
+
+
+NO_XDIST_GROUP_OPTION = 'steps_no_xdist_group'
+STEPS_ORDER_OPTION = 'steps_order'
+ONLY_SELECTED_OPTION = 'steps_only_selected'
+LAST_FAILED_OPTION = 'steps_lf'
+LAST_FAILED_ALL_OPTION = 'steps_lf_all'
+XDIST_GROUP_WORKERINPUT = 'steps_xdist_group'
+
+
+def pytest_configure(config):
+    if config.getoption(STEPS_FORK_OPTION) and not hasattr(os, 'fork'):
+        raise pytest.UsageError("--steps-fork is not available on this platform: `os.fork` is not supported")
+    use_checkpoints = config.getoption(CHECKPOINT_OPTION) or config.getoption(RESUME_OPTION)
+    if use_checkpoints and getattr(config, 'cache', None) is None:
+        raise pytest.UsageError("--steps-checkpoint and --steps-resume require the pytest cache (cacheprovider plugin)")
+
+    maxfail_per_step = config.getoption(MAXFAIL_PER_STEP_OPTION)
+    if maxfail_per_step is not None and maxfail_per_step < 1:
+        raise pytest.UsageError("--steps-maxfail-per-step should be a positive integer, found %s" % maxfail_per_step)
+
+    if config.getoption(STEPS_MEMORY_OPTION) and tracemalloc is None:
+        raise pytest.UsageError("--steps-memory requires tracemalloc (python 3.4+)")
+    if config.getoption(STEPS_RESOURCES_OPTION) and resource is None:
+        raise pytest.UsageError("--steps-resources requires the `resource` module, that is not available on this "
+                                "platform")
+
+    use_last_failed = config.getoption(LAST_FAILED_OPTION) or config.getoption(LAST_FAILED_ALL_OPTION)
+    if use_last_failed and getattr(config, 'cache', None) is None:
+        raise pytest.UsageError("--steps-lf and --steps-lf-all require the pytest cache (cacheprovider plugin)")
+
+    if hasattr(config, 'workerinput') and config.workerinput.get(XDIST_GROUP_WORKERINPUT, False):
+        # in the xdist workers: tell xdist that the node ids should be suffixed with the groups, as with an explicit
+        # `--dist loadgroup`, so that the controller can group the steps of each test instance.
+        config.option.loadgroup = True
+
+
+def _use_steps_scheduling(config):
+    """
+    Returns True if in the xdist controller, the steps of a test instance should be sent to the same worker in
+    `--dist load` mode, since the generator (generator mode) or the StepsDataHolder (parametrizer mode) live in the
+    worker's memory.
+    """
+    return config.pluginmanager.hasplugin('xdist') and not config.getoption(NO_XDIST_GROUP_OPTION) \
+        and not hasattr(config, 'workerinput') and config.getoption('dist') == 'load'
+
+
+def pytest_report_header(config):
+    if _use_steps_scheduling(config):
+        return "pytest-steps: --dist load will be replaced with --dist loadgroup if step items are collected, so " \
+               "that all steps of a test instance run on the same worker (disable with --steps-no-xdist-group)"
+
+
+@pytest.hookimpl(optionalhook=True, tryfirst=True)
+def pytest_xdist_make_scheduler(config, log):
+    # (xdist hook) in `--dist load` mode, use `--dist loadgroup` once the workers have collected step items
+    if _use_steps_scheduling(config):
+        from pytest_steps.steps_xdist import StepsLoadScheduling
+        return StepsLoadScheduling(config, log)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # (xdist hook) let the workers know that they should suffix the node ids with the groups
+    node.workerinput[XDIST_GROUP_WORKERINPUT] = _use_steps_scheduling(node.config)
+
+
+def pytest_sessionstart(session):
+    # the counter of live vs. evicted generator-mode monitors is session-level
+    monitors_counter.reset()
+    # the registry of steps outcomes used by @depends_on, too
+    steps_outcomes.reset()
+    # the checkpoints of the StepsDataHolders are stored in the pytest cache directory
+    config = session.config
+    resume = config.getoption(RESUME_OPTION)
+    if resume or config.getoption(CHECKPOINT_OPTION):
+        steps_checkpoints.reset(str(config.cache.makedir(CHECKPOINTS_DIR)), resume=resume)
+    else:
+        steps_checkpoints.reset()
+
+    # the failures counted by the circuit breaker, too
+    steps_circuit_breaker.reset(config.getoption(MAXFAIL_PER_STEP_OPTION))
+
+    # the durations of the steps are measured where they run, and received in the reports: the pytest-xdist workers do
+    # not need the registry
+    use_durations = config.getoption(STEPS_DURATIONS_OPTION) is not None
+    steps_timer.reset(enabled=use_durations)
+    steps_durations.reset(enabled=use_durations and not hasattr(config, 'workerinput'))
+
+    # the memory allocated by the steps, too
+    use_memory = config.getoption(STEPS_MEMORY_OPTION)
+    steps_memory_tracker.reset(enabled=use_memory)
+    steps_memory.reset(enabled=use_memory and not hasattr(config, 'workerinput'))
+
+    # the OS resources used by the steps, too
+    use_resources = config.getoption(STEPS_RESOURCES_OPTION)
+    steps_resources_tracker.reset(enabled=use_resources)
+    steps_resources.reset(enabled=use_resources and not hasattr(config, 'workerinput'))
+
+    # the spans of the steps, too
+    trace_path = config.getoption(STEPS_TRACE_OPTION)
+    if trace_path is not None and not hasattr(config, 'workerinput'):
+        steps_trace.reset(os.path.join(str(config.invocation_params.dir) if hasattr(config, 'invocation_params')
+                                       else os.getcwd(), trace_path))
+    else:
+        steps_trace.reset()
+
+    # the profiles of the steps, too
+    if config.getoption(STEPS_PROFILE_OPTION):
+        steps_profiler.reset(os.path.join(str(config.invocation_params.dir) if hasattr(config, 'invocation_params')
+                                          else os.getcwd(), config.getoption(STEPS_PROFILE_DIR_OPTION)))
+    else:
+        steps_profiler.reset()
+
+    # the disk cache of @memoize_step, too
+    if getattr(config, 'cache', None) is not None and not config.getoption(NO_MEMOIZE_OPTION):
+        steps_memoize_cache.reset(str(config.cache.makedir(MEMOIZE_DIR)),
+                                  maxsize=config.getoption(MEMOIZE_MAXSIZE_OPTION) * 1024 * 1024)
+    else:
+        steps_memoize_cache.reset()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_collection_modifyitems(session, config, items):
+    if hasattr(config, 'workerinput') and getattr(config.option, 'loadgroup', False):
+        # in the xdist workers (where xdist sets `dist='no'` and `loadgroup=True`): group the steps of each test
+        # instance, before xdist uses the groups to suffix the node ids.
+        for item, instance_name in iter_steps_instances_names(items):
+            if item.get_closest_marker('xdist_group') is None:
+                item.add_marker(pytest.mark.xdist_group(instance_name))
+    all_items = list(items)
+
+    yield
+
+    # rerun the test instances that failed in the previous session
+    remaining_steps = config.getoption(LAST_FAILED_ALL_OPTION)
+    if config.getoption(LAST_FAILED_OPTION) or remaining_steps:
+        failed_nodeids = config.cache.get("cache/lastfailed", {})
+        if failed_nodeids:
+            selected, deselected = select_failed_instances(items, failed_nodeids, remaining_steps=remaining_steps)
+            if deselected:
+                config.hook.pytest_deselected(items=deselected)
+                items[:] = selected
+
+    # the steps that were not selected (by pytest or another plugin) but that are needed by the selected steps
+    if not config.getoption(ONLY_SELECTED_OPTION) and _may_miss_steps(config, items, all_items):
+        added = add_steps_prerequisites(items, all_items, _get_prerequisites, _collect_function)
+        if added:
+            _fix_added_items(session, config, added)
+
+    # once all other plugins have modified the items (pytest itself reorders them according to the fixtures scopes)
+    steps_order = config.getoption(STEPS_ORDER_OPTION)
+    if steps_order is not None:
+        items[:] = order_steps_items(items, steps_order)
+
+
+def _may_miss_steps(config, items, all_items):
+    """
+    Returns False if all the steps of the test instances are known to be selected: no item was deselected, and no
+    node id with parameters was given in the command line (in which case pytest does not even collect the other
+    steps). This avoids looking for the prerequisites of all steps in most sessions.
+    """
+    selected = set(id(item) for item in items)
+    if any(id(item) not in selected for item in all_items):
+        return True
+    return any('::' in arg and '[' in arg for arg in config.args)
+
+
+def _get_prerequisites(item, step_idx):
+    """ Returns the positions of the steps needed by step `step_idx` of `item` """
+    test_step_argname, _ = getattr(item.function, STEPS_FIELD)
+    if test_step_argname == GENERATOR_MODE_STEP_ARGNAME:
+        # all the previous steps
+        return range(step_idx)
+    else:
+        return get_dependencies_closure(item, step_idx)
+
+
+def _collect_function(item):
+    """ Collects again all the items of the test function of `item`, that may not have been collected """
+    parent = item.parent
+    name = item.originalname
+    res = parent.ihook.pytest_pycollect_makeitem(collector=parent, name=name, obj=getattr(parent.obj, name))
+    if res is None:
+        return []
+    elif isinstance(res, pytest.Item):
+        return [res]
+    else:
+        return list(res)
+
+
+def _fix_added_items(session, config, added):
+    """
+    Makes the items added by `add_steps_prerequisites` look like the other items: they were deselected, or they were
+    not even collected.
+
+    :param session:
+    :param config:
+    :param added: a list of tuples (added item, a selected item of the same test instance)
+    :return:
+    """
+    added_ids = set(id(item) for item, _ in added)
+
+    # the terminal reporter counts them as deselected
+    reporter = config.pluginmanager.get_plugin('terminalreporter')
+    if reporter is not None and 'deselected' in reporter.stats:
+        reporter.stats['deselected'] = [i for i in reporter.stats['deselected'] if id(i) not in added_ids]
+        if not reporter.stats['deselected']:
+            del reporter.stats['deselected']
+
+    # in the xdist workers, the items that were not collected are not in the group of their test instance yet
+    if hasattr(config, 'workerinput') and getattr(config.option, 'loadgroup', False):
+        not_grouped = []
+        for item, sibling in added:
+            if item.get_closest_marker('xdist_group') is None:
+                mark = sibling.get_closest_marker('xdist_group')
+                if mark is not None:
+                    item.add_marker(pytest.mark.xdist_group(*mark.args, **mark.kwargs))
+                    not_grouped.append(item)
+        if not_grouped:
+            from pytest_steps.steps_xdist import add_xdist_group_suffix
+            add_xdist_group_suffix(session, config, not_grouped)
+
+
+def pytest_collection_finish(session):
+    # now that the final list of items is known, identify the test instances and their last step
+    set_steps_items_info(session.items)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    info = get_steps_item_info(item)
+    if info is not None:
+        # skip the steps that can not run before their fixtures are created
+        if info.test_step_argname == GENERATOR_MODE_STEP_ARGNAME:
+            skip_step_before_setup(item, info)
+            if steps_circuit_breaker.enabled:
+                short_circuit_generator_step(item, info)
+        else:
+            if steps_checkpoints.resume:
+                resume_step_before_setup(item, info)
+            check_dependencies_before_setup(item, info)
+            if steps_circuit_breaker.enabled:
+                short_circuit_parametrizer_step(item, info)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    info = get_steps_item_info(item)
+    if info is None:
+        return
+
+    report = outcome.get_result()
+    if item.config.getoption(STEPS_TRACE_OPTION) is not None:
+        # the span of each phase of the step, including the setup and teardown of the fixtures
+        report.steps_trace = get_step_trace_report(item, info, call, report.outcome)
+    if call.when == 'teardown':
+        return
+
+    if call.when == 'call' and steps_timer.enabled:
+        # the duration of the step body, that is sent with the report when pytest-xdist is used
+        report.steps_timing = get_step_timing_report(item, info)
+    if call.when == 'call' and steps_memory_tracker.enabled:
+        # the memory allocated by the step body, too
+        report.steps_memory = get_step_memory_report(item, info)
+    if call.when == 'call' and steps_resources_tracker.enabled:
+        # the OS resources used by the step body, too. They are also stored in the pytest-harvest results bag, if any.
+        report.steps_resources = get_step_resources_report(item, info)
+        if report.steps_resources is not None:
+            save_step_resources_in_results_bag(item, report.steps_resources)
+
+    if report.failed:
+        if steps_circuit_breaker.enabled:
+            # count the failures of each step, in the setup or call phase (not the teardown, see above). This is done
+            # at most once per item.
+            steps_circuit_breaker.record_failure(item, info)
+    elif call.when == 'call' and report.passed and steps_checkpoints.enabled \
+            and info.test_step_argname != GENERATOR_MODE_STEP_ARGNAME:
+        # save the state of the test instance after each successful step
+        save_checkpoint_after_call(item, info)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    info = get_steps_item_info(item)
+    if info is not None and info.is_last:
+        # the last step of this test instance has been torn down: run the instance finalizers (cross-steps fixtures)
+        finalize_instance(info.instance_key)
+
+
+def pytest_sessionfinish(session):
+    # finalize the test instances for which the last step was not executed (for example with -x). This also evicts
+    # the generator-mode monitors that are still alive
+    finalize_all_instances()
+
+    # stop tracemalloc
+    if steps_memory_tracker.enabled:
+        steps_memory_tracker.reset()
+
+    # write the trace of the steps, in the pytest-xdist controller
+    if steps_trace.enabled:
+        steps_trace.dump()
+
+    # write the profiles of the steps: the pytest-xdist controller merges the files written by the workers
+    if steps_profiler.enabled:
+        config = session.config
+        if hasattr(config, 'workerinput'):
+            steps_profiler.dump(suffix='.%s' % config.workerinput['workerid'])
+        elif config.pluginmanager.hasplugin('dsession'):
+            steps_profiler.merge_workers_files()
+        else:
+            steps_profiler.dump()
+
+
+def pytest_runtest_logreport(report):
+    if steps_durations.enabled:
+        timing_report = getattr(report, 'steps_timing', None)
+        if timing_report is not None:
+            steps_durations.add(timing_report)
+    if steps_memory.enabled:
+        memory_report = getattr(report, 'steps_memory', None)
+        if memory_report is not None:
+            steps_memory.add(memory_report)
+    if steps_resources.enabled:
+        resources_report = getattr(report, 'steps_resources', None)
+        if resources_report is not None:
+            steps_resources.add(resources_report)
+    if steps_trace.enabled:
+        trace_report = getattr(report, 'steps_trace', None)
+        if trace_report is not None:
+            steps_trace.add(trace_report)
+
+
+def pytest_terminal_summary(terminalreporter):
+    # the durations of the steps, with --steps-durations
+    if steps_durations.enabled:
+        _write_steps_durations(terminalreporter, terminalreporter.config.getoption(STEPS_DURATIONS_OPTION))
+
+    # the memory allocated by the steps, with --steps-memory
+    if steps_memory.enabled:
+        _write_steps_memory(terminalreporter)
+
+    # the OS resources used by the steps, with --steps-resources
+    if steps_resources.enabled:
+        _write_steps_resources(terminalreporter)
+
+    # the profiles of the steps, with --steps-profile
+    if steps_profiler.enabled:
+        _write_steps_profiles(terminalreporter)
+
+    # the steps short-circuited by --steps-maxfail-per-step
+    summary = list(steps_circuit_breaker.iter_summary())
+    if summary:
+        terminalreporter.write_sep("=", "steps short-circuited (--steps-maxfail-per-step)", yellow=True)
+        for step_name, failures, short_circuited in summary:
+            terminalreporter.write_line("%s: failed in %s test instances, short-circuited in %s test instances"
+                                        % (step_name, failures, short_circuited))
+
+
+def _write_steps_durations(terminalreporter, n):
+    """ Writes the summary of --steps-durations: the n slowest steps and test instances, or all if n is 0 """
+    steps_summary = steps_durations.get_steps_summary()
+    instances_summary = steps_durations.get_instances_summary()
+    if n:
+        steps_summary, instances_summary = steps_summary[:n], instances_summary[:n]
+
+    terminalreporter.write_sep("=", "slowest %ssteps" % ("%s " % n if n else ""))
+    terminalreporter.write_line("%9s %9s %9s %9s %9s %6s  %s" % ('total', 'p50', 'p95', 'max', 'cpu', 'count', 'step'))
+    for step_name, count, total, p50, p95, max_time, cpu_time in steps_summary:
+        terminalreporter.write_line("%8.3fs %8.3fs %8.3fs %8.3fs %8.3fs %6s  %s"
+                                    % (total, p50, p95, max_time, cpu_time, count, step_name))
+
+    terminalreporter.write_sep("=", "slowest %stest instances" % ("%s " % n if n else ""))
+    terminalreporter.write_line("%9s %9s %6s  %s" % ('total', 'cpu', 'steps', 'test instance'))
+    for instance_name, n_steps, total, cpu_time in instances_summary:
+        terminalreporter.write_line("%8.3fs %8.3fs %6s  %s" % (total, cpu_time, n_steps, instance_name))
+
+
+def _write_steps_memory(terminalreporter, top=10, worst=3):
+    """ Writes the summary of --steps-memory: the `top` steps, and the allocation sites of the `worst` ones """
+    summary = steps_memory.get_summary(top_sites=top)
+    terminalreporter.write_sep("=", "steps memory (--steps-memory)")
+    terminalreporter.write_line("%12s %12s %12s %6s  %s" % ('mean net', 'max net', 'max peak', 'count', 'step'))
+    for step_name, count, mean_net, max_net, max_peak, _ in summary[:top]:
+        terminalreporter.write_line("%12s %12s %12s %6s  %s" % (_format_bytes(mean_net), _format_bytes(max_net),
+                                                                _format_bytes(max_peak), count, step_name))
+
+    for step_name, count, _, _, _, sites in summary[:worst]:
+        terminalreporter.write_line("")
+        terminalreporter.write_line("top allocation sites of %s (net bytes across %s test instances):"
+                                    % (step_name, count))
+        for site, size in sites:
+            terminalreporter.write_line("%12s  %s" % (_format_bytes(size), site))
+
+
+def _write_steps_resources(terminalreporter):
+    """ Writes the summary of --steps-resources: the resources used by each step, summed across test instances """
+    terminalreporter.write_sep("=", "steps resources (--steps-resources)")
+    terminalreporter.write_line("%12s %8s %8s %8s %8s %12s %12s %6s  %s"
+                                % ('max rss', 'maj flt', 'min flt', 'vol cs', 'invol cs', 'read', 'written', 'count',
+                                   'step'))
+    for summary in steps_resources.get_summary():
+        step_name, count = summary[:2]
+        values = dict(zip(RESOURCES_FIELDS, summary[2:]))
+        terminalreporter.write_line("%12s %8s %8s %8s %8s %12s %12s %6s  %s"
+                                    % (_format_bytes(values['max_rss']), values['major_faults'],
+                                       values['minor_faults'], values['voluntary_ctx_switches'],
+                                       values['involuntary_ctx_switches'], _format_bytes(values['read_bytes']),
+                                       _format_bytes(values['write_bytes']), count, step_name))
+
+
+def _format_bytes(size):
+    """ Returns a readable string for a number of bytes, possibly negative or None """
+    if size is None:
+        return '?'
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return "%.1f %s" % (size, unit) if unit != 'B' else "%d %s" % (size, unit)
+        size /= 1024.
+    return "%.1f GiB" % size
+
+
+def _write_steps_profiles(terminalreporter, top=10):
+    """ Writes the summary of --steps-profile: the `top` functions of each step, by cumulative time """
+    terminalreporter.write_sep("=", "steps profiles (--steps-profile)")
+    for step_name, path, total_calls, total_time, functions in steps_profiler.iter_summary(top):
+        terminalreporter.write_line("%s: %s function calls in %.3fs, written to %s"
+                                    % (step_name, total_calls, total_time, path))
+        terminalreporter.write_line("%10s %9s %9s  %s" % ('ncalls', 'tottime', 'cumtime', 'function'))
+        for ncalls, tottime, cumtime, description in functions:
+            terminalreporter.write_line("%10s %8.3fs %8.3fs  %s" % (ncalls, tottime, cumtime, description))
+        terminalreporter.write_line("")
+
 
 try:
     from pytest_steps import pivot_steps_on_df, handle_steps_in_results_df
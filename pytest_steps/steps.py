@@ -2,13 +2,14 @@
 #          + All contributors to <https://github.com/smarie/python-pytest-steps>
 #
 # License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+from functools import partial
 from inspect import isgeneratorfunction
 from sys import version_info
 
 from makefun import add_signature_parameters, wraps, with_signature
 
 from .common_mini_six import string_types
-from .steps_common import get_pytest_node_hash_id, get_scope
+from .steps_common import get_pytest_node_hash_id, get_scope, get_steps_item_info, add_instance_finalizer
 from .steps_generator import get_generator_decorator, GENERATOR_MODE_STEP_ARGNAME
 from .steps_parametrizer import get_parametrize_decorator
 
@@ -178,17 +179,25 @@ def cross_steps_fixture_decorate(fixture_fun,
 
     def _init_and_check(request):
         """
-        Checks that the current request is not session but a specific node.
+        Checks that the current request is not session but a specific node, and returns the step-independent id of
+        the test instance, together with a boolean indicating if the instance will be finalized after its last step.
+
         :param request:
         :return:
         """
         scope = get_scope(request)
         if scope == 'function':
             # function-scope: ok
-            id_without_steps = get_pytest_node_hash_id(
-                request.node, params_to_ignore=_get_step_param_names_or_default(step_param_names)
-            )
-            return id_without_steps
+            info = get_steps_item_info(request.node)
+            if info is not None:
+                # test created by @test_steps: the id was computed at collection time, and the last step is known
+                return info.instance_key, True
+            else:
+                # legacy mode (manual parametrization): we do not know which step is the last one
+                id_without_steps = get_pytest_node_hash_id(
+                    request.node, params_to_ignore=_get_step_param_names_or_default(step_param_names)
+                )
+                return id_without_steps, False
         else:
             # session- or module-scope
             raise Exception("The `@cross_steps_fixture` decorator is only useful for function-scope fixtures. `%s`"
@@ -199,7 +208,7 @@ def cross_steps_fixture_decorate(fixture_fun,
         @wraps(fixture_fun, new_sig=new_sig)
         def _steps_aware_decorated_function(*args, **kwargs):
             request = kwargs['request'] if func_needs_request else kwargs.pop('request')
-            id_without_steps = _init_and_check(request)
+            id_without_steps, is_finalized = _init_and_check(request)
             try:
                 # already available: this is a subsequent step.
                 return ref_dct[id_without_steps]
@@ -207,29 +216,58 @@ def cross_steps_fixture_decorate(fixture_fun,
                 # not yet cached, this is probably the first step
                 res = fixture_fun(*args, **kwargs)
                 ref_dct[id_without_steps] = res
+                if is_finalized:
+                    # evict it after the last step
+                    add_instance_finalizer(id_without_steps, partial(ref_dct.pop, id_without_steps, None))
                 return res
     else:
+        def _teardown_and_evict(id_without_steps, gen):
+            del ref_dct[id_without_steps]
+            _teardown_fixture_gen(gen)
+
         @wraps(fixture_fun, new_sig=new_sig)
         def _steps_aware_decorated_function(*args, **kwargs):
             request = kwargs['request'] if func_needs_request else kwargs.pop('request')
-            id_without_steps = _init_and_check(request)
+            id_without_steps, is_finalized = _init_and_check(request)
             try:
                 # already available: this is a subsequent step.
-                yield ref_dct[id_without_steps]
+                res = ref_dct[id_without_steps]
             except KeyError:
                 # not yet cached, this is probably the first step
                 gen = fixture_fun(*args, **kwargs)
                 res = next(gen)
                 ref_dct[id_without_steps] = res
+                if is_finalized:
+                    # teardown and evict it after the last step
+                    add_instance_finalizer(id_without_steps, partial(_teardown_and_evict, id_without_steps, gen))
+                    yield res
+                else:
+                    # we can not know when the last step is: teardown now
+                    yield res
+                    _teardown_fixture_gen(gen)
+            else:
                 yield res
-                # TODO this teardown hook should actually be executed after all steps...
-                next(gen)
 
     # Tag the function as being "cross-step" for future usage
     setattr(_steps_aware_decorated_function, CROSS_STEPS_MARK, True)
     return _steps_aware_decorated_function
 
 
+def _teardown_fixture_gen(gen):
+    """
+    Executes the teardown part of a generator fixture, that is, the code after its `yield`.
+
+    :param gen:
+    :return:
+    """
+    try:
+        next(gen)
+    except StopIteration:
+        pass
+    else:
+        raise ValueError("fixture function has more than one 'yield'")
+
+
 def _get_step_param_names_or_default(step_param_names):
     """
 
@@ -0,0 +1,251 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+from hashlib import sha1
+import os
+import pickle
+import re
+import struct
+from warnings import warn
+
+try:  # python 3+
+    from typing import Optional, Tuple
+except ImportError:
+    pass
+
+from .steps_common import create_pytest_param_str_id, _StepVariant
+
+# pickle protocol 5 (python 3.8+) can serialize large buffers such as numpy arrays out-of-band: they are written to
+# the file directly, without being copied into the pickle stream.
+PICKLE_PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+_OUT_OF_BAND = PICKLE_PROTOCOL >= 5
+
+CHECKPOINTS_DIR = 'steps_checkpoints'
+CHECKPOINT_OPTION = 'steps_checkpoint'
+RESUME_OPTION = 'steps_resume'
+
+# the header of a file written by `dump_file`: its size is stored first on 8 bytes
+_HEADER_SIZE = struct.Struct('<Q')
+
+
+def dump_file(path, header, obj):
+    """
+    Pickles `obj` in a new file `path`, with the large buffers (such as numpy arrays) serialized out-of-band when
+    pickle protocol 5 is available: they are written to the file directly, without being copied in memory. The file is
+    replaced atomically.
+
+    The file contains the size of the header, the header (`header` and the sizes of the next sections), the pickled
+    object, and the buffers.
+
+    :param path: the path of the file
+    :param header: a small picklable object, that can be read without loading `obj`, see `load_file`
+    :param obj: the object to pickle
+    :return: the size of the file
+    """
+    buffers = []
+    if _OUT_OF_BAND:
+        payload = pickle.dumps(obj, PICKLE_PROTOCOL, buffer_callback=buffers.append)
+    else:
+        payload = pickle.dumps(obj, PICKLE_PROTOCOL)
+    raws = [b.raw() for b in buffers]
+    header = pickle.dumps((header, len(payload), [r.nbytes for r in raws]), 2)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER_SIZE.pack(len(header)))
+        f.write(header)
+        f.write(payload)
+        for raw in raws:
+            f.write(raw)
+        size = f.tell()
+    getattr(os, 'replace', os.rename)(tmp_path, path)
+    return size
+
+
+def load_file(path, header_only=False):
+    """
+    Loads a file written by `dump_file`. Each out-of-band buffer is read in its own writable memory, that the unpickled
+    objects use directly.
+
+    :param path: the path of the file
+    :param header_only: if True, only the header is read and the returned object is None
+    :return: a tuple (header, obj)
+    """
+    with open(path, 'rb') as f:
+        header_size, = _HEADER_SIZE.unpack(f.read(_HEADER_SIZE.size))
+        header, payload_size, buffers_sizes = pickle.loads(f.read(header_size))
+        if header_only:
+            return header, None
+
+        payload = f.read(payload_size)
+        buffers = []
+        for size in buffers_sizes:
+            buf = bytearray(size)
+            f.readinto(buf)
+            buffers.append(buf)
+
+    if buffers_sizes:
+        return header, pickle.loads(payload, buffers=buffers)
+    else:
+        return header, pickle.loads(payload)
+
+
+def get_steps_instance_name(item, test_step_argname, branch=()):
+    """
+    Returns a string identifying the test instance (and the branch, if `step_params` is used) of pytest item `item`,
+    that is identical across sessions. As opposed to the instance key, that relies on `hash`, it can be used to store
+    data on disk.
+
+    It is made of the node id of the test function, and of the ids of all parameters except the step. It is therefore
+    stable as long as these ids do not change.
+
+    :param item: the pytest item
+    :param test_step_argname: the name of the test step parameter
+    :param branch: the branch of the test instance when `step_params` is used
+    :return:
+    """
+    function_id = item.nodeid.split('[', 1)[0]
+
+    # Note: the parameter indices are not a good choice, since they do not always represent positions in the lists of
+    # parameters. Instead remove the step id from the ids.
+    step = item.callspec.params[test_step_argname]
+    step_id = step.id if isinstance(step, _StepVariant) else create_pytest_param_str_id(step)
+    ids = getattr(item.callspec, '_idlist', None)
+    if ids is None:
+        # private attribute of pytest, present in all supported versions. Fall back to the ids of the parameter values
+        ids = [create_pytest_param_str_id(v) for argname, v in item.callspec.params.items()
+               if argname != test_step_argname]
+    else:
+        ids = list(ids)
+        if step_id in ids:
+            ids.remove(step_id)
+        else:
+            # the id was made unique by pytest (a step listed several times): it has a numeric suffix
+            deduplicated = re.compile(r"%s_?\d+$" % re.escape(step_id))
+            ids = [i for i in ids if not deduplicated.match(i)]
+
+    name = "%s[%s]" % (function_id, '-'.join(ids))
+    if branch:
+        name += "/%s" % '-'.join(str(i) for i in branch)
+    return name
+
+
+class StepsCheckpoints(object):
+    """
+    The session-level store of the checkpoints of parametrizer-mode test instances, enabled with `--steps-checkpoint`
+    or `--steps-resume`.
+
+    After each successful step, the contents of the `StepsDataHolder` of the test instance are saved in a file of the
+    pytest cache directory, together with the position of the step. With `--steps-resume` the steps up to that position
+    are skipped, and the holder is restored from the file before the first step that runs.
+
+    A checkpoint file contains a header (the step position and the sizes of the sections), the pickled contents of the
+    holder, and the large buffers serialized out-of-band, if any.
+    """
+    __slots__ = ('directory', 'resume', '_steps')
+
+    def __init__(self):
+        self.directory = None
+        self.resume = False
+        # a cache of the position of the last successful step of each instance, read from the files
+        self._steps = dict()
+
+    def reset(self, directory=None, resume=False):
+        """
+        Enables the checkpoints if `directory` is not None, or disables them.
+
+        :param directory: the directory where the checkpoint files are stored
+        :param resume: a boolean indicating if the test instances should be resumed from their checkpoint
+        :return:
+        """
+        self.directory = directory
+        self.resume = resume
+        self._steps.clear()
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def _path(self, name):
+        return os.path.join(self.directory, sha1(name.encode('utf-8')).hexdigest() + '.pkl')
+
+    def save(self, name, position, holder):
+        """
+        Saves the contents of `holder` as the checkpoint of test instance `name`, where the step at `position` is the
+        last successful step. The file is replaced atomically, so that an interrupted save keeps the previous
+        checkpoint.
+
+        :param name: the stable name of the test instance, see `get_steps_instance_name`
+        :param position: the position of the last successful step among the steps of the test instance, see
+            `StepsItemInfo.position`
+        :param holder: the `StepsDataHolder` of the test instance
+        :return:
+        """
+        try:
+            dump_file(self._path(name), (name, position), vars(holder))
+        except Exception as e:
+            warn("The StepsDataHolder of test instance %s could not be checkpointed: %r"
+                 % (name, e))
+            self.discard(name)
+        else:
+            self._steps[name] = position
+
+    def get_step(self, name):
+        # type: (...) -> Optional[int]
+        """
+        Returns the position of the last successful step of test instance `name`, or None if there is no checkpoint or
+        if it can not be read.
+
+        :param name: the stable name of the test instance, see `get_steps_instance_name`
+        :return:
+        """
+        try:
+            return self._steps[name]
+        except KeyError:
+            try:
+                (_, position), _ = load_file(self._path(name), header_only=True)
+            except Exception:
+                # no checkpoint, or a file truncated or written by an incompatible version: ignore it
+                position = None
+            self._steps[name] = position
+            return position
+
+    def load(self, name):
+        # type: (...) -> Optional[Tuple[int, dict]]
+        """
+        Returns a tuple (position, contents) with the position of the last successful step of test instance `name`, and
+        the contents of its `StepsDataHolder`, or None if there is no checkpoint or if it can not be loaded (for example
+        if a class of its contents can not be imported anymore).
+
+        :param name: the stable name of the test instance, see `get_steps_instance_name`
+        :return:
+        """
+        try:
+            (_, position), contents = load_file(self._path(name))
+        except (IOError, OSError):
+            # no checkpoint
+            return None
+        except Exception as e:
+            warn("The checkpoint of test instance %s could not be loaded, it is ignored: %r" % (name, e))
+            self.discard(name)
+            return None
+        return position, contents
+
+    def discard(self, name):
+        """
+        Removes the checkpoint of test instance `name`, if any.
+
+        :param name: the stable name of the test instance, see `get_steps_instance_name`
+        :return:
+        """
+        if self._steps.get(name, -1) is not None:
+            try:
+                os.remove(self._path(name))
+            except (IOError, OSError):
+                pass
+            self._steps[name] = None
+
+
+steps_checkpoints = StepsCheckpoints()
+"""The session-level store of checkpoints of `StepsDataHolder`."""
@@ -0,0 +1,106 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+from .steps_common import get_step_name
+
+MAXFAIL_PER_STEP_OPTION = 'steps_maxfail_per_step'
+
+STEP_FAILURE_RECORDED_FIELD = '_pytest_steps_failure_recorded'
+
+
+class StepsCircuitBreaker(object):
+    """
+    The session-level circuit breaker enabled with `--steps-maxfail-per-step=K`. It counts the failures of each step of
+    each test function, across all test instances. Once a step has failed in `K` test instances, it is "open": the step
+    is short-circuited (skipped before its setup) in all the remaining test instances, as well as the steps that depend
+    on it.
+
+    The steps are identified by the node id of their test function and their position. Note that with pytest-xdist
+    the failures are counted separately in each worker.
+    """
+    __slots__ = ('maxfail', 'failures', 'short_circuited', 'names', 'broken')
+
+    def __init__(self):
+        self.maxfail = None
+        # a dict step key -> number of failures
+        self.failures = dict()
+        # a dict step key -> number of test instances where the step was short-circuited
+        self.short_circuited = dict()
+        # a dict step key -> readable name of the step
+        self.names = dict()
+        # the keys of the generator-mode test instances (or branches) that were short-circuited before their generator
+        # was created
+        self.broken = set()
+
+    def reset(self, maxfail=None):
+        """
+        Enables the circuit breaker if `maxfail` is not None, or disables it.
+
+        :param maxfail: the number of failures of a step after which it is short-circuited
+        :return:
+        """
+        self.maxfail = maxfail
+        self.failures.clear()
+        self.short_circuited.clear()
+        self.names.clear()
+        self.broken.clear()
+
+    @property
+    def enabled(self):
+        return self.maxfail is not None
+
+    def _key(self, item, test_step_argname, step_idx):
+        """ Returns the key of step `step_idx` of `item`, and registers its name """
+        key = (item.nodeid.split('[', 1)[0], step_idx)
+        if key not in self.names:
+            self.names[key] = get_step_name(item, test_step_argname)
+        return key
+
+    def record_failure(self, item, info):
+        """
+        Registers a failure of step `item`, whose `StepsItemInfo` is `info`. A failure is counted at most once per
+        item, even if several phases of the item fail.
+
+        :param item: the pytest item
+        :param info: the `StepsItemInfo` of the item
+        :return:
+        """
+        if getattr(item, STEP_FAILURE_RECORDED_FIELD, False):
+            return
+        setattr(item, STEP_FAILURE_RECORDED_FIELD, True)
+        key = self._key(item, info.test_step_argname, info.step_idx)
+        self.failures[key] = self.failures.get(key, 0) + 1
+
+    def is_open(self, item, info):
+        """
+        Returns True if step `item`, whose `StepsItemInfo` is `info`, has failed in enough test instances to be
+        short-circuited. In that case the short-circuit is counted.
+
+        :param item: the pytest item
+        :param info: the `StepsItemInfo` of the item
+        :return:
+        """
+        key = self._key(item, info.test_step_argname, info.step_idx)
+        if self.failures.get(key, 0) < self.maxfail:
+            return False
+        self.short_circuited[key] = self.short_circuited.get(key, 0) + 1
+        return True
+
+    def get_message(self, item, info):
+        """ Returns the skip message of step `item`, that is short-circuited """
+        key = self._key(item, info.test_step_argname, info.step_idx)
+        return "This test step is short-circuited because it already failed in %s test instances " \
+               "(--steps-maxfail-per-step)" % self.failures[key]
+
+    def iter_summary(self):
+        """
+        Yields tuples (step name, number of failures, number of short-circuited test instances) for all the steps that
+        were short-circuited.
+        """
+        for key, count in self.short_circuited.items():
+            yield self.names[key], self.failures[key], count
+
+
+steps_circuit_breaker = StepsCircuitBreaker()
+"""The session-level circuit breaker of `--steps-maxfail-per-step`."""
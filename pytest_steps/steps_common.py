@@ -2,6 +2,19 @@
 #          + All contributors to <https://github.com/smarie/python-pytest-steps>
 #
 # License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+import sys
+from itertools import product
+
+from .common_mini_six import reraise
+
+
+# set by `@test_steps` on the test function: a tuple (test step argname, list of steps)
+STEPS_FIELD = '__steps__'
+# set by the plugin on pytest items created by `@test_steps`, at collection time: a `StepsItemInfo`
+STEPS_ITEM_INFO_FIELD = '_pytest_steps_info'
+# set by the plugin on pytest items created by `@test_steps`, the first time their instance key is needed
+STEPS_INSTANCE_KEY_FIELD = '_pytest_steps_instance_key'
+
 
 def create_pytest_param_str_id(f):
     # type: (...) -> str
@@ -175,21 +188,204 @@ def get_pytest_node_hash_id(pytest_node,
     l_for_hash = [test_fun]
     for p, v in params_dct.items():
         if p not in params_to_ignore:
-            try:
-                hash_o_v = hash(v)
-            except TypeError:
-                # not hashable, try at least the following for dictionary
-                try:
-                    hash_o_v = hash(repr(sorted(v.items())))
-                except AttributeError:
-                    raise TypeError("Unable to hash test parameter '%s'. Hashable parameters are required to use steps "
-                                    "reliably." % v)
-            l_for_hash.append((p, hash_o_v))
+            l_for_hash.append((p, hash_param_value(v)))
 
     # Hash
     return hash(tuple(l_for_hash))
 
 
+_param_hashers = dict()
+"""The hash functions registered with `register_param_hasher`, by type"""
+
+_param_hashers_by_type = dict()
+"""A cache of the hash function to use for each parameter type encountered, resolved using the type's mro"""
+
+_types_without_hasher = set()
+"""A cache of the parameter types encountered that have no registered hash function"""
+
+
+def register_param_hasher(param_type, hasher, memoize=False):
+    """
+    Registers a hash function to use for test parameters of type `param_type` (or of a subclass), when computing the
+    step-independent id of a test instance. This is typically useful for parameters that are not hashable, such as
+    NumPy arrays or pandas DataFrames, or for parameters that are very expensive to hash.
+
+    ```python
+    import pandas as pd
+    from pytest_steps import register_param_hasher, hash_by_identity
+
+    register_param_hasher(pd.DataFrame, hash_by_identity)
+    ```
+
+    :param param_type: the type of parameter values for which `hasher` should be used.
+    :param hasher: a function receiving a parameter value and returning an int. It should return the same int for two
+        values that should be considered identical. `hash_by_buffer` and `hash_by_identity` are provided for
+        convenience.
+    :param memoize: if True, the hash will be computed only once per parameter value object. This is only safe if
+        the parameter values are not modified during the test session.
+    :return:
+    """
+    if memoize:
+        hasher = _memoize_by_identity(hasher)
+    _param_hashers[param_type] = hasher
+    _param_hashers_by_type.clear()
+    _types_without_hasher.clear()
+
+
+def unregister_param_hasher(param_type):
+    """
+    Removes the hash function registered with `register_param_hasher` for test parameters of type `param_type`. The
+    parameters of this type are then hashed with the hash function registered for their closest parent type, if any,
+    or with the default behaviour.
+
+    :param param_type: the type of parameter values for which a hash function was registered.
+    :return: the hash function that was registered for `param_type`, or None if there was none.
+    """
+    hasher = _param_hashers.pop(param_type, None)
+    _param_hashers_by_type.clear()
+    _types_without_hasher.clear()
+    return hasher
+
+
+def _get_param_hasher(param_type):
+    """
+    Returns the hash function registered for `param_type` or for its closest parent type, or None.
+
+    :param param_type:
+    :return:
+    """
+    try:
+        return _param_hashers_by_type[param_type]
+    except KeyError:
+        hasher = next((_param_hashers[t] for t in param_type.__mro__ if t in _param_hashers), None)
+        _param_hashers_by_type[param_type] = hasher
+        return hasher
+
+
+def hash_param_value(v):
+    """
+    Returns a hash for parameter value `v`. The hash function registered for its type with `register_param_hasher`
+    is used if any. Otherwise the builtin `hash` is used, with a fallback on `hash_by_buffer` for unhashable objects
+    supporting the buffer protocol (such as NumPy arrays).
+
+    :param v:
+    :return:
+    """
+    hasher = _get_param_hasher(type(v))
+    if hasher is not None:
+        return hasher(v)
+
+    try:
+        return hash(v)
+    except TypeError:
+        if isinstance(v, tuple):
+            # a tuple containing unhashable items
+            return hash(tuple(hash_param_value(o) for o in v))
+        try:
+            return hash_by_buffer(v)
+        except TypeError:
+            raise TypeError("Unable to hash test parameter '%s'. Hashable parameters are required to use steps "
+                            "reliably. You can register a hash function for type %s with `register_param_hasher`."
+                            % (v, type(v)))
+
+
+def hash_by_buffer(v):
+    """
+    A hash function for objects supporting the buffer protocol, such as NumPy arrays. The type, shape and item format
+    are hashed together with the raw bytes, so no string representation is built.
+
+    :param v:
+    :return:
+    """
+    buf = memoryview(v)
+    if 'O' in buf.format:
+        # the buffer contains pointers to python objects, not values
+        raise TypeError("Buffers of python objects can not be hashed by value")
+    return hash((type(v), buf.format, buf.shape, buf.tobytes()))
+
+
+def hash_by_identity(v):
+    """
+    A hash function that considers two parameter values identical if and only if they are the same object. This is
+    the fastest possible option and is safe as long as the parameter values live during the whole test session, which
+    is the case for values provided in `@pytest.mark.parametrize`.
+
+    :param v:
+    :return:
+    """
+    return id(v)
+
+
+def _memoize_by_identity(hasher):
+    """
+    Returns a version of `hasher` that computes the hash only once per object. A reference to the object is kept so
+    that its id can not be reused.
+
+    :param hasher:
+    :return:
+    """
+    memo = dict()
+
+    def _memoized_hasher(v):
+        try:
+            return memo[id(v)][1]
+        except KeyError:
+            h = hasher(v)
+            memo[id(v)] = v, h
+            return h
+
+    return _memoized_hasher
+
+
+def _hashable_items(items):
+    """
+    Returns a tuple containing `items`, where only the items having a registered hash function (for example nested
+    dicts and lists) are replaced with their hash. The other items are kept as is, so that they are all hashed in one
+    pass by the caller, with the tuple.
+
+    :param items: a re-iterable collection
+    :return:
+    """
+    types = set(map(type, items))
+    if not types <= _types_without_hasher:
+        for t in types - _types_without_hasher:
+            if _get_param_hasher(t) is None:
+                _types_without_hasher.add(t)
+        if not types <= _types_without_hasher:
+            # only the items with a hash function are hashed separately
+            hashers = _param_hashers_by_type
+            return tuple([o if type(o) in _types_without_hasher else hashers[type(o)](o) for o in items])
+    return tuple(items)
+
+
+def _hash_mapping(v):
+    """ Default hash function for dictionaries, insensitive to the items order """
+    try:
+        return hash(frozenset(zip(v.keys(), _hashable_items(v.values()))))
+    except TypeError:
+        # some values are not hashable: use the fallbacks of `hash_param_value`
+        return hash(frozenset((k, hash_param_value(o)) for k, o in v.items()))
+
+
+def _hash_sequence(v):
+    """ Default hash function for lists """
+    try:
+        return hash((type(v),) + _hashable_items(v))
+    except TypeError:
+        # some items are not hashable: use the fallbacks of `hash_param_value`
+        return hash((type(v),) + tuple(hash_param_value(o) for o in v))
+
+
+def _hash_set(v):
+    """ Default hash function for sets """
+    return hash(frozenset(_hashable_items(v)))
+
+
+register_param_hasher(dict, _hash_mapping)
+register_param_hasher(list, _hash_sequence)
+register_param_hasher(set, _hash_set)
+
+
 # def get_pytest_node_current_param_indices(pytest_node):
 #     """
 #     Returns a dictionary containing all parameter indices in the parameter matrix.
@@ -276,3 +472,533 @@ def get_scope(request):
         return 'function'
     else:
         return 'module'
+
+
+class step_params(object):
+    """
+    Wraps a test step so that it is parametrized on its own, as opposed to the whole test function. This can be used
+    in the list of steps of `@test_steps`:
+
+    ```python
+    @test_steps(load, fit, step_params(evaluate, threshold=[0.1, 0.5, 0.9]), report)
+    def test_pipeline(test_step, steps_data, threshold):
+        test_step(steps_data, threshold)
+    ```
+
+    The steps before the parametrized step (`load` and `fit`) run only once per test instance. Then the test instance
+    is split in as many branches as there are parameter values, and the parametrized step and all subsequent steps
+    (`evaluate` and `report`) run once in each branch. Each branch receives its own `StepsDataHolder`, that is a
+    shallow copy of the one at the end of the prefix: the objects stored by the prefix are shared, not copied.
+
+    The parameter values are received by the test function as arguments with the same names. They are `None` for the
+    steps that run before the parametrized step.
+
+    In generator mode, only the first branch continues the generator: the next branches execute the steps of the
+    prefix again in a new generator (with a warning), unless `--steps-fork` is used.
+
+    :param step: the test step to parametrize.
+    :param ids: an optional list of ids for the parameter values, as in `pytest.mark.parametrize`.
+    :param argvalues: one or several `<argname>=<list of values>`. If several are provided, the branches are created
+        for all combinations of values.
+    """
+    __slots__ = ('step', 'argnames', 'variants', 'ids')
+
+    def __init__(self, step, ids=None, **argvalues):
+        if len(argvalues) == 0:
+            raise ValueError("step_params requires at least one parameter")
+        self.step = step
+        # note: sorted for python 2, where the order of keyword arguments is not preserved
+        self.argnames = tuple(sorted(argvalues.keys()))
+        self.variants = list(product(*(argvalues[argname] for argname in self.argnames)))
+        if ids is None:
+            ids = ['-'.join(create_pytest_param_str_id(v) for v in values) for values in self.variants]
+        elif len(ids) != len(self.variants):
+            raise ValueError("%s ids were provided for %s parameter values" % (len(ids), len(self.variants)))
+        self.ids = list(ids)
+
+    def __repr__(self):
+        return "step_params(%s, %s)" % (create_pytest_param_str_id(self.step), ', '.join(self.argnames))
+
+
+class _StepVariant(object):
+    """
+    A parametrized value created by `@test_steps` when `step_params` is used: a step, in a given branch of the test
+    instance, with the values of the step parameters in that branch.
+    """
+    __slots__ = ('step', 'branch', 'params', 'id')
+
+    def __init__(self, step, branch, params, id):
+        self.step = step
+        # a tuple containing the position of the selected parameter values, for each parametrized step so far
+        self.branch = branch
+        self.params = params
+        self.id = id
+
+    def __repr__(self):
+        return self.id
+
+
+def get_step(step_or_variant):
+    """
+    Returns the test step corresponding to a value received by the test function or listed in `@test_steps`, that may
+    be a `step_params` or a parametrized variant of a step.
+
+    :param step_or_variant:
+    :return:
+    """
+    if isinstance(step_or_variant, (step_params, _StepVariant)):
+        return step_or_variant.step
+    else:
+        return step_or_variant
+
+
+def expand_steps_variants(steps):
+    """
+    Returns the list of `_StepVariant` to use as parametrized values, when some steps in `steps` are wrapped with
+    `step_params`. The branches are listed depth-first: all steps of the first branch are listed before the second
+    branch.
+
+    :param steps: the list of steps provided to `@test_steps`, some of them being `step_params`
+    :return:
+    """
+    variants = []
+
+    def _expand(start, branch, params, branch_id):
+        for i in range(start, len(steps)):
+            step = steps[i]
+            if isinstance(step, step_params):
+                for j, (values, values_id) in enumerate(zip(step.variants, step.ids)):
+                    new_params = dict(params)
+                    new_params.update(zip(step.argnames, values))
+                    new_branch_id = values_id if not branch_id else "%s-%s" % (branch_id, values_id)
+                    variants.append(_StepVariant(step.step, branch + (j, ), new_params,
+                                                 "%s[%s]" % (create_pytest_param_str_id(step.step), new_branch_id)))
+                    # the subsequent steps run once in each branch
+                    _expand(i + 1, branch + (j, ), new_params, new_branch_id)
+                return
+            else:
+                step_id = create_pytest_param_str_id(step)
+                variants.append(_StepVariant(step, branch, params,
+                                             step_id if not branch_id else "%s[%s]" % (step_id, branch_id)))
+
+    _expand(0, (), dict(), '')
+    return variants
+
+
+def get_branch_key(instance_key, branch):
+    """
+    Returns the key to use for the data of branch `branch` of test instance `instance_key`. The data of the trunk (the
+    steps before any parametrized step) is stored under the instance key.
+
+    :param instance_key:
+    :param branch:
+    :return:
+    """
+    return (instance_key, branch) if branch else instance_key
+
+
+class StepsItemInfo(object):
+    """
+    Information about a pytest item created by `@test_steps`, computed once for all at collection time by the plugin.
+    """
+    __slots__ = ('test_step_argname', 'step_idx', 'position', 'instance_key', 'branch', 'is_last')
+
+    def __init__(self, test_step_argname, step_idx, instance_key, branch=(), position=None):
+        self.test_step_argname = test_step_argname
+        # the position of the step in the list provided to `@test_steps`. A step listed several times has one position
+        self.step_idx = step_idx
+        # the position of the item among the items of its test instance (all branches included), in definition order.
+        # As opposed to `step_idx` it is unique, even if a step is listed several times.
+        self.position = step_idx if position is None else position
+        self.instance_key = instance_key
+        # the branch of the test instance when `step_params` is used, see `_StepVariant`
+        self.branch = branch
+        # True if this item is the last collected item of its test instance
+        self.is_last = False
+
+
+def get_steps_item_info(pytest_node):
+    """
+    Returns the `StepsItemInfo` associated with a pytest item, or None if the item was not created by `@test_steps`
+    or if the collection is not finished yet.
+
+    :param pytest_node:
+    :return:
+    """
+    return getattr(pytest_node, STEPS_ITEM_INFO_FIELD, None)
+
+
+def get_steps_instance_key(pytest_node, test_step_argname):
+    """
+    Returns the step-independent id of the test instance that `pytest_node` belongs to. It is computed once for all
+    the first time it is needed (usually at collection time by the plugin), and stored on the node: the next calls are
+    simple lookups.
+
+    :param pytest_node:
+    :param test_step_argname: the name of the test step parameter, to ignore when the id needs to be computed.
+    :return:
+    """
+    try:
+        return getattr(pytest_node, STEPS_INSTANCE_KEY_FIELD)
+    except AttributeError:
+        instance_key = get_pytest_node_hash_id(pytest_node, params_to_ignore=(test_step_argname,))
+        setattr(pytest_node, STEPS_INSTANCE_KEY_FIELD, instance_key)
+        return instance_key
+
+
+def get_step_name(pytest_node, test_step_argname):
+    """
+    Returns a string identifying the step of `pytest_node` among the steps of its test function, whatever the test
+    instance: the node id of the test function followed by the step id, for example `test_a.py::test_suite[step_b]`.
+
+    :param pytest_node:
+    :param test_step_argname: the name of the test step parameter
+    :return:
+    """
+    step = get_step(pytest_node.callspec.params[test_step_argname])
+    return "%s[%s]" % (pytest_node.nodeid.split('[', 1)[0], create_pytest_param_str_id(step))
+
+
+def iter_steps_instances_names(items):
+    """
+    Yields a tuple (item, instance_name) for all pytest items created by `@test_steps` in `items`, where
+    `instance_name` is a string identifying the test instance of the item. As opposed to the instance key, that relies
+    on `hash`, it is identical across processes (for example pytest-xdist workers) collecting the same items.
+
+    It is made of the node id of the test function, and of the position of the test instance among the instances of
+    that function.
+
+    :param items:
+    :return:
+    """
+    instances_positions = dict()
+    for item in items:
+        try:
+            test_step_argname, _ = getattr(item.function, STEPS_FIELD)
+        except AttributeError:
+            # not a test function, or not decorated with @test_steps
+            continue
+
+        function_id = item.nodeid.split('[', 1)[0]
+        positions = instances_positions.setdefault(function_id, dict())
+        instance_key = get_steps_instance_key(item, test_step_argname)
+        yield item, "%s#%s" % (function_id, positions.setdefault(instance_key, len(positions)))
+
+
+STEPS_ORDERS = ('depth-first', 'breadth-first')
+
+
+def order_steps_items(items, order):
+    """
+    Returns a list containing the pytest items in `items`, where the items of each `@test_steps` test function are
+    reordered according to `order`:
+
+     - 'depth-first': all steps of a test instance are executed before the first step of the next instance. Only one
+       test instance per function is in-flight at a time, so only one generator or `StepsDataHolder` is alive.
+     - 'breadth-first': the first step of all test instances is executed, then the second step of all instances, etc.
+
+    Only contiguous items of the same function are reordered, and the order is stable otherwise: the relative order
+    of the instances and of the steps of each instance are preserved.
+
+    The test instances are identified with the instance keys stored on the items, that are not computed again.
+
+    :param items:
+    :param order: one of `STEPS_ORDERS`
+    :return:
+    """
+    if order not in STEPS_ORDERS:
+        raise ValueError("Invalid steps order '%s', should be one of %s" % (order, STEPS_ORDERS))
+
+    ordered_items = []
+    run = []  # a list of (instance position, step position, item) for contiguous items of the same function
+    run_function_id = None
+    instances_positions = dict()
+    steps_positions = dict()
+
+    def _flush():
+        if order == 'depth-first':
+            run.sort(key=lambda t: (t[0], t[1]))
+        else:
+            run.sort(key=lambda t: (t[1], t[0]))
+        ordered_items.extend(t[2] for t in run)
+        del run[:]
+        instances_positions.clear()
+        steps_positions.clear()
+
+    for item in items:
+        try:
+            test_step_argname, _ = getattr(item.function, STEPS_FIELD)
+        except AttributeError:
+            # not a test function, or not decorated with @test_steps
+            test_step_argname = function_id = None
+        else:
+            function_id = item.nodeid.split('[', 1)[0]
+
+        if function_id != run_function_id:
+            _flush()
+            run_function_id = function_id
+
+        if function_id is None:
+            ordered_items.append(item)
+        else:
+            instance_key = get_steps_instance_key(item, test_step_argname)
+            instance_pos = instances_positions.setdefault(instance_key, len(instances_positions))
+            step_pos = steps_positions.get(instance_key, 0)
+            steps_positions[instance_key] = step_pos + 1
+            run.append((instance_pos, step_pos, item))
+
+    _flush()
+    return ordered_items
+
+
+def _get_item_step(item):
+    """
+    Returns a tuple (test_step_argname, step_idx, branch) describing the step of pytest item `item`, or None if it was
+    not created by `@test_steps`.
+
+    :param item:
+    :return:
+    """
+    try:
+        test_step_argname, steps = getattr(item.function, STEPS_FIELD)
+    except AttributeError:
+        # not a test function, or not decorated with @test_steps
+        return None
+
+    # find the step position. Note: the parametrized values are the objects provided to @test_steps, not copies
+    step = get_pytest_node_current_param_values(item)[test_step_argname]
+    branch = step.branch if isinstance(step, _StepVariant) else ()
+    step = get_step(step)
+    step_idx = next(i for i, s in enumerate(steps) if s is step)
+    return test_step_argname, step_idx, branch
+
+
+def add_steps_prerequisites(items, all_items, get_prerequisites, collect_function):
+    """
+    Adds to `items` the steps that the selected steps need, when some steps of a test instance were not selected (for
+    example with `-k` or with a node id). They are taken from the deselected items when possible, otherwise the items
+    of the test function are collected again with `collect_function`.
+
+    In each test instance where steps are added, all the steps of the instance are placed at the position of its first
+    selected step, in their collection order.
+
+    :param items: the selected pytest items, modified in place
+    :param all_items: all the collected pytest items (selected or not), in collection order
+    :param get_prerequisites: a function (item, step_idx) returning the positions of the steps that step `step_idx`
+        of `item` needs. They are searched in the same branch as the step, or in its parent branches.
+    :param collect_function: a function (item) returning the list of all items of the test function of `item`
+    :return: a list of tuples (added item, a selected item of the same test instance)
+    """
+    # list the selected steps of each test instance
+    instances = dict()  # instance key -> list of selected items
+    present = dict()  # instance key -> set of (step_idx, branch)
+    needed = dict()  # instance key -> dict of step_idx -> set of branches where it can be
+    items_keys = dict()  # id(item) -> instance key
+    for item in items:
+        item_step = _get_item_step(item)
+        if item_step is None:
+            continue
+        test_step_argname, step_idx, branch = item_step
+        key = get_steps_instance_key(item, test_step_argname)
+        items_keys[id(item)] = key
+        instances.setdefault(key, []).append(item)
+        present.setdefault(key, set()).add((step_idx, branch))
+        for j in get_prerequisites(item, step_idx):
+            needed.setdefault(key, dict()).setdefault(j, set()).add(branch)
+
+    def _is_satisfied(key, j, branch):
+        return any((j, branch[:i]) in present[key] for i in range(len(branch) + 1))
+
+    # remove the steps that are already selected
+    for key, steps in list(needed.items()):
+        for j, branches in list(steps.items()):
+            branches = set(b for b in branches if not _is_satisfied(key, j, b))
+            if branches:
+                steps[j] = branches
+            else:
+                del steps[j]
+        if not steps:
+            del needed[key]
+
+    if not needed:
+        return []
+
+    added = dict()  # instance key -> list of added items
+    # the candidates of the other test functions are ignored without computing their instance key
+    needed_functions = set(id(instances[key][0].function) for key in needed)
+
+    def _add_from(candidates):
+        for c in candidates:
+            if id(getattr(c, 'function', None)) not in needed_functions:
+                continue
+            item_step = _get_item_step(c)
+            if item_step is None:
+                continue
+            test_step_argname, step_idx, branch = item_step
+            key = get_steps_instance_key(c, test_step_argname)
+            if key not in needed or (step_idx, branch) in present[key]:
+                continue
+            # the step is needed if it is in the branch of a selected step, or in one of its parent branches
+            if any(b[:len(branch)] == branch for b in needed[key].get(step_idx, ())):
+                added.setdefault(key, []).append(c)
+                present[key].add((step_idx, branch))
+
+    selected = set(id(i) for i in items)
+    _add_from(i for i in all_items if id(i) not in selected)
+
+    # collect the test functions again for the instances that still miss some steps (the items were never created)
+    collected_ranks = dict()  # instance key -> dict of item name -> rank in the collected function
+    collected_functions = dict()
+    for key, steps in needed.items():
+        if all(_is_satisfied(key, j, b) for j, branches in steps.items() for b in branches):
+            continue
+        item = instances[key][0]
+        function_id = item.nodeid.split('[', 1)[0]
+        if function_id not in collected_functions:
+            collected_functions[function_id] = collect_function(item)
+            _add_from(collected_functions[function_id])
+        collected_ranks[key] = dict((i.name, rank) for rank, i in enumerate(collected_functions[function_id]))
+
+    # place the steps of each instance where steps were added, in their collection order
+    ranks = dict((id(i), rank) for rank, i in enumerate(all_items))
+    new_items = []
+    added_pairs = []
+    for item in items:
+        key = items_keys.get(id(item))
+        if key not in added:
+            new_items.append(item)
+        elif key in instances:
+            names_ranks = collected_ranks.get(key)
+            if names_ranks is not None:
+                instance_items = sorted(instances.pop(key) + added[key], key=lambda i: names_ranks[i.name])
+            else:
+                instance_items = sorted(instances.pop(key) + added[key], key=lambda i: ranks[id(i)])
+            new_items.extend(instance_items)
+            added_pairs.extend((a, item) for a in added[key])
+
+    items[:] = new_items
+    return added_pairs
+
+
+def select_failed_instances(items, failed_nodeids, remaining_steps=False):
+    """
+    Returns a tuple (selected, deselected) splitting `items` for a steps-aware "last failed" session. `failed_nodeids`
+    are the node ids of the items that failed in the previous session, as stored by pytest in its cache.
+
+    For each test instance where a step failed, all the steps from the first step up to the failed step are selected,
+    in the branch of the failed step and its parent branches. If `remaining_steps` is True, the steps after the failed
+    step are selected too, including in the branches that start after it. The test instances where all steps passed
+    are deselected, as well as the items not created by `@test_steps` that did not fail.
+
+    :param items:
+    :param failed_nodeids: an iterable of node ids. The pytest-xdist group suffixes ("@<group>") are ignored.
+    :param remaining_steps: a boolean indicating if the steps after the failed ones should be selected too
+    :return:
+    """
+    failed_nodeids = set(failed_nodeids)
+    failed_nodeids.update(nodeid.rsplit('@', 1)[0] for nodeid in list(failed_nodeids) if '@' in nodeid)
+
+    def _has_failed(item):
+        return item.nodeid in failed_nodeids or item.nodeid.rsplit('@', 1)[0] in failed_nodeids
+
+    # find the failed steps of each test instance
+    items_steps = []
+    failed_steps = dict()  # instance key -> list of (step_idx, branch)
+    for item in items:
+        item_step = _get_item_step(item)
+        if item_step is None:
+            items_steps.append((item, None, None, None))
+            continue
+        test_step_argname, step_idx, branch = item_step
+        key = get_steps_instance_key(item, test_step_argname)
+        items_steps.append((item, key, step_idx, branch))
+        if _has_failed(item):
+            failed_steps.setdefault(key, []).append((step_idx, branch))
+
+    def _is_selected(key, step_idx, branch):
+        for failed_idx, failed_branch in failed_steps.get(key, ()):
+            if branch == failed_branch[:len(branch)]:
+                # in the branch of the failed step or in a parent branch
+                if remaining_steps or step_idx <= failed_idx:
+                    return True
+            elif remaining_steps and failed_branch == branch[:len(failed_branch)]:
+                # in a branch starting after the failed step
+                return True
+        return False
+
+    selected, deselected = [], []
+    for item, key, step_idx, branch in items_steps:
+        if (_has_failed(item) if key is None else _is_selected(key, step_idx, branch)):
+            selected.append(item)
+        else:
+            deselected.append(item)
+    return selected, deselected
+
+
+def set_steps_items_info(items):
+    """
+    Creates the `StepsItemInfo` of all pytest items created by `@test_steps` in `items`. `items` should be the final
+    list of items to execute, in execution order, so that the last item of each test instance can be identified.
+
+    :param items:
+    :return:
+    """
+    last_infos = dict()
+    for item in items:
+        item_step = _get_item_step(item)
+        if item_step is None:
+            continue
+        test_step_argname, step_idx, branch = item_step
+
+        instance_key = get_steps_instance_key(item, test_step_argname)
+        info = StepsItemInfo(test_step_argname, step_idx, instance_key, branch,
+                             position=item.callspec.indices[test_step_argname])
+        setattr(item, STEPS_ITEM_INFO_FIELD, info)
+        last_infos[instance_key] = info
+
+    for info in last_infos.values():
+        info.is_last = True
+
+
+_instances_finalizers = dict()
+
+
+def add_instance_finalizer(instance_key, finalizer):
+    """
+    Registers `finalizer` so that it is called once, after the last step of test instance `instance_key` has been
+    torn down (or at the end of the session if it never is).
+
+    :param instance_key: the step-independent id of the test instance
+    :param finalizer: a callable without arguments
+    :return:
+    """
+    _instances_finalizers.setdefault(instance_key, []).append(finalizer)
+
+
+def finalize_instance(instance_key):
+    """
+    Calls all finalizers registered for test instance `instance_key`, in reverse registration order. If some of them
+    raise exceptions, all finalizers are still called and the first exception is raised at the end.
+
+    :param instance_key:
+    :return:
+    """
+    first_exc_info = None
+    for finalizer in reversed(_instances_finalizers.pop(instance_key, ())):
+        try:
+            finalizer()
+        except Exception:
+            if first_exc_info is None:
+                first_exc_info = sys.exc_info()
+    if first_exc_info is not None:
+        reraise(*first_exc_info)
+
+
+def finalize_all_instances():
+    """
+    Calls the finalizers of all test instances that were not finalized yet.
+
+    :return:
+    """
+    for instance_key in list(_instances_finalizers.keys()):
+        finalize_instance(instance_key)
@@ -20,7 +20,13 @@ try:  # python 3.3+
 except ImportError:
     from funcsigs import signature, Parameter
 
+from copy import copy
+from functools import partial
 from inspect import isgeneratorfunction
+import os
+import pickle
+from traceback import format_exc
+from warnings import warn
 
 try:  # python 3+
     from typing import Iterable, Any, Union
@@ -30,7 +36,11 @@ except ImportError:
 import pytest
 
 from .common_mini_six import string_types, reraise
-from .steps_common import create_pytest_param_str_id, get_pytest_node_hash_id, get_scope
+from .steps_common import create_pytest_param_str_id, get_steps_instance_key, get_scope, STEPS_FIELD, step_params, \
+    _StepVariant, get_step, expand_steps_variants, get_branch_key, add_instance_finalizer, get_steps_item_info
+from .steps_circuit_breaker import steps_circuit_breaker
+from .steps_timing import set_step_timing
+from .steps_measures import measure_step
 
 
 class ExceptionHook(object):
@@ -257,7 +267,10 @@ class StepsMonitor(object):
         :param first_step_kwargs:
         """
         self.steps = step_names
+        # a dict step name -> exception type, for all mandatory steps that failed
         self.exceptions = dict()
+        # the measures of the last executed step, see `measure_step`
+        self.measures = None
 
         # Remember objects that should be replaced in subsequent steps
         # -- for positional arguments, store in a dict under key=position
@@ -283,14 +296,17 @@ class StepsMonitor(object):
         """
         return len(self.exceptions) == 0
 
-    def execute(self, step_name, args, kwargs):
+    def execute(self, step_name, args, kwargs, send_value=None, pytest_node=None):
         """
         Executes one iteration of the monitored generator.
 
         :param step_name:
+        :param send_value: the value sent to the generator, that is, the value of the `yield` expression where it
+            was paused. This is used to send the parameters of a `step_params` branch.
+        :param pytest_node: the pytest node of the step, if any. The duration of the step is stored on it.
         :return:
         """
-
+        self.measures = None
         if self.can_execute(step_name):
             # Replace all objects that should be replaced
             for i, a in self.replaceable_args.items():
@@ -299,9 +315,11 @@ class StepsMonitor(object):
                 replace_fixture(a, kwargs[k])
 
             # Execute the step
+            self.measures = measure_step(pytest_node)
             with self._monitor(step_name):
                 try:
-                    res = next(self.gen)
+                    with self.measures:
+                        res = self.gen.send(send_value)
                 except StopIteration:
                     raise StepExecutionError(step_name)
 
@@ -346,16 +364,29 @@ class StepsMonitor(object):
                 raise StepYieldError(step_name, res)
         else:
             # A mandatory step failed before this one. The generator is broken, no need to even try >> Skip or fail
-            # TODO add fail_instead_of_skip argument like in depends_on
-            should_fail2 = False
-            failed_step = next(iter(self.exceptions.keys())) if len(self.exceptions) == 1 \
-                else list(self.exceptions.keys())
+            self.skip_or_fail(step_name)
+
+    def skip_or_fail(self, step_name):
+        """
+        Skips (or fails) step `step_name`, that can not execute because a mandatory step failed before it.
+
+        :param step_name:
+        :return:
+        """
+        # TODO add fail_instead_of_skip argument like in depends_on
+        should_fail2 = False
+        failed_step = next(iter(self.exceptions.keys())) if len(self.exceptions) == 1 \
+            else list(self.exceptions.keys())
+        if StepShortCircuited in self.exceptions.values():
+            msg = "This test step '%s' is not run because previous step '%s' was short-circuited " \
+                  "(--steps-maxfail-per-step)" % (step_name, failed_step)
+        else:
             msg = "This test step '%s' is not run because non-optional previous step '%s' has failed" \
                   "" % (step_name, failed_step)
-            if should_fail2:
-                pytest.fail(msg)
-            else:
-                pytest.skip(msg)
+        if should_fail2:
+            pytest.fail(msg)
+        else:
+            pytest.skip(msg)
 
     def _monitor(self, step_name):
         """ returns a context manager that registers all captured exceptions in self, under given step name """
@@ -365,10 +396,220 @@ class StepsMonitor(object):
                 # Do not register this exception
                 pass
             else:
-                self.exceptions[step_name] = exc_type, exc_val, exc_tb
+                # Only remember the type: keeping the value or traceback would keep all the frames alive
+                self.exceptions[step_name] = exc_type
+                # The generator is broken: no subsequent step will be able to run
+                self.release()
 
         return ExceptionHook(handle_exception)
 
+    def release(self):
+        """
+        Releases the generator and the fixtures of the first step, so that they can be garbage-collected. Only the
+        information needed to skip the subsequent steps (`self.exceptions`) is kept.
+        """
+        self.gen = None
+        self.replaceable_args = dict()
+        self.replaceable_kwargs = dict()
+
+    def take_over(self):
+        """
+        Returns a new monitor that continues the generator of this monitor, with its own copy of the exceptions. This
+        monitor does not own the generator anymore, but keeps its exceptions. This is used for the first branch
+        created by `step_params`.
+        """
+        monitor = copy(self)
+        monitor.exceptions = dict(self.exceptions)
+        self.release()
+        return monitor
+
+
+class ForkedStepError(Exception):
+    """
+    Exception raised by a `_ForkedStepsMonitor` when a step failed in the child process with an exception that can not
+    be sent to the parent process, or when the child process died.
+    """
+    def __init__(self, step_name, child_traceback):
+        self.step_name = step_name
+        self.child_traceback = child_traceback
+        Exception.__init__(self)
+
+    def __str__(self):
+        return "Error executing step '%s' in the forked child process:\n%s" % (self.step_name, self.child_traceback)
+
+
+class _ForkedStepsMonitor(StepsMonitor):
+    """
+    A StepsMonitor executing the steps of a `step_params` branch in a child process, forked from the process where the
+    generator of the trunk is paused. The whole state of the generator is therefore reused through copy-on-write,
+    without serialization, and the trunk generator can be forked again for the next branch.
+
+    Each step is executed in the child when it is executed in the parent: the step name is sent to the child, and the
+    outcome is sent back to the parent, where it is raised again. Note that the `@one_fixture_per_step` fixtures are
+    not replaced in the child: the steps see the fixtures of the last step executed before the fork.
+    """
+    # the pipes of all live children, that should not be inherited by the next children. Otherwise a child would not
+    # be notified when its pipe is closed by the parent, as long as another child keeps it open.
+    _parent_fds = set()
+
+    def __init__(self, trunk, send_value):
+        """
+        Forks the child process.
+
+        :param trunk: the StepsMonitor that executed the common steps, and that is paused before the branch
+        :param send_value: the value to send to the generator with the first step executed in the child
+        """
+        self.steps = trunk.steps
+        self.exceptions = dict(trunk.exceptions)
+        self.measures = None
+        self.gen = None
+        self.replaceable_args = dict()
+        self.replaceable_kwargs = dict()
+
+        parent_to_child = os.pipe()
+        child_to_parent = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # child process: serve the steps until the parent closes the pipe, and never return to pytest
+            try:
+                for fd in _ForkedStepsMonitor._parent_fds:
+                    os.close(fd)
+                os.close(parent_to_child[1])
+                os.close(child_to_parent[0])
+                _serve_forked_steps(trunk, parent_to_child[0], child_to_parent[1], send_value)
+            finally:
+                os._exit(0)
+
+        os.close(parent_to_child[0])
+        os.close(child_to_parent[1])
+        self.pid = pid
+        self._to_child = os.fdopen(parent_to_child[1], 'wb')
+        self._from_child = os.fdopen(child_to_parent[0], 'rb')
+        _ForkedStepsMonitor._parent_fds.update((parent_to_child[1], child_to_parent[0]))
+
+    def execute(self, step_name, args, kwargs, send_value=None, pytest_node=None):
+        """
+        Executes one step in the child process, and raises its outcome in the current process. `send_value` is
+        ignored: the value to send was provided when the child process was forked. The duration of the step is the
+        one measured in the child process.
+        """
+        if not self.can_execute(step_name):
+            # A mandatory step failed before this one, the child does not need to know >> Skip or fail
+            self.skip_or_fail(step_name)
+
+        try:
+            pickle.dump(step_name, self._to_child, 2)
+            self._to_child.flush()
+            outcome, msg, exc, child_traceback, step_failed, timing = pickle.load(self._from_child)
+        except (EOFError, IOError, OSError):
+            self.exceptions[step_name] = ForkedStepError
+            raise ForkedStepError(step_name, "the child process %s died" % self.pid)
+
+        if timing is not None and pytest_node is not None:
+            set_step_timing(pytest_node, timing)
+
+        if step_failed:
+            self.exceptions[step_name] = type(exc) if exc is not None else ForkedStepError
+
+        if outcome == 'passed':
+            return
+        elif outcome == 'skipped':
+            pytest.skip(msg)
+        elif outcome == 'xfailed':
+            pytest.xfail(msg)
+        elif outcome == 'failed':
+            pytest.fail(msg)
+        elif exc is None:
+            raise ForkedStepError(step_name, child_traceback)
+        else:
+            # the exception was created in the child: show its traceback too
+            exc.__cause__ = ForkedStepError(step_name, child_traceback)
+            raise exc
+
+    def release(self):
+        """ Stops the child process """
+        if self._to_child is not None:
+            _ForkedStepsMonitor._parent_fds.difference_update((self._to_child.fileno(), self._from_child.fileno()))
+            self._to_child.close()
+            self._from_child.close()
+            self._to_child = self._from_child = None
+            os.waitpid(self.pid, 0)
+
+
+def _serve_forked_steps(monitor, read_fd, write_fd, send_value):
+    """
+    The main loop of the child process of a `_ForkedStepsMonitor`: executes the steps received from the parent process
+    with `monitor`, and sends their outcome back.
+
+    :param monitor: the StepsMonitor, paused before the branch
+    :param read_fd: the file descriptor receiving the step names from the parent process
+    :param write_fd: the file descriptor to send the outcomes to the parent process
+    :param send_value: the value to send to the generator with the first step
+    :return:
+    """
+    # the fixtures of the parent process can not be received
+    monitor.replaceable_args = dict()
+    monitor.replaceable_kwargs = dict()
+
+    with os.fdopen(read_fd, 'rb') as from_parent, os.fdopen(write_fd, 'wb') as to_parent:
+        while True:
+            try:
+                step_name = pickle.load(from_parent)
+            except EOFError:
+                # the parent released the monitor
+                return
+
+            msg, exc, child_traceback = None, None, None
+            try:
+                monitor.execute(step_name, (), {}, send_value)
+                outcome = 'passed'
+            except pytest.skip.Exception as e:
+                outcome, msg = 'skipped', e.msg
+            except pytest.xfail.Exception as e:
+                outcome, msg = 'xfailed', e.msg
+            except pytest.fail.Exception as e:
+                outcome, msg = 'failed', e.msg
+            except BaseException as e:
+                outcome, child_traceback = 'error', format_exc()
+                try:
+                    # make sure that the exception can be received by the parent
+                    pickle.loads(pickle.dumps(e, 2))
+                    exc = e
+                except Exception:
+                    pass
+            send_value = None
+
+            timing = monitor.measures.timing if monitor.measures is not None else None
+            pickle.dump((outcome, msg, exc, child_traceback, step_name in monitor.exceptions, timing), to_parent, 2)
+            to_parent.flush()
+
+
+class StepsMonitorsCounter(object):
+    """
+    A session-level counter of the `StepsMonitor` objects created and evicted by all `StepMonitorsContainer`.
+    The number of live monitors is the number of generator-mode test instances currently in-flight.
+    """
+    __slots__ = ('created', 'evicted')
+
+    def __init__(self):
+        self.created = 0
+        self.evicted = 0
+
+    def reset(self):
+        self.created = 0
+        self.evicted = 0
+
+    @property
+    def live(self):
+        return self.created - self.evicted
+
+    def __repr__(self):
+        return "StepsMonitorsCounter(live=%s, evicted=%s)" % (self.live, self.evicted)
+
+
+monitors_counter = StepsMonitorsCounter()
+"""The session-level counter of live vs. evicted `StepsMonitor`s."""
+
 
 class StepMonitorsContainer(dict):
     """
@@ -377,9 +618,13 @@ class StepMonitorsContainer(dict):
     there will be one StepsMonitor created for each unique function call
     """
 
-    def __init__(self, test_func, step_ids):
+    def __init__(self, test_func, step_ids, branch_idx=None):
         self.test_func = test_func
         self.step_ids = step_ids
+        # the position of the step parametrized with `step_params`, if any
+        self.branch_idx = branch_idx
+        # True once the user has been warned that the common steps are executed again in the next branches
+        self.replay_warned = False
         dict.__init__(self)
 
     def get_execution_monitor(self, pytest_node, args, kwargs):
@@ -398,7 +643,7 @@ class StepMonitorsContainer(dict):
         # Get the unique id that is shared between the steps of the same execution, by removing the step parameter
         # Note: when the id was using not only param values but also fixture values we had to discard
         # 'request' and maybe some fixtures here. But that's not the case anymore,simply discard the "test step" param
-        id_without_steps = get_pytest_node_hash_id(pytest_node, params_to_ignore=(GENERATOR_MODE_STEP_ARGNAME,))
+        id_without_steps = get_steps_instance_key(pytest_node, GENERATOR_MODE_STEP_ARGNAME)
 
         if id_without_steps not in self:
             # First time we call the function with this combination of parameters
@@ -406,11 +651,183 @@ class StepMonitorsContainer(dict):
 
             # create the monitor, in charge of managing the execution flow
             self[id_without_steps] = StepsMonitor(self.step_ids, self.test_func, args, kwargs)
+            monitors_counter.created += 1
+            # if the last step of the instance is not executed, its monitors are evicted at the end of the session
+            add_instance_finalizer(id_without_steps, partial(self.evict_instance_monitors, id_without_steps))
 
         return self[id_without_steps]
 
+    def get_branch_execution_monitor(self, pytest_node, branch, args, kwargs, send_value, fork=False):
+        """
+        Returns the StepsMonitor in charge of monitoring execution of the provided pytest node, in branch `branch`
+        created by `step_params`. If there is no monitor yet for this branch, one is created from the monitor of the
+        common steps (the trunk):
+
+         - if `fork=True`, the process is forked so that the branch continues the trunk generator in a child process
+         - otherwise the first branch continues the trunk generator, and the next branches create a new generator and
+           execute the common steps again.
+
+        :param pytest_node:
+        :param branch:
+        :param args:
+        :param kwargs:
+        :param send_value: the value to send to the generator with the first step executed in a new branch
+        :param fork: a boolean indicating if the process should be forked for each branch
+        :return: a tuple (monitor, created)
+        """
+        id_without_steps = get_steps_instance_key(pytest_node, GENERATOR_MODE_STEP_ARGNAME)
+        branch_key = get_branch_key(id_without_steps, branch)
+        try:
+            return self[branch_key], False
+        except KeyError:
+            pass
+
+        trunk = self.get(id_without_steps)
+        if trunk is None:
+            add_instance_finalizer(id_without_steps, partial(self.evict_instance_monitors, id_without_steps))
+        if trunk is not None and not trunk.can_execute(None):
+            # a mandatory common step failed: the branch will be skipped
+            return trunk, False
+        elif trunk is not None and fork:
+            steps_monitor = _ForkedStepsMonitor(trunk, send_value)
+        elif trunk is not None and trunk.gen is not None:
+            steps_monitor = trunk.take_over()
+        else:
+            steps_monitor = None
+
+        if steps_monitor is not None:
+            self[branch_key] = steps_monitor
+            monitors_counter.created += 1
+            return steps_monitor, True
+
+        # execute the common steps again in a new generator
+        if trunk is not None and not self.replay_warned:
+            self.replay_warned = True
+            warn("The common steps %s of test function %s are executed again in each branch created by `step_params`, "
+                 "except the first one. Use `--steps-fork` to execute them only once."
+                 % (self.step_ids[:self.branch_idx], self.test_func.__name__))
+        steps_monitor = StepsMonitor(self.step_ids, self.test_func, args, kwargs)
+        self[branch_key] = steps_monitor
+        monitors_counter.created += 1
+        for step_name in self.step_ids[:self.branch_idx]:
+            try:
+                steps_monitor.execute(step_name, args, kwargs)
+            except (Exception, pytest.skip.Exception, pytest.fail.Exception):
+                # these steps were already reported. If a mandatory step failed, the branch will be skipped
+                pass
+        return steps_monitor, True
+
+    def evict_execution_monitor(self, pytest_node, branch=()):
+        """
+        Removes the StepsMonitor in charge of monitoring execution of the provided pytest node, if any. This should be
+        called once the last step of the node's test instance has been processed, so that the generator, its locals
+        and the first step arguments can be garbage-collected.
+
+        :param pytest_node:
+        :param branch: the branch created by `step_params`, if any
+        :return:
+        """
+        id_without_steps = get_branch_key(get_steps_instance_key(pytest_node, GENERATOR_MODE_STEP_ARGNAME), branch)
+        steps_monitor = self.pop(id_without_steps, None)
+        if steps_monitor is not None:
+            steps_monitor.release()
+            monitors_counter.evicted += 1
+
+    def evict_instance_monitors(self, instance_key):
+        """
+        Removes all the StepsMonitor of test instance `instance_key`: the monitor of the common steps and the monitors
+        of all its branches. This is called after the last collected step of the test instance, that may not be its
+        last step (for example when the next steps were deselected), and at the end of the session.
+
+        :param instance_key: the step-independent id of the test instance
+        :return:
+        """
+        for key in [k for k in self if k == instance_key or (isinstance(k, tuple) and k[0] == instance_key)]:
+            self.pop(key).release()
+            monitors_counter.evicted += 1
+
 
 GENERATOR_MODE_STEP_ARGNAME = "________step_name_"
+STEPS_MONITORS_FIELD = "__steps_monitors__"
+STEPS_FORK_OPTION = "steps_fork"
+
+
+def skip_step_before_setup(item, info):
+    """
+    Called by the plugin before the setup of generator-mode `item`, whose `StepsItemInfo` is `info`. If a mandatory
+    step of the test instance has already failed, the step is skipped right away so that none of its fixtures are
+    created. Otherwise this does nothing, and the step will be executed as usual.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    all_monitors = getattr(item.function, STEPS_MONITORS_FIELD)
+    steps_monitor = all_monitors.get(get_branch_key(info.instance_key, info.branch))
+    if steps_monitor is None and info.branch:
+        # the first step of this branch: check the common steps
+        steps_monitor = all_monitors.get(info.instance_key)
+    if steps_monitor is None:
+        # the first step was not executed yet
+        return
+
+    step_name = all_monitors.step_ids[info.step_idx]
+    if not steps_monitor.can_execute(step_name):
+        _evict_before_skip(all_monitors, item, info)
+        steps_monitor.skip_or_fail(step_name)
+
+
+def _evict_before_skip(all_monitors, item, info):
+    """ The wrapper will not be called for step `item`, that is skipped: evict the monitors now if this is the last
+    step of its branch or of its test instance. """
+    if info.is_last:
+        all_monitors.evict_instance_monitors(info.instance_key)
+    elif info.branch and info.step_idx == len(all_monitors.step_ids) - 1:
+        all_monitors.evict_execution_monitor(item, info.branch)
+
+
+class StepShortCircuited(Exception):
+    """
+    The exception type registered in a `StepsMonitor` for a step that was short-circuited by
+    `--steps-maxfail-per-step`, so that the subsequent steps are skipped.
+    """
+    pass
+
+
+def short_circuit_step_before_setup(item, info):
+    """
+    Called by the plugin before the setup of generator-mode `item`, whose `StepsItemInfo` is `info`, when
+    `--steps-maxfail-per-step` is used. If the step has already failed in too many test instances, it is skipped right
+    away, and the subsequent steps of the test instance (or of the branch) will be skipped too.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    all_monitors = getattr(item.function, STEPS_MONITORS_FIELD)
+    branch_key = get_branch_key(info.instance_key, info.branch)
+    if any(get_branch_key(info.instance_key, info.branch[:i]) in steps_circuit_breaker.broken
+           for i in range(len(info.branch) + 1)):
+        # a previous step was short-circuited before the generator was created
+        _evict_before_skip(all_monitors, item, info)
+        pytest.skip("This test step is not run because a previous step was short-circuited (--steps-maxfail-per-step)")
+
+    # note: `skip_step_before_setup` was called before, so the step can execute
+    if not steps_circuit_breaker.is_open(item, info):
+        return
+
+    steps_monitor = all_monitors.get(branch_key)
+    if steps_monitor is None:
+        # the generator of this test instance (or branch) does not exist yet: the monitor of the common steps, if any,
+        # is shared with the other branches.
+        steps_circuit_breaker.broken.add(branch_key)
+        add_instance_finalizer(info.instance_key, partial(steps_circuit_breaker.broken.discard, branch_key))
+    else:
+        # the generator is broken
+        steps_monitor.exceptions[all_monitors.step_ids[info.step_idx]] = StepShortCircuited
+        steps_monitor.release()
+    _evict_before_skip(all_monitors, item, info)
+    pytest.skip(steps_circuit_breaker.get_message(item, info))
 
 
 def get_generator_decorator(steps  # type: Iterable[Any]
@@ -447,13 +864,34 @@ def get_generator_decorator(steps  # type: Iterable[Any]
             raise ValueError("Your test function relies on arg name %s that is needed by @test_steps in generator "
                              "mode" % test_step_argname)
 
+        branch_points = [i for i, step in enumerate(steps) if isinstance(step, step_params)]
+        if len(branch_points) > 1:
+            raise ValueError("Only one step can be parametrized with `step_params` in generator mode, found %s. "
+                             "Please use the explicit mode" % len(branch_points))
+        elif branch_points == [0]:
+            raise ValueError("The first step can not be parametrized with `step_params` in generator mode: the "
+                             "parameters are received by the generator as the value of the `yield` statement that "
+                             "ends the previous step. Please parametrize the whole test function instead.")
+        branch_idx = branch_points[0] if branch_points else None
+
         # ------CORE -------
         # Transform the steps into ids if needed
-        step_ids = [create_pytest_param_str_id(f) for f in steps]
+        step_ids = [create_pytest_param_str_id(get_step(f)) for f in steps]
+
+        if branch_idx is not None:
+            # the parametrized step is identified by its id, as the other steps
+            branch_step = copy(steps[branch_idx])
+            branch_step.step = step_ids[branch_idx]
+            parametrized_steps = expand_steps_variants(step_ids[:branch_idx] + [branch_step]
+                                                       + step_ids[branch_idx + 1:])
+            parametrized_ids = [variant.id for variant in parametrized_steps]
+        else:
+            parametrized_steps = step_ids
+            parametrized_ids = str
 
         # Create the container that will hold all execution monitors for this function
         # TODO maybe have later a single 'monitor' instance at plugin level... like in pytest-benchmark
-        all_monitors = StepMonitorsContainer(test_func, step_ids)
+        all_monitors = StepMonitorsContainer(test_func, step_ids, branch_idx)
 
         # Create the function wrapper.
         # We will expose a new signature with additional 'request' arguments if needed, and the test step
@@ -486,25 +924,70 @@ def get_generator_decorator(steps  # type: Iterable[Any]
                         step_names = [create_pytest_param_str_id(step_name)]
                     else:
                         step_names = [create_pytest_param_str_id(f) for f in step_name]
-                steps_monitor = StepsMonitor(step_ids, test_func, args, kwargs)
-                for i, (step_name, ref_step_name) in enumerate(zip(step_names, step_ids)):
-                    if step_name != ref_step_name:
-                        raise ValueError("Incorrect sequence of steps provided for manual execution. Step #%s should"
-                                         " be named '%s', found '%s'" % (i+1, ref_step_name, step_name))
-                    steps_monitor.execute(step_name, args, kwargs)
+                if branch_idx is None:
+                    branches_params = (None, )
+                elif step_names is not step_ids:
+                    raise ValueError("Specific steps can not be executed manually when `step_params` is used")
+                else:
+                    # execute each branch entirely
+                    branches_params = [variant.params for variant in parametrized_steps
+                                       if variant.step is step_ids[branch_idx]]
+                for params in branches_params:
+                    steps_monitor = StepsMonitor(step_ids, test_func, args, kwargs)
+                    for i, (step_name, ref_step_name) in enumerate(zip(step_names, step_ids)):
+                        if step_name != ref_step_name:
+                            raise ValueError("Incorrect sequence of steps provided for manual execution. Step #%s "
+                                             "should be named '%s', found '%s'" % (i+1, ref_step_name, step_name))
+                        steps_monitor.execute(step_name, args, kwargs, params if i == branch_idx else None)
+            elif isinstance(step_name, _StepVariant):
+                # a step of a test instance with a `step_params` branch point
+                variant, step_name = step_name, step_name.step
+                if not variant.branch:
+                    # a common step
+                    steps_monitor = all_monitors.get_execution_monitor(request.node, args, kwargs)
+                    steps_monitor.execute(step_name, args, kwargs, pytest_node=request.node)
+                    return
+
+                # Retrieve or create the execution monitor of this branch
+                fork = request.config.getoption(STEPS_FORK_OPTION, False)
+                steps_monitor, created = all_monitors.get_branch_execution_monitor(request.node, variant.branch, args,
+                                                                                   kwargs, variant.params, fork)
+                try:
+                    # the parameters of the branch are sent to the generator with its first step in this branch
+                    steps_monitor.execute(step_name, args, kwargs, variant.params if created else None,
+                                          pytest_node=request.node)
+                finally:
+                    info = get_steps_item_info(request.node)
+                    if info is not None and info.is_last:
+                        # last collected step of this instance (whatever its outcome): no monitor will be used anymore
+                        all_monitors.evict_instance_monitors(info.instance_key)
+                    elif step_name == step_ids[-1]:
+                        # last step of this branch (whatever its outcome): the monitor will not be used anymore
+                        all_monitors.evict_execution_monitor(request.node, variant.branch)
             else:
                 # Retrieve or create the corresponding execution monitor
                 steps_monitor = all_monitors.get_execution_monitor(request.node, args, kwargs)
 
                 # execute the step
                 # print("DEBUG - executing step %s" % step_name)
-                steps_monitor.execute(step_name, args, kwargs)
+                try:
+                    steps_monitor.execute(step_name, args, kwargs, pytest_node=request.node)
+                finally:
+                    info = get_steps_item_info(request.node)
+                    if info.is_last if info is not None else step_name == step_ids[-1]:
+                        # last collected step of this instance (whatever its outcome, even if the next steps were
+                        # deselected): the monitor will not be used anymore
+                        all_monitors.evict_execution_monitor(request.node)
 
         # With this hack we will be ordered correctly by pytest https://github.com/pytest-dev/pytest/issues/4429
         wrapped_test_function.place_as = test_func
 
+        # Expose the steps and the monitors container so that the plugin can reach them from the pytest items
+        setattr(wrapped_test_function, STEPS_FIELD, (test_step_argname, step_ids))
+        setattr(wrapped_test_function, STEPS_MONITORS_FIELD, all_monitors)
+
         # Parametrize the wrapper function with the test step ids
-        parametrizer = pytest.mark.parametrize(test_step_argname, step_ids, ids=str)
+        parametrizer = pytest.mark.parametrize(test_step_argname, parametrized_steps, ids=parametrized_ids)
 
         # finally apply parametrizer
         parametrized_step_function_wrapper = parametrizer(wrapped_test_function)
@@ -0,0 +1,89 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+from .steps_timing import steps_timer, set_step_timing
+from .steps_profile import steps_profiler
+from .steps_memory import steps_memory_tracker, STEP_MEMORY_FIELD
+from .steps_resources import steps_resources_tracker, STEP_RESOURCES_FIELD
+
+
+class StepMeasures(object):
+    """
+    A context manager wrapping the body of a step, that takes the measures enabled for the session: its duration
+    (`--steps-durations`), its profile (`--steps-profile`), its memory allocations (`--steps-memory`) and its OS
+    resource usage (`--steps-resources`). The duration is stored in `self.timing` when the step exits, whatever its
+    outcome. If a pytest node is provided, all measures are also stored on it so that the plugin can attach them to the
+    test report. Otherwise only the duration is measured.
+
+    Use `measure_step` to create it: nothing is done at all when no measure is enabled.
+    """
+    __slots__ = ('pytest_node', 'timing', '_timing', '_profile', '_memory', '_resources')
+
+    def __init__(self, pytest_node=None):
+        self.pytest_node = pytest_node
+        self.timing = None
+        self._timing = None
+        self._profile = None
+        self._memory = None
+        self._resources = None
+
+    def __enter__(self):
+        # the memory snapshot is not part of the duration nor of the profile
+        if self.pytest_node is not None and steps_memory_tracker.enabled:
+            self._memory = steps_memory_tracker.start()
+        if self.pytest_node is not None and steps_resources_tracker.enabled:
+            self._resources = steps_resources_tracker.start()
+        if steps_timer.enabled:
+            self._timing = steps_timer.start()
+        if self.pytest_node is not None and steps_profiler.enabled:
+            self._profile = steps_profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        profile = self._profile
+        if profile is not None:
+            profile.disable()
+        if self._timing is not None:
+            self.timing = steps_timer.stop(self._timing)
+            self._timing = None
+        if self._resources is not None:
+            setattr(self.pytest_node, STEP_RESOURCES_FIELD, steps_resources_tracker.stop(self._resources))
+            self._resources = None
+        if profile is not None:
+            self._profile = None
+            steps_profiler.add(self.pytest_node, profile)
+        if self.timing is not None and self.pytest_node is not None:
+            set_step_timing(self.pytest_node, self.timing)
+        if self._memory is not None:
+            setattr(self.pytest_node, STEP_MEMORY_FIELD, steps_memory_tracker.stop(self._memory))
+            self._memory = None
+
+
+class _NoMeasures(object):
+    """ The context manager used when no measure is enabled: it does nothing """
+    __slots__ = ()
+    timing = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NO_MEASURES = _NoMeasures()
+
+
+def measure_step(pytest_node=None):
+    """
+    Returns a context manager to wrap the body of the step of `pytest_node`, that takes the measures enabled for the
+    session, see `StepMeasures`. When no measure is enabled, a shared context manager doing nothing is returned.
+
+    :param pytest_node: the pytest node of the step, if any. The measures are stored on it.
+    :return:
+    """
+    node_measures = steps_profiler.enabled or steps_memory_tracker.enabled or steps_resources_tracker.enabled
+    if steps_timer.enabled or (pytest_node is not None and node_measures):
+        return StepMeasures(pytest_node)
+    return _NO_MEASURES
@@ -0,0 +1,273 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+from functools import wraps
+from hashlib import sha256
+from inspect import getsource
+import os
+import pickle
+from warnings import warn
+
+from .steps_checkpoint import dump_file, load_file, PICKLE_PROTOCOL, _OUT_OF_BAND
+from .steps_parametrizer import StepsDataHolder
+
+MEMOIZE_DIR = 'steps_memoize'
+MEMOIZE_MAXSIZE_OPTION = 'steps_memoize_maxsize'
+MEMOIZE_MAXSIZE_DEFAULT = 1024
+NO_MEMOIZE_OPTION = 'steps_no_memoize'
+
+
+class StepsMemoizeCache(object):
+    """
+    The session-level disk cache of the outputs of the steps decorated with `@memoize_step`. It is configured by the
+    plugin at session start, in the pytest cache directory.
+
+    There is one file per entry, named after its key. When the total size of the files exceeds `maxsize` bytes, the
+    least recently used entries are removed (the modification time of a file is updated when it is used).
+    """
+    __slots__ = ('directory', 'maxsize', '_size')
+
+    def __init__(self):
+        self.directory = None
+        self.maxsize = None
+        # the total size of the files, computed when the first entry is stored
+        self._size = None
+
+    def reset(self, directory=None, maxsize=None):
+        """
+        Enables the cache if `directory` is not None, or disables it.
+
+        :param directory: the directory where the entries are stored
+        :param maxsize: the maximum total size of the entries, in bytes. `None` means no limit.
+        :return:
+        """
+        self.directory = directory
+        self.maxsize = maxsize
+        self._size = None
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        """
+        Returns the entry stored for `key`, or None.
+
+        :param key:
+        :return:
+        """
+        path = self._path(key)
+        try:
+            _, entry = load_file(path)
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        except Exception:
+            # a corrupt entry, or an entry that can not be unpickled anymore (for example a class was renamed)
+            try:
+                os.remove(path)
+            except (IOError, OSError):
+                pass
+            return None
+        return entry
+
+    def set(self, key, entry):
+        """
+        Stores `entry` for `key`, and removes the least recently used entries if the size limit is exceeded.
+
+        :param key:
+        :param entry: a picklable object
+        :return:
+        """
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._list_files())
+        path = self._path(key)
+        try:
+            # the entry is replaced
+            self._size -= os.path.getsize(path)
+        except (IOError, OSError):
+            pass
+        self._size += dump_file(path, key, entry)
+
+        if self.maxsize is not None and self._size > self.maxsize:
+            for mtime, size, path in sorted(self._list_files()):
+                if self._size <= self.maxsize:
+                    break
+                try:
+                    os.remove(path)
+                except (IOError, OSError):
+                    # removed by another process (for example another pytest-xdist worker)
+                    pass
+                self._size -= size
+
+    def _list_files(self):
+        """ Returns a list of tuples (mtime, size, path) for all entries """
+        files = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.pkl'):
+                path = os.path.join(self.directory, file_name)
+                try:
+                    stat = os.stat(path)
+                except (IOError, OSError):
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+
+steps_memoize_cache = StepsMemoizeCache()
+"""The session-level disk cache used by `@memoize_step`."""
+
+
+def _get_source(step):
+    """ Returns the source code of `step`, or its bytecode if the source is not available """
+    try:
+        return getsource(step).encode('utf-8')
+    except (IOError, OSError, TypeError):
+        code = step.__code__
+        return code.co_code + repr(code.co_consts).encode('utf-8')
+
+
+def _hash_pickle(h, obj):
+    """ Updates hash `h` with the pickled `obj`, hashing its large buffers without copying them """
+    if _OUT_OF_BAND:
+        buffers = []
+        h.update(pickle.dumps(obj, PICKLE_PROTOCOL, buffer_callback=buffers.append))
+        for b in buffers:
+            h.update(b.raw())
+    else:
+        h.update(pickle.dumps(obj, PICKLE_PROTOCOL))
+
+
+def _canonical(obj):
+    """
+    Returns a version of `obj` whose pickle does not depend on the order of the items of its dicts and sets, that
+    changes across sessions (the hash of strings is randomized). As with the default hash functions of the parameters
+    (see `_hash_mapping` and `_hash_set`), dicts and sets are compared regardless of their order, including when they
+    are nested in lists, tuples, dicts or sets. The hashes themselves can not be used since they are only valid in the
+    current process: the items are sorted by their pickle instead.
+
+    :param obj:
+    :return:
+    """
+    t = type(obj)
+    if t is list:
+        return [_canonical(o) for o in obj]
+    elif t is tuple:
+        return tuple(_canonical(o) for o in obj)
+    elif isinstance(obj, dict):
+        return t, _sorted_by_pickle([(_canonical(k), _canonical(v)) for k, v in obj.items()])
+    elif isinstance(obj, (set, frozenset)):
+        return t, _sorted_by_pickle([_canonical(o) for o in obj])
+    return obj
+
+
+def _sorted_by_pickle(items):
+    """ Returns a list with `items` sorted by their pickle, that is deterministic """
+    return [o for _, o in sorted(((pickle.dumps(o, PICKLE_PROTOCOL), i), o) for i, o in enumerate(items))]
+
+
+def _digest(obj):
+    """ Returns a digest of the pickled `obj`, or None if it can not be pickled """
+    h = sha256()
+    try:
+        _hash_pickle(h, obj)
+    except Exception:
+        return None
+    return h.digest()
+
+
+_MISSING = object()
+
+
+def memoize_step(*inputs):
+    """
+    Decorates a test step used in explicit mode so that what it writes in the `StepsDataHolder` is stored in a disk
+    cache, and restored instead of executing the step again in the next sessions, as long as nothing changed.
+
+    ```python
+    @memoize_step('data')
+    def fit(steps_data, alpha):
+        steps_data.model = expensive_fit(steps_data.data, alpha)
+    ```
+
+    The entries are identified by a hash of the source code of the step, of all the other arguments received by the
+    step (typically the parameters of the test instance), and of the values of the attributes of the holder that are
+    declared in `inputs`. The order of the items of the dicts and sets does not matter. The step must declare all the
+    attributes that it reads from the holder, otherwise outdated results could be restored. Note that only the source
+    code of the step function itself is used: a modification of a function that it calls does not invalidate the
+    cache.
+
+    The attributes written by the step are detected by value: the attributes that are replaced, deleted, or modified in
+    place (for example a list to which the step appends an element) are stored. To do so every attribute of the holder
+    is pickled before and after the step, when it is not restored from the cache.
+
+    The cache is stored in the pytest cache directory, its size is limited with `--steps-memoize-maxsize`, and it can
+    be bypassed with `--steps-no-memoize`. The arguments, inputs and written attributes must be picklable, otherwise
+    the step is executed normally. When the decorated step is called outside of a pytest session, it is executed
+    normally.
+
+    :param inputs: the names of the attributes of the `StepsDataHolder` that the step reads.
+    :return:
+    """
+    if len(inputs) == 1 and callable(inputs[0]):
+        # used without parenthesis
+        return memoize_step()(inputs[0])
+
+    def decorator(step):
+        source = _get_source(step)
+
+        @wraps(step)
+        def memoized_step(*args, **kwargs):
+            if not steps_memoize_cache.enabled:
+                return step(*args, **kwargs)
+
+            # find the holder: the other arguments are the parameters of the step
+            holder = next((a for a in args if isinstance(a, StepsDataHolder)), None)
+            if holder is None:
+                holder = next((a for a in kwargs.values() if isinstance(a, StepsDataHolder)), None)
+                if holder is None:
+                    return step(*args, **kwargs)
+            params = ([a for a in args if a is not holder],
+                      sorted((k, a) for k, a in kwargs.items() if a is not holder))
+            contents = vars(holder)
+
+            # the key
+            h = sha256(source)
+            try:
+                _hash_pickle(h, _canonical((params, [(name, contents.get(name)) for name in inputs])))
+            except Exception as e:
+                warn("The arguments or inputs of step %s can not be pickled, it is not memoized: %r"
+                     % (step.__name__, e))
+                return step(*args, **kwargs)
+            key = h.hexdigest()
+
+            entry = steps_memoize_cache.get(key)
+            if entry is not None:
+                # restore what the step wrote
+                written, deleted, res = entry
+                contents.update(written)
+                for name in deleted:
+                    contents.pop(name, None)
+                return res
+
+            # the attributes modified in place are detected with their digests, the unpicklable ones by identity
+            before = dict(contents)
+            digests = {name: _digest(v) for name, v in before.items()}
+            res = step(*args, **kwargs)
+            written = {name: v for name, v in contents.items()
+                       if before.get(name, _MISSING) is not v
+                       or (digests[name] is not None and _digest(v) != digests[name])}
+            deleted = [name for name in before if name not in contents]
+            try:
+                steps_memoize_cache.set(key, (written, deleted, res))
+            except Exception as e:
+                warn("The outputs of step %s could not be memoized: %r" % (step.__name__, e))
+            return res
+
+        return memoized_step
+
+    return decorator
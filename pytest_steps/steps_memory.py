@@ -0,0 +1,163 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+import os
+
+try:  # python 3.4+
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from .steps_common import get_step_name
+
+STEP_MEMORY_FIELD = '__steps_memory__'
+STEPS_MEMORY_OPTION = 'steps_memory'
+
+# the number of allocation sites attached to the report of each step
+SITES_PER_STEP = 10
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StepsMemoryTracker(object):
+    """
+    The session-level tracker of the memory allocated by the steps, enabled with `--steps-memory`. A tracemalloc
+    snapshot is taken before and after the body of each step, to measure the memory that it allocated and did not
+    release (net), the peak of memory during the step, and the allocation sites of the net memory.
+
+    Note that the snapshots are expensive: they are taken only when this is enabled.
+    """
+    __slots__ = ('enabled', '_filters', '_started')
+
+    def __init__(self):
+        self.enabled = False
+        self._filters = None
+        # True if tracemalloc was started by the tracker
+        self._started = False
+
+    def reset(self, enabled=False):
+        """
+        Enables the tracker and starts tracemalloc if needed, or disables the tracker and stops tracemalloc if it was
+        started by the tracker.
+
+        :param enabled:
+        :return:
+        """
+        self.enabled = enabled
+        if self._started and not enabled:
+            tracemalloc.stop()
+            self._started = False
+        if enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            # the allocations of tracemalloc and of pytest-steps itself are ignored
+            self._filters = (tracemalloc.Filter(False, tracemalloc.__file__),
+                             tracemalloc.Filter(False, os.path.join(_PACKAGE_DIR, '*')))
+
+    def start(self):
+        """ Returns the state before a step: a snapshot and the size of the traced memory """
+        snapshot = tracemalloc.take_snapshot()
+        if hasattr(tracemalloc, 'reset_peak'):  # python 3.9+
+            tracemalloc.reset_peak()
+        return snapshot, tracemalloc.get_traced_memory()[0]
+
+    def stop(self, state):
+        """
+        Returns the memory allocated by a step since `start` returned `state`: a tuple (net allocated bytes, peak bytes
+        or None if it can not be measured, list of the top allocation sites). Each site is a tuple (description, net
+        allocated bytes).
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        before_snapshot, before = state
+        peak = peak - before if hasattr(tracemalloc, 'reset_peak') else None
+
+        snapshot, before_snapshot = snapshot.filter_traces(self._filters), before_snapshot.filter_traces(self._filters)
+        diffs = snapshot.compare_to(before_snapshot, 'lineno')
+        sites = []
+        for diff in diffs:
+            if diff.size_diff <= 0:
+                continue
+            frame = diff.traceback[0]
+            sites.append(("%s:%s" % (os.path.basename(frame.filename), frame.lineno), diff.size_diff))
+            if len(sites) == SITES_PER_STEP:
+                break
+        return current - before, peak, sites
+
+
+steps_memory_tracker = StepsMemoryTracker()
+"""The session-level tracker of `--steps-memory`."""
+
+
+def get_step_memory_report(item, info):
+    """
+    Returns the memory allocated by the step of `item`, whose `StepsItemInfo` is `info`, as it is attached to the test
+    report: a dictionary with the step name, the net allocated bytes, the peak bytes and the top allocation sites.
+    Returns None if the step was not executed.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    measure = getattr(item, STEP_MEMORY_FIELD, None)
+    if measure is None:
+        return None
+    net, peak, sites = measure
+    return dict(step=get_step_name(item, info.test_step_argname), net=net, peak=peak, sites=sites)
+
+
+class StepsMemory(object):
+    """
+    The session-level registry of the memory allocated by the steps, filled from the test reports when
+    `--steps-memory` is used. The measures are grouped by step, across all test instances.
+    """
+    __slots__ = ('enabled', 'steps')
+
+    def __init__(self):
+        self.enabled = False
+        # a dict step name -> [count, total net bytes, max net bytes, max peak bytes, dict site -> total net bytes]
+        self.steps = dict()
+
+    def reset(self, enabled=False):
+        self.enabled = enabled
+        self.steps.clear()
+
+    def add(self, memory_report):
+        """
+        Registers the memory allocated by a step, received in a test report.
+
+        :param memory_report: a dictionary created by `get_step_memory_report`
+        :return:
+        """
+        entry = self.steps.get(memory_report['step'])
+        if entry is None:
+            entry = self.steps[memory_report['step']] = [0, 0, None, None, dict()]
+        net, peak = memory_report['net'], memory_report['peak']
+        entry[0] += 1
+        entry[1] += net
+        entry[2] = net if entry[2] is None else max(entry[2], net)
+        if peak is not None:
+            entry[3] = peak if entry[3] is None else max(entry[3], peak)
+        sites = entry[4]
+        for site, size in memory_report['sites']:
+            sites[site] = sites.get(site, 0) + size
+
+    def get_summary(self, top_sites):
+        """
+        Returns a list of tuples (step name, number of test instances, mean net bytes, max net bytes, max peak bytes,
+        list of the `top_sites` allocation sites with the highest net bytes across test instances), sorted by
+        decreasing peak (or net bytes if the peak is not available). Each site is a tuple (description, total net
+        bytes).
+        """
+        summary = []
+        for step_name, (count, total_net, max_net, max_peak, sites) in self.steps.items():
+            top = sorted(sites.items(), key=lambda s: s[1], reverse=True)[:top_sites]
+            summary.append((step_name, count, total_net / float(count), max_net, max_peak, top))
+        summary.sort(key=lambda s: s[3] if s[4] is None else s[4], reverse=True)
+        return summary
+
+
+steps_memory = StepsMemory()
+"""The session-level registry of the memory allocated by the steps."""
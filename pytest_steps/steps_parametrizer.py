@@ -2,13 +2,10 @@
 #          + All contributors to <https://github.com/smarie/python-pytest-steps>
 #
 # License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
-
+from collections import OrderedDict
+from functools import partial
 from sys import version_info
-
-try:  # python 3.2+
-    from functools import lru_cache
-except ImportError:
-    from functools32 import lru_cache
+from warnings import warn
 
 try:  # python 3.3+
     from inspect import signature, Parameter
@@ -16,10 +13,15 @@ except ImportError:
     from funcsigs import signature, Parameter
 
 from inspect import getmodule
-from makefun import wraps, add_signature_parameters, with_signature
+from makefun import wraps, add_signature_parameters, remove_signature_parameters, with_signature
 
 import pytest
-from .steps_common import create_pytest_param_str_id, get_fixture_or_param_value, get_pytest_node_hash_id
+from .steps_common import create_pytest_param_str_id, get_fixture_or_param_value, get_steps_instance_key, \
+    STEPS_FIELD, get_steps_item_info, add_instance_finalizer, step_params, _StepVariant, get_step, \
+    expand_steps_variants, get_branch_key
+from .steps_checkpoint import steps_checkpoints, get_steps_instance_name
+from .steps_circuit_breaker import steps_circuit_breaker
+from .steps_measures import measure_step
 
 
 class StepsDataHolder:
@@ -32,7 +34,129 @@ class StepsDataHolder:
     pass
 
 
-STEP_SUCCESS_FIELD = "__test_step_successful_for__"
+class StepsDataHoldersCache(OrderedDict):
+    """
+    The cache of `StepsDataHolder` objects used by a test function, with one holder per test instance (i.e. per
+    combination of parameters, except the step).
+
+    A holder is evicted as soon as the last step of its instance has been torn down, so that everything that the steps
+    stored in it can be garbage-collected. In addition an optional `maxsize` can be provided to bound the number of
+    live holders, for example when steps are executed out of order: when it is reached the least recently used holder
+    is evicted.
+    """
+    def __init__(self):
+        OrderedDict.__init__(self)
+        # the keys of holders that were evicted because maxsize was reached, before their last step
+        self.evicted_early = set()
+
+    def get_or_create(self, key, maxsize=None, copy_from=None):
+        """
+        Returns the holder for instance `key`, or creates it if it does not exist yet.
+
+        :param key: the step-independent id of the test instance
+        :param maxsize: an optional maximum number of live holders. `None` (default) means no limit.
+        :param copy_from: an optional key of another holder. If provided and the holder is created, it will be a
+            shallow copy of that other holder. This is used for the branches created by `step_params`.
+        :return:
+        """
+        try:
+            holder = self[key]
+        except KeyError:
+            if key in self.evicted_early:
+                self.evicted_early.remove(key)
+                warn("The StepsDataHolder for test instance %s was evicted before its last step because the maximum "
+                     "number of live holders (%s) was reached. A new empty one is created. Consider increasing "
+                     "`--steps-holders-maxsize`." % (key, maxsize))
+            holder = self[key] = StepsDataHolder()  # TODO use Munch or MaxiMunch from `mixture` project?
+            if copy_from is not None:
+                parent = self.get(copy_from)
+                if parent is not None:
+                    vars(holder).update(vars(parent))
+                elif copy_from in self.evicted_early:
+                    warn("The StepsDataHolder for test instance %s was evicted before the first step of its branch %s "
+                         "because the maximum number of live holders (%s) was reached. The holder of the branch is "
+                         "created empty. Consider increasing `--steps-holders-maxsize`." % (copy_from, key, maxsize))
+            if maxsize is not None:
+                while len(self) > maxsize:
+                    lru_key, _ = self.popitem(last=False)
+                    self.evicted_early.add(lru_key)
+        else:
+            # mark it as the most recently used (`move_to_end` is not available in python 2)
+            del self[key]
+            self[key] = holder
+        return holder
+
+    def evict(self, key):
+        """
+        Removes the holder for instance `key`, if any.
+
+        :param key:
+        :return:
+        """
+        self.pop(key, None)
+        self.evicted_early.discard(key)
+
+
+class StepsOutcomesRegistry(object):
+    """
+    The session-level registry of step outcomes for all parametrizer-mode test instances where `@depends_on` is used.
+
+    For each test instance, the executed steps and the successful steps are stored as two bitsets (python ints) where
+    bit `i` represents the step at position `i`. Checking that all dependencies of a step are successful is therefore a
+    single mask operation. The entries of a test instance are evicted when the instance finishes.
+    """
+    __slots__ = ('executed', 'succeeded')
+
+    def __init__(self):
+        self.executed = dict()
+        self.succeeded = dict()
+
+    def reset(self):
+        self.executed.clear()
+        self.succeeded.clear()
+
+    def mark_executed(self, instance_key, step_idx, parent_key=None):
+        """
+        Marks step `step_idx` of test instance `instance_key` as executed (successful or not).
+
+        :param parent_key: an optional key of another entry, from which the outcomes are inherited if this is the first
+            step executed for `instance_key`. This is used for the branches created by `step_params`.
+        :return: True if this is the first step executed for this test instance
+        """
+        executed = self.executed.get(instance_key)
+        if executed is None:
+            self.executed[instance_key] = self.executed.get(parent_key, 0) | (1 << step_idx)
+            self.succeeded[instance_key] = self.succeeded.get(parent_key, 0)
+            return True
+        else:
+            self.executed[instance_key] = executed | (1 << step_idx)
+            return False
+
+    def mark_succeeded(self, instance_key, step_idx):
+        """ Marks step `step_idx` of test instance `instance_key` as successful. """
+        self.succeeded[instance_key] |= (1 << step_idx)
+
+    def all_executed(self, instance_key, mask):
+        """ Returns True if all steps in bitset `mask` have been executed for test instance `instance_key` """
+        return self.executed.get(instance_key, 0) & mask == mask
+
+    def all_succeeded(self, instance_key, mask):
+        """ Returns True if all steps in bitset `mask` have succeeded for test instance `instance_key` """
+        return self.succeeded.get(instance_key, 0) & mask == mask
+
+    def evict(self, instance_key):
+        """ Removes all outcomes stored for test instance `instance_key` """
+        self.executed.pop(instance_key, None)
+        self.succeeded.pop(instance_key, None)
+
+
+steps_outcomes = StepsOutcomesRegistry()
+"""The session-level registry of step outcomes used by `@depends_on`."""
+
+
+STEPS_HOLDERS_FIELD = "__steps_holders__"
+STEPS_DEPENDENCIES_FIELD = "__steps_dependencies__"
+HOLDERS_MAXSIZE_OPTION = "steps_holders_maxsize"
 
 
 def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
@@ -45,6 +169,21 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
     :param test_step_argname:
     :return:
     """
+    # Make sure that all steps run after the steps they depend on
+    steps = _sort_steps(steps)
+
+    if any(isinstance(step, step_params) for step in steps):
+        # Some steps are parametrized on their own: the parametrized values are the steps in all branches
+        parametrized_steps = expand_steps_variants(steps)
+        parametrized_ids = [variant.id for variant in parametrized_steps]
+        steps_argnames = tuple(sorted(set(argname for step in steps if isinstance(step, step_params)
+                                          for argname in step.argnames)))
+        steps = [get_step(step) for step in steps]
+    else:
+        parametrized_steps = steps
+        parametrized_ids = None
+        steps_argnames = ()
+
     def steps_decorator(test_func):
         """
         The generated test function decorator.
@@ -58,21 +197,19 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
 
         # Step ids
         step_ids = [create_pytest_param_str_id(f) for f in steps]
+        param_ids = step_ids if parametrized_ids is None else parametrized_ids
 
-        # Depending on the presence of steps_data_holder_name in signature, create a cached fixture for steps data
+        # The arguments of `step_params` are provided by the wrapper, not by pytest
         s = signature(test_func)
-        if steps_data_holder_name in s.parameters:
-            # the user wishes to share results across test steps. Create a cached fixture
-            @lru_cache(maxsize=None)
-            def get_results_holder(**kwargs):
-                """
-                A factory for the StepsDataHolder objects. Since it uses @lru_cache, the same StepsDataHolder will be
-                returned when the keyword arguments are the same.
+        for argname in steps_argnames:
+            if argname not in s.parameters:
+                raise ValueError("Test function %s should have an argument named '%s', used in `step_params`"
+                                 % (test_func.__name__, argname))
 
-                :param kwargs:
-                :return:
-                """
-                return StepsDataHolder()  # TODO use Munch or MaxiMunch from `mixture` project, when publicly available?
+        # Depending on the presence of steps_data_holder_name in signature, create a cached fixture for steps data
+        if steps_data_holder_name in s.parameters:
+            # the user wishes to share results across test steps. Create a cache of holders
+            holders = StepsDataHoldersCache()
 
             def results(request):
                 """
@@ -80,7 +217,8 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
 
                 It is function-scoped (so oit is called for each step of each param combination)
                 but it implements an intelligent cache so that the same StepsDataHolder object is returned across all
-                test steps belonging to the same param combination.
+                test steps belonging to the same param combination. The holder is evicted from the cache after the
+                last step.
 
                 :param request:
                 :return:
@@ -89,10 +227,42 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
                 # The id should be different everytime anything changes, except when the test step changes
                 # Note: when the id was using not only param values but also fixture values we had to discard
                 # steps_data_holder_name and 'request'. But that's not the case anymore,simply discard "test step" param
-                test_id = get_pytest_node_hash_id(request.node, params_to_ignore={test_step_argname})
+                info = get_steps_item_info(request.node)
+                if info is not None:
+                    test_id, branch, is_last = info.instance_key, info.branch, info.is_last
+                else:
+                    step = get_fixture_or_param_value(request, test_step_argname)
+                    test_id = get_steps_instance_key(request.node, test_step_argname)
+                    branch = step.branch if isinstance(step, _StepVariant) else ()
+                    is_last = step is parametrized_steps[-1]
+                maxsize = request.config.getoption(HOLDERS_MAXSIZE_OPTION, None)
+
+                key = get_branch_key(test_id, branch)
+                checkpoint = None
+                if key not in holders and info is not None and steps_checkpoints.enabled:
+                    # first step executed for this instance (or branch) in this session
+                    checkpoint = _restore_checkpoint(request.node, info,
+                                                     lambda b: get_branch_key(test_id, b) in holders)
+
+                # Evict it after the last step of the test instance, whatever its outcome and even if this fixture is
+                # not created for that step (for example if it is skipped)
+                if key not in holders and info is not None:
+                    add_instance_finalizer(test_id, partial(holders.evict, key))
+                elif info is None and is_last:
+                    request.addfinalizer(lambda: holders.evict(test_id))
+
+                if not branch:
+                    # Get or create the cached Result holder for this combination of parameters
+                    holder = holders.get_or_create(test_id, maxsize=maxsize)
+                else:
+                    # In a branch created by `step_params`: the holder is a copy of the one of the parent branch
+                    holder = holders.get_or_create(key, maxsize=maxsize,
+                                                   copy_from=get_branch_key(test_id, branch[:-1]))
+
+                if checkpoint is not None:
+                    vars(holder).update(checkpoint)
 
-                # Get or create the cached Result holder for this combination of parameters
-                return get_results_holder(id=test_id)
+                return holder
 
             # Create a fixture with custom name : this seems to work also for old pytest versions
             results.__name__ = steps_data_holder_name
@@ -108,7 +278,7 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
                                  "`steps_data_holder_name` in `@test_steps`".format(steps_data_holder_name, module))
 
         # Parametrize the function with the test steps
-        parametrizer = pytest.mark.parametrize(test_step_argname, steps, ids=step_ids)
+        parametrizer = pytest.mark.parametrize(test_step_argname, parametrized_steps, ids=param_ids)
 
         # We will expose a new signature with additional 'request' arguments if needed
         orig_sig = signature(test_func)
@@ -119,6 +289,16 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
                                                                         kind=Parameter.POSITIONAL_OR_KEYWORD))
         else:
             new_sig = orig_sig
+        if steps_argnames:
+            new_sig = remove_signature_parameters(new_sig, *steps_argnames)
+
+        def _use_variant(kwargs):
+            """Replaces the step variant received from pytest with the step and its parameters. Returns the branch"""
+            variant = kwargs[test_step_argname]
+            kwargs[test_step_argname] = variant.step
+            for argname in steps_argnames:
+                kwargs[argname] = variant.params.get(argname)
+            return variant.branch
 
         # Finally, if there are some steps that are marked as having a dependency,
         use_dependency = any(hasattr(step, DEPENDS_ON_FIELD) for step in steps)
@@ -130,10 +310,17 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
                 request = kwargs['request'] if func_needs_request else kwargs.pop('request')
                 if request is None:
                     # manual call (maybe for pre-loading?), ability to execute several steps
-                    _execute_manually(test_func, s, test_step_argname, step_ids, steps, args, kwargs)
+                    _execute_manually(test_func, s, test_step_argname, param_ids, parametrized_steps, args,
+                                      kwargs, steps_argnames)
                 else:
-                    return test_func(*args, **kwargs)
+                    if steps_argnames:
+                        _use_variant(kwargs)
+                    with measure_step(request.node):
+                        return test_func(*args, **kwargs)
         else:
+            # Precompute the bitset of dependencies of each step
+            dependencies_masks = _get_dependencies_masks(steps)
+
             # Create a test function wrapper that will replace the test steps with monitored ones before injecting them
             @wraps(test_func, new_sig=new_sig)
             def wrapped_test_function(*args, **kwargs):
@@ -141,50 +328,44 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
                 request = kwargs['request'] if func_needs_request else kwargs.pop('request')
                 if request is None:
                     # manual call (maybe for pre-loading?), no dependency management, ability to execute several steps
-                    _execute_manually(test_func, s, test_step_argname, step_ids, steps, args, kwargs)
+                    _execute_manually(test_func, s, test_step_argname, param_ids, parametrized_steps, args,
+                                      kwargs, steps_argnames)
                 else:
-                    # (a) retrieve the "current step" function
-                    current_step_fun = get_fixture_or_param_value(request, test_step_argname)
-
-                    # Get the unique id that is shared between the steps of the same execution
-                    # Note: when the id was using not only param values but also fixture values we had to discard
-                    # steps_data_holder_name and 'request'. But that's not the case anymore, simply discard "test step"
-                    test_id_without_steps = get_pytest_node_hash_id(request.node, params_to_ignore={test_step_argname})
-
-                    # Make sure that it has a field to store its execution success
-                    if not hasattr(current_step_fun, STEP_SUCCESS_FIELD):
-                        # this is a dict where the key is the `test_id_without_steps` and the value is a boolean
-                        setattr(current_step_fun, STEP_SUCCESS_FIELD, dict())
-
-                    # (b) skip or fail it if needed
-                    dependencies, should_fail = getattr(current_step_fun, DEPENDS_ON_FIELD, ([], False))
-                    # -- check that dependencies have all run (execution order is correct)
-                    if not all(hasattr(step, STEP_SUCCESS_FIELD) for step in dependencies):
-                        raise ValueError("Test step {} depends on another step that has not yet been executed. In "
-                                         "current version the steps execution order is manual, make sure it is correct."
-                                         "".format(current_step_fun.__name__))
-                    # -- check that dependencies all ran with success
-                    deps_successess = {step: getattr(step, STEP_SUCCESS_FIELD).get(test_id_without_steps, False)
-                                       for step in dependencies}
-                    failed_deps = [d.__name__ for d, res in deps_successess.items() if res is False]
-                    if not all(deps_successess.values()):
-                        msg = "This test step depends on other steps, and the following have failed: %s" % failed_deps
-                        if should_fail:
-                            pytest.fail(msg)
-                        else:
-                            pytest.skip(msg)
+                    branch = _use_variant(kwargs) if steps_argnames else ()
+
+                    # (a) retrieve the position of the "current step", and the unique id that is shared between the
+                    # steps of the same execution
+                    info = get_steps_item_info(request.node)
+                    if info is not None:
+                        # computed at collection time. The dependencies were checked by the plugin before setup
+                        step_idx, test_id_without_steps = info.step_idx, info.instance_key
+                    else:
+                        current_step_fun = kwargs[test_step_argname]
+                        step_idx = _index_of(steps, current_step_fun)
+                        test_id_without_steps = get_steps_instance_key(request.node, test_step_argname)
+
+                        # (b) register the execution, and skip or fail it if needed
+                        _check_dependencies(steps, dependencies_masks, test_id_without_steps, step_idx, branch)
 
                     # (c) execute the test function for this step
-                    res = test_func(*args, **kwargs)
+                    with measure_step(request.node):
+                        res = test_func(*args, **kwargs)
 
                     # (d) declare execution as a success
-                    getattr(current_step_fun, STEP_SUCCESS_FIELD)[test_id_without_steps] = True
+                    steps_outcomes.mark_succeeded(get_branch_key(test_id_without_steps, branch), step_idx)
 
                     return res
 
         # With this hack we will be ordered correctly by pytest https://github.com/pytest-dev/pytest/issues/4429
         wrapped_test_function.place_as = test_func
 
+        # Expose the steps, the holders cache and the dependencies so that the plugin can reach them from the items
+        setattr(wrapped_test_function, STEPS_FIELD, (test_step_argname, steps))
+        if steps_data_holder_name in s.parameters:
+            setattr(wrapped_test_function, STEPS_HOLDERS_FIELD, holders)
+        if use_dependency:
+            setattr(wrapped_test_function, STEPS_DEPENDENCIES_FIELD, dependencies_masks)
+
         # finally apply parametrizer
         wrapped_parametrized_test_function = parametrizer(wrapped_test_function)
         return wrapped_parametrized_test_function
@@ -192,7 +373,271 @@ def get_parametrize_decorator(steps, steps_data_holder_name, test_step_argname):
     return steps_decorator
 
 
-def _execute_manually(test_func, s, test_step_argname, all_step_ids, all_steps, args, kwargs):
+def _index_of(steps, step):
+    """
+    Returns the position of `step` in `steps`, using identity and not equality.
+
+    :param steps:
+    :param step:
+    :return:
+    """
+    return next(i for i, s in enumerate(steps) if s is step)
+
+
+def _sort_steps(steps):
+    """
+    Returns a list containing the steps in `steps`, sorted so that each step comes after all steps it depends on
+    (declared with `@depends_on`). The sort is stable: steps that are already correctly ordered are not moved.
+
+    A `ValueError` is raised if the dependencies contain a cycle.
+
+    :param steps:
+    :return:
+    """
+    # note: as in _index_of, steps are compared by identity and a dependency is the first step with that identity
+    positions = dict()
+    for i, step in enumerate(steps):
+        positions.setdefault(id(get_step(step)), i)
+
+    _visiting, _done = 1, 2
+    states = [None] * len(steps)
+    sorted_steps = []
+
+    def _visit(i, path):
+        if states[i] == _done:
+            return
+        elif states[i] == _visiting:
+            cycle = path[path.index(i):] + [i]
+            raise ValueError("The dependencies between test steps contain a cycle: %s"
+                             % ' -> '.join(create_pytest_param_str_id(get_step(steps[j])) for j in cycle))
+
+        states[i] = _visiting
+        path.append(i)
+        dependencies, _ = getattr(get_step(steps[i]), DEPENDS_ON_FIELD, ((), False))
+        for dependency in dependencies:
+            j = positions.get(id(dependency))
+            if j is not None:
+                _visit(j, path)
+            # else: not one of the steps, the error will be raised by _get_dependencies_masks
+        path.pop()
+        states[i] = _done
+        sorted_steps.append(steps[i])
+
+    for i in range(len(steps)):
+        _visit(i, [])
+
+    return sorted_steps
+
+
+def _get_dependencies_masks(steps):
+    """
+    Returns a list containing, for each step in `steps`, the bitset of its dependencies declared with `@depends_on`:
+    bit `i` is set if the step depends on the step at position `i`.
+
+    :param steps:
+    :return:
+    """
+    masks = []
+    for step in steps:
+        dependencies, _ = getattr(step, DEPENDS_ON_FIELD, ((), False))
+        mask = 0
+        for dependency in dependencies:
+            try:
+                mask |= 1 << _index_of(steps, dependency)
+            except StopIteration:
+                raise ValueError("Test step %s depends on %s, which is not one of the steps of this test function"
+                                 % (create_pytest_param_str_id(step), create_pytest_param_str_id(dependency)))
+        masks.append(mask)
+    return masks
+
+
+def _check_dependencies(steps, dependencies_masks, instance_key, step_idx, branch=(), register_eviction=False):
+    """
+    Registers the execution of step `step_idx` of test instance `instance_key`, and skips or fails it if its
+    dependencies have not all succeeded.
+
+    :param steps: all the steps of the test function
+    :param dependencies_masks: the bitsets of dependencies of all steps, see `_get_dependencies_masks`
+    :param instance_key: the step-independent id of the test instance
+    :param step_idx: the position of the step
+    :param branch: the branch of the test instance when `step_params` is used. The outcomes of the parent branch are
+        inherited.
+    :param register_eviction: if True, the outcomes of this test instance will be evicted when it finishes.
+    :return:
+    """
+    # Register the execution
+    key = get_branch_key(instance_key, branch)
+    parent_key = get_branch_key(instance_key, branch[:-1]) if branch else None
+    if steps_outcomes.mark_executed(key, step_idx, parent_key) and register_eviction:
+        add_instance_finalizer(instance_key, partial(steps_outcomes.evict, key))
+
+    # Check that dependencies all ran with success. Note: the steps are sorted at decoration time, so dependencies
+    # that did not run were not selected or were not reached (for example with -x)
+    dependencies_mask = dependencies_masks[step_idx]
+    if dependencies_mask and not steps_outcomes.all_succeeded(key, dependencies_mask):
+        dependencies, should_fail = getattr(steps[step_idx], DEPENDS_ON_FIELD)
+        executed, succeeded = steps_outcomes.executed[key], steps_outcomes.succeeded[key]
+        failed_deps, not_executed_deps = [], []
+        for d in dependencies:
+            d_bit = 1 << _index_of(steps, d)
+            if not executed & d_bit:
+                not_executed_deps.append(d.__name__)
+            elif not succeeded & d_bit:
+                failed_deps.append(d.__name__)
+        reasons = []
+        if failed_deps:
+            reasons.append("the following have failed: %s" % failed_deps)
+        if not_executed_deps:
+            reasons.append("the following have not been executed: %s" % not_executed_deps)
+        msg = "This test step depends on other steps, and %s" % "; ".join(reasons)
+        if should_fail:
+            pytest.fail(msg)
+        else:
+            pytest.skip(msg)
+
+
+def check_dependencies_before_setup(item, info):
+    """
+    Called by the plugin before the setup of parametrizer-mode `item`, whose `StepsItemInfo` is `info`. Registers the
+    execution of the step, and skips or fails it right away if its dependencies have not all succeeded, so that none of
+    its fixtures (including the steps data holder) are created.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    try:
+        dependencies_masks = getattr(item.function, STEPS_DEPENDENCIES_FIELD)
+    except AttributeError:
+        # no step uses @depends_on
+        return
+
+    _, steps = getattr(item.function, STEPS_FIELD)
+    _check_dependencies(steps, dependencies_masks, info.instance_key, info.step_idx, info.branch,
+                        register_eviction=True)
+
+
+def get_dependencies_closure(item, step_idx):
+    """
+    Returns the positions of all the steps that step `step_idx` of parametrizer-mode `item` depends on, directly or
+    indirectly, according to `@depends_on`.
+
+    :param item: the pytest item
+    :param step_idx: the position of the step
+    :return:
+    """
+    try:
+        dependencies_masks = getattr(item.function, STEPS_DEPENDENCIES_FIELD)
+    except AttributeError:
+        # no step uses @depends_on
+        return ()
+
+    closure = 0
+    new = dependencies_masks[step_idx]
+    while new:
+        closure |= new
+        dependencies = 0
+        for j, mask in enumerate(dependencies_masks):
+            if new & (1 << j):
+                dependencies |= mask
+        new = dependencies & ~closure
+    return [j for j in range(len(dependencies_masks)) if closure & (1 << j)]
+
+
+def _restore_checkpoint(item, info, is_live):
+    """
+    Called when the `StepsDataHolder` of the test instance (or branch) of `item` is about to be created, if checkpoints
+    are enabled. Returns the contents to restore in it from the checkpoint of a previous session if `--steps-resume` is
+    used, or None.
+
+    In a branch created by `step_params`, if the branch has no checkpoint yet, the holder is a copy of the holder of the
+    parent branch. If that holder does not exist in this session (all the steps of the parent branch passed in a
+    previous session), the checkpoint of the parent branch is restored instead.
+
+    Without `--steps-resume`, the test instance is executed again from its first step so its checkpoint is outdated:
+    it is removed.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :param is_live: a function returning True if the holder of a given branch exists in this session
+    :return:
+    """
+    if not steps_checkpoints.resume:
+        steps_checkpoints.discard(get_steps_instance_name(item, info.test_step_argname, info.branch))
+        return None
+
+    branch = info.branch
+    while True:
+        checkpoint = steps_checkpoints.load(get_steps_instance_name(item, info.test_step_argname, branch))
+        if checkpoint is not None:
+            return checkpoint[1]
+        elif not branch:
+            return None
+        branch = branch[:-1]
+        if is_live(branch):
+            # the holder will be copied from the parent branch
+            return None
+
+
+def resume_step_before_setup(item, info):
+    """
+    Called by the plugin before the setup of parametrizer-mode `item`, whose `StepsItemInfo` is `info`, when
+    `--steps-resume` is used. Skips the step right away if it already passed in a previous session according to the
+    checkpoint of its test instance. The step is registered as successful, so that the steps depending on it can run.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    last_position = steps_checkpoints.get_step(get_steps_instance_name(item, info.test_step_argname, info.branch))
+    if last_position is None or info.position > last_position:
+        return
+
+    if hasattr(item.function, STEPS_DEPENDENCIES_FIELD):
+        key = get_branch_key(info.instance_key, info.branch)
+        parent_key = get_branch_key(info.instance_key, info.branch[:-1]) if info.branch else None
+        if steps_outcomes.mark_executed(key, info.step_idx, parent_key):
+            add_instance_finalizer(info.instance_key, partial(steps_outcomes.evict, key))
+        steps_outcomes.mark_succeeded(key, info.step_idx)
+
+    pytest.skip("This test step already passed in a previous session, it is not run again (--steps-resume)")
+
+
+def short_circuit_step_before_setup(item, info):
+    """
+    Called by the plugin before the setup of parametrizer-mode `item`, whose `StepsItemInfo` is `info`, when
+    `--steps-maxfail-per-step` is used, after its dependencies have been checked. If the step has already failed in too
+    many test instances, it is skipped right away. Since it is registered as executed but not successful, the steps
+    depending on it will be skipped too.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    if not steps_circuit_breaker.is_open(item, info):
+        return
+
+    pytest.skip(steps_circuit_breaker.get_message(item, info))
+
+
+def save_checkpoint_after_call(item, info):
+    """
+    Called by the plugin after parametrizer-mode `item`, whose `StepsItemInfo` is `info`, has been successfully
+    executed, when checkpoints are enabled. Saves the `StepsDataHolder` of its test instance, if any.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    holders = getattr(item.function, STEPS_HOLDERS_FIELD, None)
+    if holders is not None:
+        holder = holders.get(get_branch_key(info.instance_key, info.branch))
+        if holder is not None:
+            steps_checkpoints.save(get_steps_instance_name(item, info.test_step_argname, info.branch),
+                                   info.position, holder)
+
+
+def _execute_manually(test_func, s, test_step_argname, all_step_ids, all_steps, args, kwargs, steps_argnames=()):
     """
     Internal utility method to execute all steps of a test function manually
 
@@ -203,9 +648,11 @@ def _execute_manually(test_func, s, test_step_argname, all_step_ids, all_steps,
     :param all_steps:
     :param args:
     :param kwargs:
+    :param steps_argnames: the names of the arguments provided by `step_params`, if any
     :return:
     """
-    bound = s.bind(*args, **kwargs)
+    # the arguments of `step_params` are not received: they are set below for each step
+    bound = s.bind_partial(*args, **kwargs) if steps_argnames else s.bind(*args, **kwargs)
     steps_to_run = bound.arguments[test_step_argname]
     if steps_to_run is None:
         # print("@test_steps - decorated function '%s' is being called manually. The `%s` parameter is "
@@ -226,8 +673,10 @@ def _execute_manually(test_func, s, test_step_argname, all_step_ids, all_steps,
         except ValueError:
             pass
 
-        # set the step
-        bound.arguments[test_step_argname] = step
+        # set the step, and its parameters if it is parametrized with `step_params`
+        for argname in steps_argnames:
+            bound.arguments[argname] = step.params.get(argname) if isinstance(step, _StepVariant) else None
+        bound.arguments[test_step_argname] = get_step(step)
 
         # execute
         test_func(*bound.args, **bound.kwargs)
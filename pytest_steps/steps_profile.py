@@ -0,0 +1,160 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+from cProfile import Profile
+import os
+from pstats import Stats
+import re
+
+try:  # python 3+
+    from urllib.parse import quote, unquote
+except ImportError:
+    from urllib import quote, unquote
+
+from .steps_common import get_step_name, get_steps_item_info
+
+STEPS_PROFILE_OPTION = 'steps_profile'
+STEPS_PROFILE_DIR_OPTION = 'steps_profile_dir'
+STEPS_PROFILE_DIR_DEFAULT = 'prof'
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_IGNORED_FUNCTIONS = {('~', 0, "<method 'disable' of '_lsprof.Profiler' objects>")}
+
+# the name of a file written by a pytest-xdist worker, with the worker id as suffix
+_WORKER_FILE_NAME = re.compile(r'^(.*)\.gw\d+\.pstats$')
+
+
+class StepsProfiler(object):
+    """
+    The session-level profiler enabled with `--steps-profile`. Only the bodies of the steps are profiled, and the
+    profiles are merged by step across all test instances. At the end of the session there is one `.pstats` file per
+    step, in `directory`.
+
+    With pytest-xdist, each worker writes its own files (suffixed with the worker id), that are merged by the
+    controller.
+    """
+    __slots__ = ('directory', 'stats')
+
+    def __init__(self):
+        self.directory = None
+        # a dict step name -> pstats.Stats
+        self.stats = dict()
+
+    def reset(self, directory=None):
+        """
+        Enables the profiler if `directory` is not None, or disables it.
+
+        :param directory: the directory where the `.pstats` files are written
+        :return:
+        """
+        self.directory = directory
+        self.stats.clear()
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def start(self):
+        """ Returns a new enabled profile, to profile a step """
+        profile = Profile()
+        profile.enable()
+        return profile
+
+    def add(self, pytest_node, profile):
+        """
+        Merges the profile of the step of `pytest_node` into the stats of its step.
+
+        :param pytest_node:
+        :param profile: the profile returned by `start`, disabled
+        :return:
+        """
+        info = get_steps_item_info(pytest_node)
+        if info is None:
+            return
+        step_name = get_step_name(pytest_node, info.test_step_argname)
+        stats = self.stats.get(step_name)
+        if stats is None:
+            self.stats[step_name] = Stats(profile)
+        else:
+            stats.add(profile)
+
+    def _path(self, step_name, suffix=''):
+        # the step name can be read from the file name
+        return os.path.join(self.directory, quote(step_name, safe='[]') + suffix + '.pstats')
+
+    def dump(self, suffix=''):
+        """
+        Writes one `.pstats` file per step.
+
+        :param suffix: a suffix for the file names, used in the pytest-xdist workers
+        :return:
+        """
+        if not self.stats:
+            return
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # created by another pytest-xdist worker
+                pass
+        for step_name, stats in self.stats.items():
+            stats.dump_stats(self._path(step_name, suffix))
+
+    def merge_workers_files(self):
+        """
+        Merges the `.pstats` files written by the pytest-xdist workers into `self.stats`, writes the merged files and
+        removes the files of the workers.
+
+        :return:
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for file_name in sorted(os.listdir(self.directory)):
+            match = _WORKER_FILE_NAME.match(file_name)
+            if match is None:
+                continue
+            path = os.path.join(self.directory, file_name)
+            stats = Stats(path)
+            step_name = unquote(match.group(1))
+            if step_name in self.stats:
+                self.stats[step_name].add(stats)
+            else:
+                self.stats[step_name] = stats
+            os.remove(path)
+        self.dump()
+
+    def iter_summary(self, top):
+        """
+        Yields, for each step sorted by name, a tuple (step name, path of the `.pstats` file, total number of calls,
+        total time, list of the `top` functions with the highest cumulative time). Each function is described by a tuple
+        (number of calls, total time, cumulative time, description).
+
+        :param top: the number of functions to list for each step
+        :return:
+        """
+        for step_name in sorted(self.stats):
+            stats = self.stats[step_name]
+            stats.sort_stats('cumulative')
+            functions = []
+            for func in stats.fcn_list:
+                if func in _IGNORED_FUNCTIONS or os.path.dirname(func[0]) == _PACKAGE_DIR:
+                    # the functions of pytest-steps that start and stop the profile
+                    continue
+                _, ncalls, tottime, cumtime, _ = stats.stats[func]
+                functions.append((ncalls, tottime, cumtime, _func_description(func)))
+                if len(functions) == top:
+                    break
+            yield step_name, self._path(step_name), stats.total_calls, stats.total_tt, functions
+
+
+def _func_description(func):
+    """ Returns a short description of a function of a profile: 'file:line(name)' or the name of a builtin """
+    file_name, line, name = func
+    if file_name == '~':
+        return name
+    return "%s:%s(%s)" % (os.path.basename(file_name), line, name)
+
+
+steps_profiler = StepsProfiler()
+"""The session-level profiler of `--steps-profile`."""
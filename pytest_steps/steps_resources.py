@@ -0,0 +1,184 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+import sys
+
+try:  # unix only
+    import resource
+except ImportError:
+    resource = None
+
+from .steps_common import get_step_name
+
+STEP_RESOURCES_FIELD = '__steps_resources__'
+STEPS_RESOURCES_OPTION = 'steps_resources'
+
+# the fields of the resource usage of a step. All are differences between the end and the start of the step, except
+# 'max_rss' that is the maximum resident set size of the process at the end of the step (it never decreases).
+RESOURCES_FIELDS = ('max_rss', 'major_faults', 'minor_faults', 'voluntary_ctx_switches', 'involuntary_ctx_switches',
+                    'read_bytes', 'write_bytes')
+
+# the prefix of the resource usage fields in the pytest-harvest results bags
+RESULTS_BAG_PREFIX = 'step_'
+
+# the I/O counters of the process (linux only)
+_PROC_IO = '/proc/self/io'
+
+# `ru_maxrss` is in kilobytes on linux, and in bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def _read_proc_io():
+    """
+    Returns a tuple (read bytes, written bytes) of the process, including the reads and writes served by the page
+    cache, or None if `/proc/self/io` is not available.
+    """
+    try:
+        with open(_PROC_IO) as f:
+            counters = dict(line.split(':') for line in f)
+    except (IOError, OSError):
+        return None
+    return int(counters['rchar']), int(counters['wchar'])
+
+
+class StepsResourcesTracker(object):
+    """
+    The session-level tracker of the OS resources used by the steps, enabled with `--steps-resources`. The resource
+    usage of the process (`resource.getrusage`) and its I/O counters (`/proc/self/io`, on linux) are read before and
+    after the body of each step.
+
+    The I/O counters are None if `/proc/self/io` can not be read.
+    """
+    __slots__ = ('enabled', 'use_proc_io')
+
+    def __init__(self):
+        self.enabled = False
+        self.use_proc_io = False
+
+    def reset(self, enabled=False):
+        self.enabled = enabled
+        self.use_proc_io = enabled and _read_proc_io() is not None
+
+    def start(self):
+        """ Returns the state before a step """
+        return resource.getrusage(resource.RUSAGE_SELF), _read_proc_io() if self.use_proc_io else None
+
+    def stop(self, state):
+        """
+        Returns the resources used by a step since `start` returned `state`: a tuple with one value per field of
+        `RESOURCES_FIELDS`.
+        """
+        usage, io = resource.getrusage(resource.RUSAGE_SELF), _read_proc_io() if self.use_proc_io else None
+        usage_before, io_before = state
+        if io is None or io_before is None:
+            read_bytes = write_bytes = None
+        else:
+            read_bytes, write_bytes = io[0] - io_before[0], io[1] - io_before[1]
+        return (usage.ru_maxrss * _MAXRSS_UNIT,
+                usage.ru_majflt - usage_before.ru_majflt,
+                usage.ru_minflt - usage_before.ru_minflt,
+                usage.ru_nvcsw - usage_before.ru_nvcsw,
+                usage.ru_nivcsw - usage_before.ru_nivcsw,
+                read_bytes, write_bytes)
+
+
+steps_resources_tracker = StepsResourcesTracker()
+"""The session-level tracker of `--steps-resources`."""
+
+
+def get_step_resources_report(item, info):
+    """
+    Returns the resources used by the step of `item`, whose `StepsItemInfo` is `info`, as it is attached to the test
+    report: a dictionary with the step name and one entry per field of `RESOURCES_FIELDS`. Returns None if the step
+    was not executed.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    measure = getattr(item, STEP_RESOURCES_FIELD, None)
+    if measure is None:
+        return None
+    resources_report = dict(zip(RESOURCES_FIELDS, measure))
+    resources_report['step'] = get_step_name(item, info.test_step_argname)
+    return resources_report
+
+
+def save_step_resources_in_results_bag(item, resources_report):
+    """
+    Stores the resources used by the step of `item` in its pytest-harvest results bag, with the `RESULTS_BAG_PREFIX`
+    prefix, so that they appear in the synthesis dataframes (one column per field and per step, once pivoted with
+    `pivot_steps_on_df`). Nothing is done if the test does not use the `results_bag` fixture, or if pytest-harvest is
+    not installed.
+
+    :param item: the pytest item
+    :param resources_report: a dictionary created by `get_step_resources_report`
+    :return:
+    """
+    try:
+        from pytest_harvest import get_fixture_store
+    except ImportError:
+        # pytest-harvest is not installed
+        return
+
+    results_bag = get_fixture_store(item.session).get('results_bag', dict()).get(item.nodeid)
+    if results_bag is None:
+        # the test does not use the results bag
+        return
+    for field in RESOURCES_FIELDS:
+        results_bag[RESULTS_BAG_PREFIX + field] = resources_report[field]
+
+
+class StepsResources(object):
+    """
+    The session-level registry of the resources used by the steps, filled from the test reports when
+    `--steps-resources` is used. The measures are summed by step, across all test instances (except 'max_rss' for which
+    the maximum is kept).
+    """
+    __slots__ = ('enabled', 'steps')
+
+    def __init__(self):
+        self.enabled = False
+        # a dict step name -> [count, one total per field of RESOURCES_FIELDS]
+        self.steps = dict()
+
+    def reset(self, enabled=False):
+        self.enabled = enabled
+        self.steps.clear()
+
+    def add(self, resources_report):
+        """
+        Registers the resources used by a step, received in a test report.
+
+        :param resources_report: a dictionary created by `get_step_resources_report`
+        :return:
+        """
+        entry = self.steps.get(resources_report['step'])
+        if entry is None:
+            entry = self.steps[resources_report['step']] = [0] + [None] * len(RESOURCES_FIELDS)
+        entry[0] += 1
+        for i, field in enumerate(RESOURCES_FIELDS, start=1):
+            value = resources_report[field]
+            if value is None:
+                continue
+            if entry[i] is None:
+                entry[i] = value
+            elif field == 'max_rss':
+                entry[i] = max(entry[i], value)
+            else:
+                entry[i] += value
+
+    def get_summary(self):
+        """
+        Returns a list of tuples (step name, number of test instances, then one value per field of `RESOURCES_FIELDS`:
+        the max for 'max_rss', and the total across test instances for the others), sorted by decreasing I/O bytes
+        (read + written) then major page faults.
+        """
+        summary = [(step_name,) + tuple(entry) for step_name, entry in self.steps.items()]
+        summary.sort(key=lambda s: ((s[7] or 0) + (s[8] or 0), s[3] or 0), reverse=True)
+        return summary
+
+
+steps_resources = StepsResources()
+"""The session-level registry of the resources used by the steps."""
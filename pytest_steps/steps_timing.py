@@ -0,0 +1,139 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+from math import ceil
+
+try:  # python 3.3+
+    from time import perf_counter as _wall_clock, process_time as _cpu_clock
+except ImportError:
+    from time import time as _wall_clock, clock as _cpu_clock
+
+from .steps_common import get_step_name
+from .steps_checkpoint import get_steps_instance_name
+
+STEP_TIMING_FIELD = '__steps_timing__'
+STEPS_DURATIONS_OPTION = 'steps_durations'
+
+
+class StepsTimer(object):
+    """
+    The session-level timer of the steps, enabled with `--steps-durations`. The wall-clock time and the process CPU
+    time are read before and after the body of each step.
+    """
+    __slots__ = ('enabled',)
+
+    def __init__(self):
+        self.enabled = False
+
+    def reset(self, enabled=False):
+        self.enabled = enabled
+
+    def start(self):
+        """ Returns the state before a step """
+        return _wall_clock(), _cpu_clock()
+
+    def stop(self, state):
+        """ Returns the duration of a step since `start` returned `state`: a tuple (wall-clock time, CPU time) """
+        wall_start, cpu_start = state
+        return _wall_clock() - wall_start, _cpu_clock() - cpu_start
+
+
+steps_timer = StepsTimer()
+"""The session-level timer of `--steps-durations`."""
+
+
+def set_step_timing(pytest_node, timing):
+    """
+    Stores the duration of the step of `pytest_node`, so that the plugin attaches it to the test report.
+
+    :param pytest_node:
+    :param timing: a tuple (wall-clock time, CPU time) in seconds
+    :return:
+    """
+    setattr(pytest_node, STEP_TIMING_FIELD, timing)
+
+
+def get_step_timing_report(item, info):
+    """
+    Returns the duration of the step of `item`, whose `StepsItemInfo` is `info`, as it is attached to the test report:
+    a dictionary with the step name, the test instance name, the wall-clock time and the CPU time. Returns None if the
+    step was not executed.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :return:
+    """
+    timing = getattr(item, STEP_TIMING_FIELD, None)
+    if timing is None:
+        return None
+    return dict(step=get_step_name(item, info.test_step_argname),
+                instance=get_steps_instance_name(item, info.test_step_argname),
+                wall_time=timing[0], cpu_time=timing[1])
+
+
+def _percentile(sorted_values, q):
+    """ Returns the `q` percentile (0 < q <= 1) of a sorted list, with the nearest-rank method """
+    return sorted_values[max(int(ceil(q * len(sorted_values))), 1) - 1]
+
+
+class StepsDurations(object):
+    """
+    The session-level registry of the durations of the steps, filled from the test reports when `--steps-durations` is
+    used. The durations are grouped by step (across all test instances), and by test instance (all its steps, in all
+    branches).
+    """
+    __slots__ = ('enabled', 'steps', 'instances')
+
+    def __init__(self):
+        self.enabled = False
+        # a dict step name -> list of tuples (wall-clock time, CPU time)
+        self.steps = dict()
+        # a dict test instance name -> [wall-clock time, CPU time, number of steps]
+        self.instances = dict()
+
+    def reset(self, enabled=False):
+        self.enabled = enabled
+        self.steps.clear()
+        self.instances.clear()
+
+    def add(self, timing_report):
+        """
+        Registers the duration of a step, received in a test report.
+
+        :param timing_report: a dictionary created by `get_step_timing_report`
+        :return:
+        """
+        wall_time, cpu_time = timing_report['wall_time'], timing_report['cpu_time']
+        self.steps.setdefault(timing_report['step'], []).append((wall_time, cpu_time))
+        totals = self.instances.setdefault(timing_report['instance'], [0., 0., 0])
+        totals[0] += wall_time
+        totals[1] += cpu_time
+        totals[2] += 1
+
+    def get_steps_summary(self):
+        """
+        Returns a list of tuples (step name, number of test instances, total wall-clock time, p50, p95 and max
+        wall-clock times, total CPU time), sorted by decreasing total wall-clock time.
+        """
+        summary = []
+        for step_name, timings in self.steps.items():
+            wall_times = sorted(t[0] for t in timings)
+            summary.append((step_name, len(wall_times), sum(wall_times), _percentile(wall_times, .5),
+                            _percentile(wall_times, .95), wall_times[-1], sum(t[1] for t in timings)))
+        summary.sort(key=lambda s: s[2], reverse=True)
+        return summary
+
+    def get_instances_summary(self):
+        """
+        Returns a list of tuples (test instance name, number of steps, total wall-clock time, total CPU time), sorted by
+        decreasing total wall-clock time.
+        """
+        summary = [(name, n_steps, wall_time, cpu_time)
+                   for name, (wall_time, cpu_time, n_steps) in self.instances.items()]
+        summary.sort(key=lambda s: s[2], reverse=True)
+        return summary
+
+
+steps_durations = StepsDurations()
+"""The session-level registry of the durations of the steps."""
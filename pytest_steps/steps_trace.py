@@ -0,0 +1,128 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+import json
+import os
+
+from .steps_common import get_step_name, create_pytest_param_str_id, _StepVariant
+from .steps_checkpoint import get_steps_instance_name
+
+STEPS_TRACE_OPTION = 'steps_trace'
+
+
+def get_step_trace_report(item, info, call, outcome):
+    """
+    Returns the span of a phase ('setup', 'call' or 'teardown') of the step of `item`, whose `StepsItemInfo` is `info`,
+    as it is attached to the test report: a dictionary with the step and test instance names, the step id, the phase,
+    its outcome, its start and stop times (seconds since the epoch) and the process that executed it.
+
+    :param item: the pytest item
+    :param info: the `StepsItemInfo` of the item
+    :param call: the pytest `CallInfo` of the phase
+    :param outcome: the outcome of the test report of the phase ('passed', 'failed' or 'skipped')
+    :return:
+    """
+    step = item.callspec.params[info.test_step_argname]
+    workerinput = getattr(item.config, 'workerinput', None)
+    return dict(step=get_step_name(item, info.test_step_argname),
+                step_id=step.id if isinstance(step, _StepVariant) else create_pytest_param_str_id(step),
+                instance=get_steps_instance_name(item, info.test_step_argname),
+                phase=call.when, outcome=outcome,
+                start=call.start, stop=call.stop,
+                process=workerinput['workerid'] if workerinput is not None else 'pytest', pid=os.getpid())
+
+
+class StepsTrace(object):
+    """
+    The session-level registry of the spans of the steps, filled from the test reports when `--steps-trace` is used.
+    At the end of the session it is written as a JSON file in the Chrome trace event format, that can be opened with
+    `chrome://tracing` or https://ui.perfetto.dev.
+
+    Each test instance is a track (a "thread" of the trace) in the process that executed it, and each phase of its
+    steps is a span: the setup of the fixtures, the step itself, and the teardown of the fixtures. The skipped steps are
+    spans too.
+    """
+    __slots__ = ('path', 'spans', 'tracks', 'processes')
+
+    def __init__(self):
+        self.path = None
+        # a list of trace reports
+        self.spans = []
+        # a dict test instance name -> track id
+        self.tracks = dict()
+        # a dict pid -> process name
+        self.processes = dict()
+
+    def reset(self, path=None):
+        """
+        Enables the registry if `path` is not None, or disables it.
+
+        :param path: the path of the trace file
+        :return:
+        """
+        self.path = path
+        del self.spans[:]
+        self.tracks.clear()
+        self.processes.clear()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def add(self, trace_report):
+        """
+        Registers the span of a phase of a step, received in a test report.
+
+        :param trace_report: a dictionary created by `get_step_trace_report`
+        :return:
+        """
+        self.spans.append(trace_report)
+        if trace_report['instance'] not in self.tracks:
+            self.tracks[trace_report['instance']] = len(self.tracks) + 1
+        self.processes[trace_report['pid']] = trace_report['process']
+
+    def get_events(self):
+        """
+        Returns the list of the events of the trace, in the Chrome trace event format. The timestamps are in
+        microseconds since the start of the first span.
+        """
+        events = []
+        for pid, process_name in sorted(self.processes.items()):
+            events.append(dict(name='process_name', ph='M', pid=pid, tid=0, args=dict(name=process_name)))
+        instances_pids = dict((s['instance'], s['pid']) for s in self.spans)
+        for instance_name, tid in self.tracks.items():
+            events.append(dict(name='thread_name', ph='M', pid=instances_pids[instance_name], tid=tid,
+                               args=dict(name=instance_name)))
+            events.append(dict(name='thread_sort_index', ph='M', pid=instances_pids[instance_name], tid=tid,
+                               args=dict(sort_index=tid)))
+
+        origin = min(s['start'] for s in self.spans) if self.spans else 0
+        for span in sorted(self.spans, key=lambda s: s['start']):
+            if span['phase'] == 'call':
+                name = span['step_id']
+            elif span['phase'] == 'setup' and span['outcome'] == 'skipped':
+                name = "%s (skipped)" % span['step_id']
+            else:
+                name = "%s %s" % (span['phase'], span['step_id'])
+            events.append(dict(name=name, cat=span['phase'], ph='X',
+                               ts=int((span['start'] - origin) * 1e6), dur=int((span['stop'] - span['start']) * 1e6),
+                               pid=span['pid'], tid=self.tracks[span['instance']],
+                               args=dict(step=span['step'], outcome=span['outcome'])))
+        return events
+
+    def dump(self):
+        """
+        Writes the trace file.
+
+        :return:
+        """
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self.path, 'w') as f:
+            json.dump(dict(traceEvents=self.get_events(), displayTimeUnit='ms'), f)
+
+
+steps_trace = StepsTrace()
+"""The session-level registry of `--steps-trace`."""
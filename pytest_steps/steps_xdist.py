@@ -0,0 +1,90 @@
+# Authors: Sylvain MARIE <sylvain.marie@se.com>
+#          + All contributors to <https://github.com/smarie/python-pytest-steps>
+#
+# License: 3-clause BSD, <https://github.com/smarie/python-pytest-steps/blob/master/LICENSE>
+"""
+The support of pytest-xdist: since the state shared across steps lives in memory, all steps of a test instance must
+be sent to the same worker. This module is only imported when pytest-xdist is installed.
+"""
+from xdist.scheduler import LoadScheduling, LoadGroupScheduling
+
+
+def is_steps_nodeid(nodeid):
+    """
+    Returns True if `nodeid`, received from a worker, is the node id of a step suffixed with the `xdist_group` of its
+    test instance, for example `test_a.py::test_suite[step_b-1]@test_a.py::test_suite#0` (see
+    `iter_steps_instances_names`).
+
+    :param nodeid:
+    :return:
+    """
+    try:
+        nodeid, group_name = nodeid.rsplit('@', 1)
+    except ValueError:
+        return False
+    return group_name.rsplit('#', 1)[0] == nodeid.split('[', 1)[0]
+
+
+class StepsLoadScheduling(object):
+    """
+    The pytest-xdist scheduler used in place of `--dist load`. The controller does not collect the tests, so it only
+    knows whether there are step items once the workers have sent their collection: until then both a `LoadScheduling`
+    and a `LoadGroupScheduling` receive the nodes and their collections. When the tests are scheduled, the
+    `LoadGroupScheduling` is used if step items were collected, so that all steps of a test instance are sent to the
+    same worker. Otherwise the `LoadScheduling` is used, as if the plugin was not installed.
+    """
+    def __init__(self, config, log=None):
+        self.config = config
+        self.schedulers = (LoadGroupScheduling(config, log), LoadScheduling(config, log))
+        self.selected = None
+        self.steps_collected = False
+
+    def __getattr__(self, name):
+        # the attributes read by xdist before the tests are scheduled are identical in both schedulers
+        return getattr(self.selected or self.schedulers[0], name)
+
+    def add_node(self, node):
+        for scheduler in (self.schedulers if self.selected is None else (self.selected,)):
+            scheduler.add_node(node)
+
+    def add_node_collection(self, node, collection):
+        if self.selected is None and not self.steps_collected:
+            self.steps_collected = any(is_steps_nodeid(nodeid) for nodeid in collection)
+        for scheduler in (self.schedulers if self.selected is None else (self.selected,)):
+            scheduler.add_node_collection(node, collection)
+
+    def remove_node(self, node):
+        if self.selected is not None:
+            return self.selected.remove_node(node)
+        crashitems = [scheduler.remove_node(node) for scheduler in self.schedulers]
+        return crashitems[0]
+
+    def schedule(self):
+        group_scheduler, load_scheduler = self.schedulers
+        self.selected = group_scheduler if self.steps_collected else load_scheduler
+        self.schedulers = None
+
+        reporter = self.config.pluginmanager.get_plugin('terminalreporter')
+        if reporter is not None and self.steps_collected:
+            reporter.write_line("pytest-steps: step items were collected, using --dist loadgroup instead of "
+                                "--dist load so that all steps of a test instance run on the same worker")
+        self.selected.schedule()
+
+
+def add_xdist_group_suffix(session, config, items):
+    """
+    Compatibility helper to use in the pytest-xdist workers, for the `items` that were added after the collection, and
+    that already have the `xdist_group` mark of their test instance. pytest-xdist suffixes the node ids with the groups
+    in its own `pytest_collection_modifyitems` hook, that has already run: it is called again for these items only, so
+    that the suffix is the one of pytest-xdist. Note that the worker code of pytest-xdist is sent to the workers by
+    execnet, so its plugin is identified by its class name and not with `isinstance`. Tested with pytest-xdist 3.x.
+
+    :param session:
+    :param config:
+    :param items:
+    :return:
+    """
+    for plugin in config.pluginmanager.get_plugins():
+        if type(plugin).__name__ == 'WorkerInteractor':
+            plugin.pytest_collection_modifyitems(session=session, config=config, items=items)
+            return
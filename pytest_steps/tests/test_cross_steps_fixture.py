@@ -41,3 +41,31 @@ def test_params_mode(test_step, my_cool_fixture):
 def test_fixture_has_been_called_once_per_fun():
     global usage_counter
     assert usage_counter == 2
+
+
+events = []
+
+
+@pytest.fixture
+@cross_steps_fixture
+def my_cool_resource():
+    """A generator fixture that records its setup and teardown"""
+    events.append('setup')
+    yield 'resource'
+    events.append('teardown')
+
+
+@test_steps('a', 'b', 'c')
+@pytest.mark.parametrize('p', [1, 2])
+def test_gen_mode_teardown(p, my_cool_resource):
+    assert events[-1] == 'setup'
+    yield
+    assert events[-1] == 'setup'
+    yield
+    assert events[-1] == 'setup'
+    yield
+
+
+def test_teardown_once_after_last_step():
+    """The teardown should happen exactly once per instance, after its last step"""
+    assert events == ['setup', 'teardown', 'setup', 'teardown']
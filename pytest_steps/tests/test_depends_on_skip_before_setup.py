@@ -0,0 +1,77 @@
+def test_depends_on_before_setup(testdir):
+    """The steps whose dependencies have failed should be skipped (or failed) before their fixtures are created"""
+    testdir.makepyfile("""
+import pytest
+from pytest_steps import test_steps, depends_on
+from pytest_steps.steps_parametrizer import STEPS_HOLDERS_FIELD
+
+created = []
+
+
+@pytest.fixture
+def expensive():
+    created.append('expensive')
+    return 'expensive'
+
+
+def step_a(steps_data):
+    assert False
+
+
+@depends_on(step_a)
+def step_b(steps_data):
+    pass
+
+
+@depends_on(step_a, fail_instead_of_skip=True)
+def step_c(steps_data):
+    pass
+
+
+@test_steps(step_a, step_b, step_c)
+def test_suite(test_step, expensive, steps_data):
+    test_step(steps_data)
+
+
+def test_synthesis():
+    # the fixture was created for step_a only
+    assert created == ['expensive']
+    # the holder was evicted, even if the last step did not create the `steps_data` fixture
+    assert len(getattr(test_suite, STEPS_HOLDERS_FIELD)) == 0
+""")
+    result = testdir.inline_run()
+    reports = {r.nodeid.split('::')[-1]: r for r in result.getreports('pytest_runtest_logreport')
+               if r.when == 'setup' and not r.passed}
+    assert reports['test_suite[step_b]'].skipped
+    assert reports['test_suite[step_c]'].failed
+    assert "the following have failed: ['step_a']" in str(reports['test_suite[step_c]'].longrepr)
+    result.assertoutcome(passed=1, skipped=1, failed=2)
+
+
+def test_depends_on_message(testdir):
+    """The message distinguishes the dependencies that have failed from the ones that have not been executed"""
+    testdir.makepyfile("""
+from pytest_steps import test_steps, depends_on
+
+
+def step_a(steps_data):
+    assert False
+
+
+def step_b(steps_data):
+    pass
+
+
+@depends_on(step_a, step_b)
+def step_c(steps_data):
+    pass
+
+
+@test_steps(step_a, step_b, step_c)
+def test_suite(test_step, steps_data):
+    test_step(steps_data)
+""")
+    result = testdir.inline_run('-k', 'not step_b', '--steps-only-selected')
+    reports = {r.nodeid.split('::')[-1]: r for r in result.getreports('pytest_runtest_logreport') if r.skipped}
+    assert "the following have failed: ['step_a']; the following have not been executed: ['step_b']" \
+           in str(reports['test_suite[step_c]'].longrepr)
@@ -0,0 +1,57 @@
+import pytest
+
+from pytest_steps import test_steps
+from pytest_steps.steps_generator import STEPS_MONITORS_FIELD, monitors_counter
+
+
+@test_steps('a', 'b', 'c')
+@pytest.mark.parametrize('p', [1, 2])
+def test_gen_mode(p):
+    yield
+    # the monitor for this instance is alive while its steps are running
+    assert len(getattr(test_gen_mode, STEPS_MONITORS_FIELD)) >= 1
+    yield
+    yield
+
+
+def test_monitors_evicted():
+    """Checks that the monitors have been evicted after the last step of each instance"""
+    assert len(getattr(test_gen_mode, STEPS_MONITORS_FIELD)) == 0
+    assert monitors_counter.evicted >= 2
+
+
+TEST_MODULE = """
+import pytest
+from pytest_steps import test_steps, step_params
+
+
+@test_steps('a', 'b', 'c')
+@pytest.mark.parametrize('p', [1, 2])
+def test_gen_mode(p):
+    yield
+    yield
+    yield
+
+
+@test_steps('a', step_params('b', q=[1, 2]), 'c')
+def test_branches():
+    yield
+    yield
+    yield
+"""
+
+
+def test_monitors_evicted_deselected(testdir):
+    """The monitors are evicted after the last collected step, even if the last steps were deselected"""
+    testdir.makepyfile(TEST_MODULE)
+    module = 'test_monitors_evicted_deselected.py'
+    last_steps = ('test_gen_mode[1-c]', 'test_gen_mode[2-c]', 'test_branches[c[1]]', 'test_branches[c[2]]')
+    args = ['--steps-only-selected']
+    for node_id in last_steps:
+        args += ['--deselect', '%s::%s' % (module, node_id)]
+    testdir.inline_run(*args).assertoutcome(passed=7)
+    assert monitors_counter.live == 0
+
+    # the previous steps are selected too, but not the last step
+    testdir.inline_run('%s::test_gen_mode[1-b]' % module, '%s::test_branches[b[1]]' % module).assertoutcome(passed=4)
+    assert monitors_counter.live == 0
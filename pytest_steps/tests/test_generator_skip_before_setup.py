@@ -0,0 +1,42 @@
+def test_skipped_before_setup(testdir):
+    """The steps that can not run because a mandatory step failed should be skipped before their fixtures are created"""
+    testdir.makepyfile("""
+import pytest
+from pytest_steps import test_steps, one_fixture_per_step
+from pytest_steps.steps_generator import STEPS_MONITORS_FIELD
+
+created = []
+
+
+@pytest.fixture
+def expensive():
+    created.append('expensive')
+    return 'expensive'
+
+
+@pytest.fixture
+@one_fixture_per_step
+def per_step():
+    created.append('per_step')
+    return 'per_step'
+
+
+@test_steps('a', 'b', 'c', 'd')
+def test_suite(expensive, per_step):
+    yield
+    assert False
+    yield
+    yield
+    yield
+
+
+def test_synthesis():
+    # the fixtures were created for steps 'a' and 'b' only
+    assert created == ['expensive', 'per_step'] * 2
+    # the monitor was evicted, even if the last step did not reach the test function
+    assert len(getattr(test_suite, STEPS_MONITORS_FIELD)) == 0
+""")
+    result = testdir.inline_run()
+    result.assertoutcome(passed=2, skipped=2, failed=1)
+    skipped = [r for r in result.getreports('pytest_runtest_logreport') if r.skipped]
+    assert [r.when for r in skipped] == ['setup', 'setup']
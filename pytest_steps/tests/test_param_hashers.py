@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from pytest_steps import test_steps, register_param_hasher, unregister_param_hasher, hash_by_identity
+from pytest_steps.steps_common import hash_param_value
+
+
+class Config(object):
+    """A custom unhashable parameter type"""
+    __hash__ = None
+
+    def __init__(self, n):
+        self.n = n
+
+
+register_param_hasher(Config, hash_by_identity)
+
+
+@test_steps('a', 'b')
+@pytest.mark.parametrize('arr', [np.arange(3), np.arange(4)], ids=['arr3', 'arr4'])
+@pytest.mark.parametrize('cfg', [Config(1), {'x': [1, {2, 3}]}, ([1], 2)], ids=['cfg', 'dict', 'tuple'])
+def test_unhashable_params(arr, cfg, steps_data, test_step):
+    if test_step == 'a':
+        steps_data.arr_len = len(arr)
+    else:
+        # the same steps data holder is used for both steps
+        assert steps_data.arr_len == len(arr)
+
+
+def test_hash_param_value():
+    assert hash_param_value({'a': [1, 2], 'b': 3}) == hash_param_value({'b': 3, 'a': [1, 2]})
+    assert hash_param_value(np.arange(3)) == hash_param_value(np.arange(3))
+    assert hash_param_value(np.arange(3)) != hash_param_value(np.arange(3, dtype=np.float64))
+
+    with pytest.raises(TypeError):
+        hash_param_value(np.array([object()]))
+
+
+def test_hash_nested_param_value():
+    """Only the items with a hash function are hashed separately in the default hash functions of containers"""
+    assert hash_param_value([{'a': 1}, [np.arange(3)], (np.arange(2),)]) \
+        == hash_param_value([{'a': 1}, [np.arange(3)], (np.arange(2),)])
+    assert hash_param_value({'a': [1, 2]}) != hash_param_value({'a': [1, 3]})
+    assert hash_param_value({1, 2}) == hash_param_value({2, 1})
+
+    class Foo(object):
+        pass
+
+    foo = Foo()
+    flat = [foo, 1]
+    h = hash_param_value(flat)
+    register_param_hasher(Foo, lambda v: 0)
+    try:
+        # the hash functions registered later are used in the containers
+        assert hash_param_value(flat) == hash_param_value([Foo(), 1]) != h
+    finally:
+        assert unregister_param_hasher(Foo) is not None
+    assert hash_param_value(flat) == h
+    assert unregister_param_hasher(Foo) is None
@@ -0,0 +1,99 @@
+import pytest
+
+from pytest_steps import test_steps, step_params
+
+
+executed = []
+
+
+def load(steps_data, threshold):
+    assert threshold is None
+    steps_data.data = [1, 2, 3]
+
+
+def fit(steps_data, threshold):
+    assert threshold is None
+    steps_data.model = sum(steps_data.data)
+
+
+def evaluate(steps_data, threshold):
+    assert not hasattr(steps_data, 'score')
+    steps_data.score = steps_data.model * threshold
+
+
+def report(steps_data, threshold):
+    assert steps_data.score == steps_data.model * threshold
+
+
+@test_steps(load, fit, step_params(evaluate, threshold=[1, 2]), report)
+def test_pipeline(test_step, steps_data, threshold):
+    executed.append((test_step.__name__, threshold))
+    test_step(steps_data, threshold)
+
+
+def test_pipeline_synthesis(request):
+    """The common prefix is executed once, and the subsequent steps once per branch"""
+    assert executed == [('load', None), ('fit', None),
+                        ('evaluate', 1), ('report', 1),
+                        ('evaluate', 2), ('report', 2)]
+    assert len(getattr(test_pipeline, '__steps_holders__')) == 0
+
+    ids = [item.name for item in request.session.items
+           if item.module is request.module and item.name.startswith('test_pipeline[')]
+    assert ids == ['test_pipeline[load]', 'test_pipeline[fit]',
+                   'test_pipeline[evaluate[1]]', 'test_pipeline[report[1]]',
+                   'test_pipeline[evaluate[2]]', 'test_pipeline[report[2]]']
+
+
+def test_manual_call():
+    """All branches are executed when the test function is called manually"""
+    del executed[:]
+    steps_data = type('Holder', (object, ), {})()
+    with pytest.raises(AssertionError):
+        # the steps data holder is not copied for each branch in manual mode, so evaluate fails in branch 2
+        test_pipeline(None, steps_data, None)
+    assert executed == [('load', None), ('fit', None), ('evaluate', 1), ('report', 1), ('evaluate', 2)]
+
+
+def test_nested_branches_and_dependencies(testdir):
+    """Dependencies are evaluated in each branch separately"""
+    testdir.makepyfile("""
+from pytest_steps import test_steps, step_params, depends_on
+
+def step_a(a, b):
+    pass
+
+def step_b(a, b):
+    assert a != 2
+
+@depends_on(step_b)
+def step_c(a, b):
+    pass
+
+@test_steps(step_a, step_params(step_b, a=[1, 2]), step_params(step_c, b=['x', 'y']))
+def test_suite(test_step, a, b):
+    test_step(a, b)
+""")
+    result = testdir.inline_run('-v')
+    outcomes = {r.nodeid.split('::')[-1]: r.outcome for r in result.getreports('pytest_runtest_logreport')
+                if r.when == 'call' or not r.passed}
+    assert outcomes == {'test_suite[step_a]': 'passed',
+                        'test_suite[step_b[1]]': 'passed',
+                        'test_suite[step_c[1-x]]': 'passed',
+                        'test_suite[step_c[1-y]]': 'passed',
+                        'test_suite[step_b[2]]': 'failed',
+                        'test_suite[step_c[2-x]]': 'skipped',
+                        'test_suite[step_c[2-y]]': 'skipped'}
+
+
+def test_step_params_errors():
+    with pytest.raises(ValueError):
+        step_params(load)
+
+    with pytest.raises(ValueError):
+        step_params(load, ids=['a'], threshold=[1, 2])
+
+    with pytest.raises(ValueError):
+        @test_steps(load, step_params(evaluate, threshold=[1, 2]))
+        def test_foo(test_step, steps_data):
+            pass
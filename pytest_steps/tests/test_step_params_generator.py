@@ -0,0 +1,150 @@
+import os
+
+import pytest
+
+from pytest_steps import test_steps, step_params
+from pytest_steps.steps_generator import STEPS_MONITORS_FIELD
+
+
+executed = []
+
+
+@test_steps('load', 'fit', step_params('evaluate', threshold=[1, 2]), 'report')
+def test_pipeline():
+    executed.append('load')
+    data = [1, 2, 3]
+    yield
+
+    executed.append('fit')
+    model = sum(data)
+    params = yield
+
+    threshold = params['threshold']
+    executed.append(('evaluate', threshold))
+    score = model * threshold
+    yield
+
+    executed.append(('report', threshold))
+    assert score == 6 * threshold
+    yield
+
+
+def test_pipeline_synthesis(request):
+    """The common steps are executed again for the second branch, and all monitors are evicted"""
+    assert executed == ['load', 'fit', ('evaluate', 1), ('report', 1),
+                        'load', 'fit', ('evaluate', 2), ('report', 2)]
+    assert len(getattr(test_pipeline, STEPS_MONITORS_FIELD)) == 0
+
+    ids = [item.name for item in request.session.items
+           if item.module is request.module and item.name.startswith('test_pipeline[')]
+    assert ids == ['test_pipeline[load]', 'test_pipeline[fit]',
+                   'test_pipeline[evaluate[1]]', 'test_pipeline[report[1]]',
+                   'test_pipeline[evaluate[2]]', 'test_pipeline[report[2]]']
+
+
+def test_manual_call():
+    """All branches are executed when the test function is called manually"""
+    del executed[:]
+    test_pipeline(None, None)
+    assert executed == ['load', 'fit', ('evaluate', 1), ('report', 1),
+                        'load', 'fit', ('evaluate', 2), ('report', 2)]
+
+
+FORK_TEST_MODULE = """
+import os
+import pytest
+from pytest_steps import test_steps, step_params
+from pytest_steps.steps_generator import STEPS_MONITORS_FIELD
+
+pids = []
+
+
+@test_steps('prefix', step_params('branch', a=[1, 2, 3]), 'check', 'fail')
+def test_suite():
+    pids.append(os.getpid())
+    state = ['prefix']
+    params = yield
+    state.append(params['a'])
+    yield
+    # the state of the other branches is not visible
+    assert state == ['prefix', params['a']]
+    # the steps of the branch run in a child process
+    assert os.getpid() != pids[0]
+    yield
+    assert params['a'] != 2
+    yield
+
+
+def test_synthesis():
+    # the prefix was executed once, in this process
+    assert pids == [os.getpid()]
+    assert len(getattr(test_suite, STEPS_MONITORS_FIELD)) == 0
+"""
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="os.fork is not available")
+def test_fork(testdir):
+    """With --steps-fork the common steps run once, and each branch runs in its own child process"""
+    testdir.makepyfile(FORK_TEST_MODULE)
+    result = testdir.inline_run('--steps-fork', '-p', 'no:cacheprovider')
+    outcomes = {r.nodeid.split('::')[-1]: r.outcome for r in result.getreports('pytest_runtest_logreport')
+                if r.when == 'call'}
+    assert outcomes == {'test_suite[prefix]': 'passed',
+                        'test_suite[branch[1]]': 'passed', 'test_suite[check[1]]': 'passed',
+                        'test_suite[fail[1]]': 'passed',
+                        'test_suite[branch[2]]': 'passed', 'test_suite[check[2]]': 'passed',
+                        'test_suite[fail[2]]': 'failed',
+                        'test_suite[branch[3]]': 'passed', 'test_suite[check[3]]': 'passed',
+                        'test_suite[fail[3]]': 'passed',
+                        'test_synthesis': 'passed'}
+
+
+def test_replay_warning(testdir):
+    """A warning is issued once per test function when the common steps are executed again, unless forked"""
+    testdir.makepyfile("""
+from pytest_steps import test_steps, step_params
+
+@test_steps('a', step_params('b', p=[1, 2, 3]), 'c')
+def test_suite():
+    yield
+    yield
+    yield
+""")
+    result = testdir.runpytest('-p', 'no:cacheprovider', '-W', 'always')
+    result.assert_outcomes(passed=7, warnings=1)
+    result.stdout.fnmatch_lines(["*The common steps ?'a'? of test function test_suite are executed again*"])
+    if hasattr(os, 'fork'):
+        result = testdir.runpytest('--steps-fork', '-p', 'no:cacheprovider', '-W', 'always')
+        result.assert_outcomes(passed=7)
+        assert 'executed again' not in result.stdout.str()
+
+
+def test_failed_prefix(testdir):
+    """When a common step fails, all branches are skipped"""
+    testdir.makepyfile("""
+from pytest_steps import test_steps, step_params
+
+@test_steps('a', step_params('b', p=[1, 2]), 'c')
+def test_suite():
+    assert False
+    yield
+    yield
+    yield
+""")
+    result = testdir.inline_run()
+    result.assertoutcome(passed=0, failed=1, skipped=4)
+
+
+def test_step_params_errors():
+    with pytest.raises(ValueError):
+        @test_steps(step_params('a', p=[1, 2]), 'b')
+        def test_foo():
+            yield
+            yield
+
+    with pytest.raises(ValueError):
+        @test_steps('a', step_params('b', p=[1, 2]), step_params('c', q=[1, 2]))
+        def test_foo():
+            yield
+            yield
+            yield
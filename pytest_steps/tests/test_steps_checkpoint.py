@@ -0,0 +1,181 @@
+import pytest
+
+from pytest_steps.tests.utils import get_outcomes
+
+
+TEST_MODULE = """
+import os
+import numpy as np
+import pytest
+from pytest_steps import test_steps, depends_on
+
+executed = []
+
+
+def step_a(steps_data, p):
+    steps_data.array = np.arange(100000) * p
+    steps_data.p = p
+
+
+@depends_on(step_a)
+def step_b(steps_data, p):
+    steps_data.total = steps_data.array.sum()
+
+
+def step_c(steps_data, p):
+    # fails until the flag file is created
+    assert os.path.exists('flag')
+    assert steps_data.p == p
+    assert steps_data.total == np.arange(100000).sum() * p
+    # the restored arrays are writable
+    steps_data.array[0] = 1
+
+
+@test_steps(step_a, step_b, step_c)
+@pytest.mark.parametrize('p', [1, 2])
+def test_suite(test_step, steps_data, p):
+    executed.append((test_step.__name__, p))
+    test_step(steps_data, p)
+"""
+
+
+def test_checkpoint_and_resume(testdir):
+    """The steps that passed in a previous session are skipped, and the steps data is restored"""
+    pytest.importorskip('numpy')
+    testdir.makepyfile(TEST_MODULE)
+
+    result = testdir.inline_run('--steps-checkpoint')
+    result.assertoutcome(passed=4, failed=2)
+
+    testdir.makefile('', flag='')
+    result = testdir.inline_run('--steps-resume')
+    assert get_outcomes(result) == {'test_suite[1-step_a]': 'skipped', 'test_suite[1-step_b]': 'skipped',
+                                 'test_suite[1-step_c]': 'passed',
+                                 'test_suite[2-step_a]': 'skipped', 'test_suite[2-step_b]': 'skipped',
+                                 'test_suite[2-step_c]': 'passed'}
+
+    # all steps passed: nothing to run anymore
+    result = testdir.inline_run('--steps-resume')
+    result.assertoutcome(skipped=6)
+
+    # without --steps-resume, the test instances are executed from the start and the checkpoints are replaced
+    result = testdir.inline_run('--steps-checkpoint', '-k', '1-')
+    result.assertoutcome(passed=3)
+    result = testdir.inline_run('--steps-resume')
+    result.assertoutcome(skipped=6)
+
+
+def test_checkpoint_not_picklable(testdir):
+    """A warning is issued when the steps data can not be pickled, and the steps are not resumed"""
+    testdir.makepyfile("""
+from pytest_steps import test_steps
+
+def step_a(steps_data):
+    steps_data.f = lambda: None
+
+def step_b(steps_data):
+    pass
+
+@test_steps(step_a, step_b)
+def test_suite(test_step, steps_data):
+    test_step(steps_data)
+""")
+    result = testdir.runpytest('--steps-checkpoint', '-W', 'always')
+    result.assert_outcomes(passed=2, warnings=2)
+    result.stdout.fnmatch_lines(["*could not be checkpointed*"])
+
+    result = testdir.inline_run('--steps-resume', '-W', 'ignore')
+    result.assertoutcome(passed=2)
+
+
+def test_no_cache(testdir):
+    testdir.makepyfile("""
+def test_foo():
+    pass
+""")
+    result = testdir.runpytest('--steps-resume', '-p', 'no:cacheprovider')
+    result.stderr.fnmatch_lines(["*--steps-resume require the pytest cache*"])
+
+
+def test_checkpoint_repeated_step(testdir):
+    """A step listed several times is checkpointed and resumed at each of its positions"""
+    testdir.makepyfile("""
+import os
+from pytest_steps import test_steps
+
+def step_a(steps_data):
+    steps_data.n = 0
+
+def step_b(steps_data):
+    steps_data.n += 1
+    # the third execution fails until the flag file is created
+    assert steps_data.n < 3 or os.path.exists('flag')
+
+@test_steps(step_a, step_b, step_b, step_b)
+def test_suite(test_step, steps_data):
+    test_step(steps_data)
+""")
+    result = testdir.inline_run('--steps-checkpoint')
+    result.assertoutcome(passed=3, failed=1)
+
+    testdir.makefile('', flag='')
+    result = testdir.inline_run('--steps-resume')
+    assert get_outcomes(result) == {'test_suite[step_a]': 'skipped', 'test_suite[step_b0]': 'skipped',
+                                 'test_suite[step_b1]': 'skipped', 'test_suite[step_b2]': 'passed'}
+
+
+def test_checkpoint_not_loadable(testdir):
+    """A checkpoint that can not be loaded anymore is ignored with a warning"""
+    testdir.makepyfile(helper="""
+class Foo(object):
+    pass
+""")
+    testdir.makepyfile("""
+import os
+from pytest_steps import test_steps
+from helper import Foo
+
+def step_a(steps_data):
+    steps_data.foo = Foo()
+
+def step_b(steps_data):
+    assert os.path.exists('flag')
+
+@test_steps(step_a, step_b)
+def test_suite(test_step, steps_data):
+    test_step(steps_data)
+""")
+    testdir.syspathinsert()
+    result = testdir.inline_run('--steps-checkpoint')
+    result.assertoutcome(passed=1, failed=1)
+
+    # the class of the steps data does not exist anymore
+    testdir.makepyfile(helper="""
+class Foo(object):
+    pass
+
+del Foo
+Foo = None
+""")
+    testdir.makefile('', flag='')
+    result = testdir.runpytest_subprocess('--steps-resume', '-W', 'always')
+    result.assert_outcomes(passed=1, skipped=1, warnings=1)
+    result.stdout.fnmatch_lines(["*checkpoint of test instance*could not be loaded*"])
+
+
+def test_instance_name_without_idlist():
+    """The stable name of a test instance does not require the private `_idlist` of pytest"""
+    from pytest_steps.steps_checkpoint import get_steps_instance_name
+
+    def step_a():
+        pass
+
+    class _Callspec(object):
+        params = dict(p=1, test_step=step_a)
+
+    class _Item(object):
+        nodeid = 'test_a.py::test_suite[1-step_a]'
+        callspec = _Callspec()
+
+    assert get_steps_instance_name(_Item(), 'test_step') == 'test_a.py::test_suite[1]'
+    assert get_steps_instance_name(_Item(), 'test_step', branch=(0, 1)) == 'test_a.py::test_suite[1]/0-1'
@@ -0,0 +1,101 @@
+from pytest_steps.steps_circuit_breaker import StepsCircuitBreaker
+from pytest_steps.steps_common import StepsItemInfo
+from pytest_steps.tests.utils import make_raw_module, get_outcomes, get_call_reports
+
+RAW_MODULE = 'test_steps_circuit_breaker_module.py'
+
+
+def test_circuit_breaker(testdir):
+    """Once a step failed K times, it is skipped in the other test instances, as well as the steps depending on it"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.inline_run('--steps-maxfail-per-step=2', '--steps-order=depth-first')
+    outcomes = get_outcomes(result)
+
+    # generator mode: the remaining steps of the test instance are skipped too
+    assert [outcomes['test_gen_mode[%s-%s]' % (s, p)] for p in range(4) for s in 'abc'] \
+        == ['passed', 'failed', 'skipped'] * 2 + ['passed', 'skipped', 'skipped'] * 2
+
+    # explicit mode: the steps that do not depend on the short-circuited step are run
+    assert [outcomes['test_params_mode[%s-step_%s]' % (p, s)] for p in range(4) for s in 'abc'] \
+        == ['failed', 'passed', 'skipped'] * 2 + ['skipped', 'passed', 'skipped'] * 2
+
+    # the first step of a branch is short-circuited before its generator is created
+    assert [outcomes['test_gen_branches[%s-%s]' % (p, s)] for p in range(2) for s in ('b[1]', 'c[1]', 'b[2]', 'c[2]',
+                                                                                      'b[3]', 'c[3]')] \
+        == ['failed', 'skipped'] * 2 + ['skipped', 'skipped'] * 4
+    assert outcomes['test_synthesis'] == 'passed'
+
+    # the skip reasons
+    reports = {r.nodeid.split('::')[-1]: r for r in result.getreports('pytest_runtest_logreport') if r.skipped}
+    assert 'short-circuited because it already failed in 2 test instances' \
+           in reports['test_gen_mode[b-2]'].longrepr[2]
+    assert 'short-circuited' in reports['test_gen_mode[c-2]'].longrepr[2]
+    assert 'a previous step was short-circuited' in reports['test_gen_branches[0-c[3]]'].longrepr[2]
+    assert 'short-circuited because it already failed in 2 test instances' \
+           in reports['test_params_mode[2-step_a]'].longrepr[2]
+
+
+def test_circuit_breaker_summary(testdir):
+    """A summary of the short-circuited steps is displayed"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest('--steps-maxfail-per-step=2', '--steps-order=depth-first')
+    result.stdout.fnmatch_lines([
+        "*steps short-circuited (--steps-maxfail-per-step)*",
+        "test_circuit_breaker_summary.py::test_gen_mode[b]: failed in 2 test instances, "
+        "short-circuited in 2 test instances",
+        "test_circuit_breaker_summary.py::test_params_mode[step_a]: failed in 2 test instances, "
+        "short-circuited in 2 test instances",
+        "test_circuit_breaker_summary.py::test_gen_branches[b]: failed in 2 test instances, "
+        "short-circuited in 4 test instances",
+    ])
+
+
+def test_circuit_breaker_disabled(testdir):
+    """The option is validated. Without the option all steps are executed, see the META header of the module"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest('--steps-maxfail-per-step=0')
+    assert result.ret != 0
+    result.stderr.fnmatch_lines(["*--steps-maxfail-per-step should be a positive integer*"])
+
+
+def test_circuit_breaker_teardown_errors(testdir):
+    """The errors in the teardown of a step are not counted as failures of the step"""
+    testdir.makepyfile("""
+        import pytest
+        from pytest_steps import test_steps
+
+        @pytest.fixture
+        def broken_teardown():
+            yield
+            raise ValueError("teardown error")
+
+        def step_a():
+            pass
+
+        def step_b():
+            pass
+
+        @pytest.mark.parametrize('p', range(3))
+        @test_steps(step_a, step_b)
+        def test_teardown(test_step, p, broken_teardown):
+            test_step()
+    """)
+    result = testdir.inline_run('--steps-maxfail-per-step=1', '--steps-order=depth-first')
+    outcomes = get_call_reports(result, 'outcome')
+    assert [outcomes['test_teardown[step_%s-%s]' % (s, p)] for p in range(3) for s in 'ab'] == ['passed'] * 6
+
+
+def test_circuit_breaker_counts_once_per_item():
+    """A failure of a step is counted at most once per item"""
+    class _FakeItem(object):
+        nodeid = 'test_a.py::test_suite[step_a-1]'
+
+        class callspec(object):
+            params = {'test_step': 'step_a'}
+
+    breaker = StepsCircuitBreaker()
+    breaker.reset(maxfail=2)
+    item, info = _FakeItem(), StepsItemInfo('test_step', 0, 'test_a.py::test_suite[1]')
+    breaker.record_failure(item, info)
+    breaker.record_failure(item, info)
+    assert breaker.failures == {('test_a.py::test_suite', 0): 1}
@@ -0,0 +1,56 @@
+import pytest
+
+from pytest_steps import test_steps
+from pytest_steps.steps_parametrizer import STEPS_HOLDERS_FIELD, StepsDataHoldersCache
+
+
+def step_a(steps_data):
+    steps_data.big = list(range(1000))
+
+
+def step_b(steps_data):
+    assert len(steps_data.big) == 1000
+
+
+@test_steps(step_a, step_b)
+@pytest.mark.parametrize('p', [1, 2])
+def test_params_mode(p, test_step, steps_data):
+    test_step(steps_data)
+
+
+@pytest.fixture
+def skip_last(test_step):
+    # created before the holder fixture: the latter is never created for the last step
+    if test_step is step_b:
+        pytest.skip("last step skipped before its holder fixture is created")
+
+
+@test_steps(step_a, step_b, steps_data_holder_name='other_data')
+@pytest.mark.parametrize('p', [1, 2])
+def test_params_mode_last_skipped(p, test_step, skip_last, other_data):
+    test_step(other_data)
+
+
+def test_holders_evicted():
+    """Checks that the holders have been evicted after the last step of each instance"""
+    assert len(getattr(test_params_mode, STEPS_HOLDERS_FIELD)) == 0
+    assert len(getattr(test_params_mode_last_skipped, STEPS_HOLDERS_FIELD)) == 0
+
+
+def test_holders_cache_maxsize():
+    """Checks the LRU eviction policy when a maxsize is set"""
+    holders = StepsDataHoldersCache()
+    h1 = holders.get_or_create(1, maxsize=2)
+    holders.get_or_create(2, maxsize=2)
+    assert holders.get_or_create(1, maxsize=2) is h1
+    holders.get_or_create(3, maxsize=2)
+    assert list(holders.keys()) == [1, 3]
+
+    # an instance evicted too early gets a new holder with a warning
+    with pytest.warns(UserWarning):
+        holders.get_or_create(2, maxsize=2)
+
+    # the holder of a branch can not be copied from a holder evicted too early
+    holders.get_or_create(4, maxsize=2)
+    with pytest.warns(UserWarning, match="before the first step of its branch"):
+        holders.get_or_create((3, (0,)), maxsize=2, copy_from=3)
@@ -0,0 +1,18 @@
+import pytest
+
+from pytest_steps import test_steps
+from pytest_steps.steps_common import get_steps_item_info, get_pytest_node_hash_id
+
+
+@test_steps('a', 'b')
+@pytest.mark.parametrize('cfg', [{'x': [1, 2]}], ids=['cfg'])
+def test_params_mode(test_step, cfg, request):
+    """The step-independent instance key is computed at collection time and available on the item"""
+    info = get_steps_item_info(request.node)
+    assert info.step_idx == ['a', 'b'].index(test_step)
+    assert info.is_last == (test_step == 'b')
+    assert info.instance_key == get_pytest_node_hash_id(request.node, params_to_ignore=('test_step',))
+
+
+def test_not_steps(request):
+    assert get_steps_item_info(request.node) is None
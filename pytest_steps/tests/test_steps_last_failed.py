@@ -0,0 +1,84 @@
+import pytest
+
+
+TEST_MODULE = """
+import os
+import pytest
+from pytest_steps import test_steps, step_params, depends_on
+
+FAIL = os.environ.get('STEPS_LF_FAIL', '') == '1'
+
+
+@pytest.mark.parametrize('p', [1, 2])
+@test_steps('a', 'b', 'c')
+def test_gen_mode(p):
+    yield
+    assert not (FAIL and p == 2)
+    yield
+    yield
+
+
+def step_a(steps_data, q):
+    steps_data.a = q
+
+
+def step_b(steps_data, q):
+    assert not (FAIL and q == 'y')
+
+
+@depends_on(step_b)
+def step_c(steps_data, q):
+    pass
+
+
+@test_steps(step_a, step_params(step_b, q=['x', 'y']), step_c)
+def test_params_mode(test_step, steps_data, q):
+    test_step(steps_data, q)
+
+
+def test_other():
+    pass
+
+
+def test_other_fail():
+    assert not FAIL
+"""
+
+
+def _run(testdir, monkeypatch, fail, *args):
+    """Runs the test module and returns the list of the executed items (call phase) and their outcomes"""
+    monkeypatch.setenv('STEPS_LF_FAIL', '1' if fail else '0')
+    result = testdir.inline_run(*args)
+    return [(r.nodeid.split('::')[-1], r.outcome) for r in result.getreports('pytest_runtest_logreport')
+            if r.when == 'call']
+
+
+@pytest.mark.parametrize('option, expected', [
+    ('--steps-lf', [('test_gen_mode[a-2]', 'passed'), ('test_gen_mode[b-2]', 'passed'),
+                    ('test_params_mode[step_a]', 'passed'), ('test_params_mode[step_b[y]]', 'passed'),
+                    ('test_other_fail', 'passed')]),
+    ('--steps-lf-all', [('test_gen_mode[a-2]', 'passed'), ('test_gen_mode[b-2]', 'passed'),
+                        ('test_gen_mode[c-2]', 'passed'),
+                        ('test_params_mode[step_a]', 'passed'), ('test_params_mode[step_b[y]]', 'passed'),
+                        ('test_params_mode[step_c[y]]', 'passed'),
+                        ('test_other_fail', 'passed')]),
+])
+def test_steps_last_failed(testdir, monkeypatch, option, expected):
+    """The failed test instances are executed again from their first step, the others are deselected"""
+    testdir.makepyfile(TEST_MODULE)
+    first = _run(testdir, monkeypatch, True)
+    assert ('test_gen_mode[b-2]', 'failed') in first
+    assert ('test_params_mode[step_b[y]]', 'failed') in first
+
+    assert _run(testdir, monkeypatch, False, option) == expected
+
+    # the failures are now fixed: nothing is deselected
+    assert len(_run(testdir, monkeypatch, False, option)) == 13
+
+
+def test_steps_last_failed_no_cache(testdir):
+    """The option requires the cache"""
+    testdir.makepyfile(TEST_MODULE)
+    result = testdir.runpytest('--steps-lf', '-p', 'no:cacheprovider')
+    assert result.ret != 0
+    result.stderr.fnmatch_lines(["*--steps-lf-all require the pytest cache*"])
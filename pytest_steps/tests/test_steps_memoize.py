@@ -0,0 +1,164 @@
+import os
+
+from pytest_steps.steps_memoize import StepsMemoizeCache
+
+
+TEST_MODULE = """
+import pytest
+from pytest_steps import test_steps, memoize_step
+
+
+def log(msg):
+    with open('executed.txt', 'a') as f:
+        f.write(msg + ' ')
+
+
+def load(steps_data, p):
+    steps_data.data = list(range(%s))
+
+
+@memoize_step('data')
+def fit(steps_data, p):
+    log('fit-%%s' %% p)
+    steps_data.model = sum(steps_data.data) * p
+    del steps_data.data
+
+
+def check(steps_data, p):
+    assert not hasattr(steps_data, 'data')
+    assert steps_data.model == sum(range(%s)) * p
+
+
+@test_steps(load, fit, check)
+@pytest.mark.parametrize('p', [1, 2])
+def test_suite(test_step, steps_data, p):
+    test_step(steps_data, p)
+"""
+
+
+def _executed(testdir):
+    with open(str(testdir.tmpdir.join('executed.txt'))) as f:
+        return f.read().split()
+
+
+def test_memoize_step(testdir):
+    """The outputs of a memoized step are restored in the next sessions, until the step or its inputs change"""
+    testdir.makepyfile(TEST_MODULE % (10, 10))
+    testdir.inline_run().assertoutcome(passed=6)
+    assert _executed(testdir) == ['fit-1', 'fit-2']
+
+    # nothing changed: the outputs are restored
+    testdir.inline_run().assertoutcome(passed=6)
+    assert _executed(testdir) == ['fit-1', 'fit-2']
+
+    # the cache is bypassed
+    testdir.inline_run('--steps-no-memoize').assertoutcome(passed=6)
+    assert _executed(testdir) == ['fit-1', 'fit-2'] * 2
+
+    # the inputs changed
+    testdir.makepyfile(TEST_MODULE % (20, 20))
+    testdir.inline_run().assertoutcome(passed=6)
+    assert _executed(testdir) == ['fit-1', 'fit-2'] * 3
+
+    # the source code changed
+    testdir.makepyfile((TEST_MODULE % (20, 20)).replace("log('fit-%s' % p)", "log('fit2-%s' % p)"))
+    testdir.inline_run('-k', '1-').assertoutcome(passed=3)
+    assert _executed(testdir) == ['fit-1', 'fit-2'] * 3 + ['fit2-1']
+
+
+MUTATING_MODULE = """
+import pytest
+from pytest_steps import test_steps, memoize_step
+
+
+def load(steps_data):
+    steps_data.items = [1, 2]
+
+
+@memoize_step('items')
+def extend(steps_data):
+    steps_data.items.append(3)
+
+
+def check(steps_data):
+    assert steps_data.items == [1, 2, 3]
+
+
+@test_steps(load, extend, check)
+def test_suite(test_step, steps_data):
+    test_step(steps_data)
+"""
+
+
+def test_memoize_step_in_place(testdir):
+    """The attributes modified in place by a memoized step are restored too"""
+    testdir.makepyfile(MUTATING_MODULE)
+    testdir.inline_run().assertoutcome(passed=3)
+    testdir.inline_run().assertoutcome(passed=3)
+
+
+SETS_MODULE = """
+import pytest
+from pytest_steps import test_steps, memoize_step
+
+
+def load(steps_data):
+    steps_data.names = {'alpha', 'beta', 'gamma', 'delta', 'epsilon'}
+
+
+@memoize_step('names')
+def count(steps_data, options):
+    with open('executed.txt', 'a') as f:
+        f.write('count ')
+    steps_data.n = len(steps_data.names) + len(options)
+
+
+@test_steps(load, count)
+@pytest.mark.parametrize('options', [{'a': {'x', 'y', 'z'}, 'b': 1}])
+def test_suite(test_step, steps_data, options):
+    test_step(steps_data) if test_step is load else test_step(steps_data, options)
+"""
+
+
+def test_memoize_key_hash_randomization(testdir, monkeypatch):
+    """The key does not depend on the order of the items of the sets and dicts, that changes across sessions"""
+    testdir.makepyfile(SETS_MODULE)
+    for seed in ('1', '2', '3'):
+        monkeypatch.setenv('PYTHONHASHSEED', seed)
+        testdir.runpytest_subprocess().assert_outcomes(passed=2)
+    assert _executed(testdir) == ['count']
+
+
+def test_memoize_corrupt_entry(tmpdir):
+    """An entry that can not be loaded is a cache miss, and is removed"""
+    cache = StepsMemoizeCache()
+    cache.reset(str(tmpdir))
+    cache.set('a', [1])
+    tmpdir.join('a.pkl').write_binary(b'corrupt' * 10)
+    assert cache.get('a') is None
+    assert not tmpdir.join('a.pkl').check()
+
+
+def test_size_eviction(tmpdir):
+    """The least recently used entries are removed when the size limit is exceeded"""
+    cache = StepsMemoizeCache()
+    cache.reset(str(tmpdir), maxsize=25000)
+    for i, key in enumerate(('a', 'b')):
+        cache.set(key, bytearray(10000))
+        # make sure that the modification times are different
+        os.utime(str(tmpdir.join(key + '.pkl')), (i, i))
+    # 'a' is used: 'b' is now the least recently used entry
+    cache.get('a')
+    cache.set('c', bytearray(10000))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache._size <= 25000
+
+
+def test_size_overwrite(tmpdir):
+    """The size of a replaced entry is not counted twice"""
+    cache = StepsMemoizeCache()
+    cache.reset(str(tmpdir))
+    cache.set('a', bytearray(10000))
+    cache.set('a', bytearray(10000))
+    assert cache._size == tmpdir.join('a.pkl').size()
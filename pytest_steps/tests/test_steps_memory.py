@@ -0,0 +1,79 @@
+import sys
+
+import pytest
+
+from pytest_steps.steps_memory import StepsMemory
+from pytest_steps.tests.utils import make_raw_module, get_call_reports, assert_disabled
+
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 4), reason="tracemalloc is not available")
+
+RAW_MODULE = 'test_steps_memory_module.py'
+
+
+def test_steps_memory(testdir):
+    """The net and peak memory of each step body are attached to the report"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.inline_run('--steps-memory')
+    memory = get_call_reports(result, 'steps_memory')
+    assert len(memory) == 10
+
+    m = memory['test_gen_mode[2-load]']
+    assert m['step'] == 'test_steps_memory.py::test_gen_mode[load]'
+    assert 2000000 <= m['net'] < 2100000
+    assert m['sites'][0][0] == 'test_steps_memory.py:17'
+    assert 2000000 <= m['sites'][0][1] < 2100000
+
+    m = memory['test_gen_mode[1-fit]']
+    assert abs(m['net']) < 100000
+    assert m['sites'] == [] or m['sites'][0][1] < 100000
+    if sys.version_info >= (3, 9):
+        assert 2000000 <= m['peak'] < 2100000
+
+    assert memory['test_gen_mode[2-evaluate]']['net'] <= -1900000
+    assert 500000 <= memory['test_params_mode[1-step_a]']['net'] < 600000
+
+
+def test_steps_memory_summary(testdir):
+    """The summary shows the steps and the allocation sites of the worst ones"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest('--steps-memory')
+    result.assert_outcomes(passed=10)
+    lines = [
+        "*= steps memory (--steps-memory) =*",
+        "*mean net*max net*max peak*count*step",
+    ]
+    if sys.version_info >= (3, 9):
+        lines += ["*1.9 MiB*      2  test_steps_memory_summary.py::test_gen_mode?load?",
+                  "*1.9 MiB*      2  test_steps_memory_summary.py::test_gen_mode?fit?"]
+    lines += ["top allocation sites of *",
+              "*MiB  test_steps_memory_summary.py:17"]
+    result.stdout.fnmatch_lines(lines)
+
+
+def test_steps_memory_disabled(testdir):
+    """Without the option, nothing is measured"""
+    make_raw_module(testdir, RAW_MODULE)
+    assert_disabled(testdir, 'steps_memory', 'steps memory')
+
+
+def test_steps_memory_xdist(testdir):
+    """The measures are received from the pytest-xdist workers"""
+    pytest.importorskip('xdist')
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest_subprocess('-n', '2', '--steps-memory')
+    result.assert_outcomes(passed=10)
+    result.stdout.fnmatch_lines([
+        "*= steps memory (--steps-memory) =*",
+        "*      2  test_steps_memory_xdist.py::test_params_mode?step_a?",
+    ])
+
+
+def test_steps_memory_registry():
+    registry = StepsMemory()
+    registry.reset(enabled=True)
+    registry.add(dict(step='s', net=10, peak=None, sites=[('a:1', 10)]))
+    registry.add(dict(step='s', net=-4, peak=None, sites=[('a:1', 6), ('a:2', 20)]))
+    registry.add(dict(step='t', net=100, peak=200, sites=[]))
+    assert registry.get_summary(top_sites=1) == [('t', 1, 100, 100, 200, []),
+                                                 ('s', 2, 3, 10, None, [('a:2', 20)])]
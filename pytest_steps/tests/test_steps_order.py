@@ -0,0 +1,79 @@
+import pytest
+
+
+TEST_MODULE = """
+import pytest
+from pytest_steps import test_steps
+
+
+@pytest.mark.parametrize('p', [1, 2])
+@test_steps('a', 'b')
+def test_gen_mode(p):
+    yield
+    yield
+
+
+def test_other():
+    pass
+
+
+def step_a(steps_data):
+    steps_data.p = 'a'
+
+
+def step_b(steps_data):
+    assert steps_data.p == 'a'
+
+
+@test_steps(step_a, step_b)
+@pytest.mark.parametrize('p', [1, 2])
+def test_params_mode(p, test_step, steps_data):
+    test_step(steps_data)
+"""
+
+
+@pytest.mark.parametrize('order, expected', [
+    (None, ['test_gen_mode[a-1]', 'test_gen_mode[a-2]', 'test_gen_mode[b-1]', 'test_gen_mode[b-2]',
+            'test_other',
+            'test_params_mode[1-step_a]', 'test_params_mode[1-step_b]',
+            'test_params_mode[2-step_a]', 'test_params_mode[2-step_b]']),
+    ('depth-first', ['test_gen_mode[a-1]', 'test_gen_mode[b-1]', 'test_gen_mode[a-2]', 'test_gen_mode[b-2]',
+                     'test_other',
+                     'test_params_mode[1-step_a]', 'test_params_mode[1-step_b]',
+                     'test_params_mode[2-step_a]', 'test_params_mode[2-step_b]']),
+    ('breadth-first', ['test_gen_mode[a-1]', 'test_gen_mode[a-2]', 'test_gen_mode[b-1]', 'test_gen_mode[b-2]',
+                       'test_other',
+                       'test_params_mode[1-step_a]', 'test_params_mode[2-step_a]',
+                       'test_params_mode[1-step_b]', 'test_params_mode[2-step_b]']),
+])
+def test_steps_order(testdir, order, expected):
+    """Checks the order of the items with the --steps-order option"""
+    testdir.makepyfile(TEST_MODULE)
+    args = () if order is None else ('--steps-order=%s' % order,)
+    result = testdir.inline_run(*args)
+    result.assertoutcome(passed=9)
+    executed = [r.nodeid.split('::')[-1] for r in result.getreports('pytest_runtest_logreport') if r.when == 'call']
+    assert executed == expected
+
+
+def test_steps_order_instance_keys(testdir, monkeypatch):
+    """The instance keys computed at collection time are reused to order the items and to name the instances"""
+    import pytest_steps.steps_common as steps_common
+    calls = []
+    hash_id = steps_common.get_pytest_node_hash_id
+
+    def _counting_hash_id(pytest_node, *args, **kwargs):
+        calls.append(pytest_node.nodeid)
+        return hash_id(pytest_node, *args, **kwargs)
+
+    monkeypatch.setattr(steps_common, 'get_pytest_node_hash_id', _counting_hash_id)
+    testdir.makepyfile(TEST_MODULE)
+    testdir.inline_run('--steps-order=depth-first').assertoutcome(passed=9)
+    assert len(calls) == len(set(calls)) == 8
+
+    # the keys are stored on the items
+    items, _ = testdir.inline_genitems()
+    n_calls = len(calls)
+    steps_common.order_steps_items(items, 'depth-first')
+    assert len(set(name for _, name in steps_common.iter_steps_instances_names(items))) == 4
+    assert len(calls) == n_calls
@@ -0,0 +1,48 @@
+import pytest
+
+from pytest_steps import test_steps, depends_on
+from pytest_steps.steps_parametrizer import steps_outcomes, StepsOutcomesRegistry
+
+
+def step_a():
+    pass
+
+
+@depends_on(step_a)
+def step_b():
+    pass
+
+
+@test_steps(step_a, step_b)
+@pytest.mark.parametrize('p', [1, 2])
+def test_params_mode(p, test_step):
+    test_step()
+
+
+def test_outcomes_evicted():
+    """Checks that the outcomes have been evicted after the last step of each instance"""
+    assert len(steps_outcomes.executed) == 0
+    assert len(steps_outcomes.succeeded) == 0
+
+
+def test_registry():
+    registry = StepsOutcomesRegistry()
+    assert registry.mark_executed('i', 0)
+    registry.mark_succeeded('i', 0)
+    assert not registry.mark_executed('i', 2)
+    assert registry.all_executed('i', 0b101)
+    assert not registry.all_succeeded('i', 0b101)
+    assert registry.all_succeeded('i', 0b001)
+    registry.evict('i')
+    assert not registry.all_executed('i', 0b001)
+
+
+def test_unknown_dependency():
+    @depends_on(step_a)
+    def step_c():
+        pass
+
+    with pytest.raises(ValueError):
+        @test_steps(step_b, step_c)
+        def test_foo(test_step):
+            pass
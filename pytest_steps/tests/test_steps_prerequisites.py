@@ -0,0 +1,91 @@
+import pytest
+
+
+TEST_MODULE = """
+import pytest
+from pytest_steps import test_steps, depends_on, step_params
+
+
+@pytest.mark.parametrize('p', [1, 2])
+@test_steps('a', 'b', 'c')
+def test_gen(p):
+    yield
+    yield
+    yield
+
+
+def step_a(steps_data):
+    steps_data.a = 1
+
+
+def step_b(steps_data):
+    pass
+
+
+@depends_on(step_a)
+def step_c(steps_data):
+    assert steps_data.a == 1
+
+
+@depends_on(step_c)
+def step_d(steps_data):
+    pass
+
+
+@test_steps(step_a, step_b, step_c, step_d)
+@pytest.mark.parametrize('q', [1, 2])
+def test_params(test_step, steps_data, q):
+    test_step(steps_data)
+
+
+@test_steps('x', step_params('y', t=[1, 2]), 'z')
+def test_branches():
+    params = yield
+    assert params['t'] in (1, 2)
+    yield
+    yield
+"""
+
+
+def _executed(result):
+    return [r.nodeid.split('::')[-1] for r in result.getreports('pytest_runtest_logreport') if r.when == 'call']
+
+
+@pytest.mark.parametrize('args, expected', [
+    (('-k', 'test_gen and c-1'), ['test_gen[a-1]', 'test_gen[b-1]', 'test_gen[c-1]']),
+    (('-k', 'test_params and 2-step_d'), ['test_params[2-step_a]', 'test_params[2-step_c]', 'test_params[2-step_d]']),
+    (('-k', 'z[2]'), ['test_branches[x]', 'test_branches[y[2]]', 'test_branches[z[2]]']),
+    (('test_prerequisites.py::test_gen[b-2]', 'test_prerequisites.py::test_params[1-step_c]'),
+     ['test_gen[a-2]', 'test_gen[b-2]', 'test_params[1-step_a]', 'test_params[1-step_c]']),
+    (('-k', 'test_gen and c-1', '--steps-only-selected'), ['test_gen[c-1]']),
+])
+def test_prerequisites(testdir, args, expected):
+    """The steps needed by the selected steps are executed too"""
+    testdir.makepyfile(test_prerequisites=TEST_MODULE)
+    result = testdir.inline_run(*args)
+    result.assertoutcome(passed=len(expected))
+    assert _executed(result) == expected
+
+
+def test_deselected_count(testdir):
+    """The added steps are not reported as deselected"""
+    testdir.makepyfile(test_prerequisites=TEST_MODULE)
+    result = testdir.runpytest('-k', 'test_gen and c-1')
+    result.stdout.fnmatch_lines(["*collected 19 items / 16 deselected / 3 selected*", "*3 passed, 16 deselected*"])
+
+
+@pytest.mark.parametrize('args', [(), ('-k', 'test_gen and c-1')])
+def test_instance_key_computed_once(testdir, monkeypatch, args):
+    """The instance key of each item is computed only once, whatever the features used at collection time"""
+    import pytest_steps.steps_common as steps_common
+    calls = []
+    hash_id = steps_common.get_pytest_node_hash_id
+
+    def _counting_hash_id(pytest_node, *args, **kwargs):
+        calls.append(pytest_node.nodeid)
+        return hash_id(pytest_node, *args, **kwargs)
+
+    monkeypatch.setattr(steps_common, 'get_pytest_node_hash_id', _counting_hash_id)
+    testdir.makepyfile(test_prerequisites=TEST_MODULE)
+    testdir.inline_run('--collect-only', *args)
+    assert len(calls) == len(set(calls)) == (6 if args[:1] == ('-k',) else 19)
@@ -0,0 +1,63 @@
+import os
+from pstats import Stats
+
+import pytest
+
+from pytest_steps.tests.utils import make_raw_module, assert_disabled
+
+RAW_MODULE = 'test_steps_profile_module.py'
+
+
+def _functions(path):
+    """Returns a dict function name -> number of calls, in a pstats file"""
+    return {func[2]: stat[1] for func, stat in Stats(path).stats.items()}
+
+
+def _check_profiles(testdir, module_name):
+    prof_dir = testdir.tmpdir.join('prof')
+    files = sorted(os.listdir(str(prof_dir)))
+    assert files == ['%s.py%%3A%%3A%s.pstats' % (module_name, name)
+                     for name in ('test_gen_mode[fit]', 'test_gen_mode[load]',
+                                  'test_params_mode[step_a]', 'test_params_mode[step_b]')]
+
+    # one file per step, merged across instances, without the fixtures
+    load = _functions(str(prof_dir.join(files[1])))
+    assert load['load_helper'] == 3
+    assert 'fit_helper' not in load
+    assert 'fixture_helper' not in load
+    fit = _functions(str(prof_dir.join(files[0])))
+    assert fit['fit_helper'] == 3
+    assert 'load_helper' not in fit
+    assert _functions(str(prof_dir.join(files[2])))['load_helper'] == 2
+    assert _functions(str(prof_dir.join(files[3])))['fit_helper'] == 2
+
+
+def test_steps_profile(testdir):
+    """The body of each step is profiled, and the profiles are merged by step"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest('--steps-profile')
+    result.assert_outcomes(passed=10)
+    result.stdout.fnmatch_lines([
+        "*= steps profiles (--steps-profile) =*",
+        "test_steps_profile.py::test_gen_mode?fit?: * function calls in *s, written to *prof*",
+        "*ncalls*tottime*cumtime*function",
+        "*3 *s *s  test_steps_profile.py:*(fit_helper)",
+    ])
+    _check_profiles(testdir, 'test_steps_profile')
+
+
+def test_steps_profile_xdist(testdir):
+    """The profiles of the pytest-xdist workers are merged"""
+    pytest.importorskip('xdist')
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest_subprocess('-n', '2', '--steps-profile')
+    result.assert_outcomes(passed=10)
+    result.stdout.fnmatch_lines(["*3 *s *s  test_steps_profile_xdist.py:*(load_helper)"])
+    _check_profiles(testdir, 'test_steps_profile_xdist')
+
+
+def test_steps_profile_disabled(testdir):
+    """Without the option, nothing is profiled"""
+    make_raw_module(testdir, RAW_MODULE)
+    assert_disabled(testdir, 'steps_profile', 'steps profiles')
+    assert not testdir.tmpdir.join('prof').check()
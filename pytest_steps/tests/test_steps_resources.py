@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pytest
+
+from pytest_steps.steps_resources import StepsResources, RESOURCES_FIELDS
+from pytest_steps.tests.utils import get_call_reports, assert_disabled
+
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="the resource module is not available")
+
+HAS_PROC_IO = os.path.exists('/proc/self/io')
+
+
+TEST_MODULE = """
+import pytest
+from pytest_steps import test_steps
+
+
+@test_steps('write', 'read')
+@pytest.mark.parametrize('p', [1, 2])
+def test_gen_mode(p, tmpdir, results_bag):
+    path = str(tmpdir.join('data.bin'))
+    with open(path, 'wb') as f:
+        f.write(b'0' * 1000000 * p)
+    results_bag.size = 1000000 * p
+    yield
+    with open(path, 'rb') as f:
+        f.read(500000 * p)
+    yield
+
+
+@test_steps('a', 'b')
+@pytest.mark.parametrize('q', [1])
+def test_no_results_bag(q):
+    yield
+    yield
+
+
+def test_synthesis(module_results_df_steps_pivoted):
+    df = module_results_df_steps_pivoted
+    assert (df[('write', 'step_max_rss')].loc[['test_gen_mode[1]', 'test_gen_mode[2]']] > 0).all()
+    if %r:
+        assert df[('write', 'step_write_bytes')]['test_gen_mode[2]'] >= 2000000
+        assert df[('read', 'step_read_bytes')]['test_gen_mode[2]'] >= 1000000
+        assert df[('read', 'step_write_bytes')]['test_gen_mode[2]'] < 1000000
+
+    # the results bag of the test is completed, but it is not created if the test does not use it
+    assert df[('write', 'size')]['test_gen_mode[2]'] == 2000000
+    assert ('b', 'step_minor_faults') not in df.columns
+""" % HAS_PROC_IO
+
+
+def test_steps_resources(testdir):
+    """The resources used by each step body are attached to the report and stored in the results bags"""
+    pytest.importorskip('pytest_harvest')
+    pytest.importorskip('pandas')
+    testdir.makepyfile(TEST_MODULE)
+    result = testdir.inline_run('--steps-resources')
+    result.assertoutcome(passed=7)
+    resources = get_call_reports(result, 'steps_resources')
+    assert len(resources) == 6
+
+    r = resources['test_gen_mode[2-write]']
+    assert r['step'] == 'test_steps_resources.py::test_gen_mode[write]'
+    assert r['max_rss'] > 0
+    assert r['major_faults'] >= 0
+    assert r['voluntary_ctx_switches'] >= 0
+    if HAS_PROC_IO:
+        assert r['write_bytes'] >= 2000000
+    else:
+        assert r['write_bytes'] is None
+
+
+def test_steps_resources_summary(testdir):
+    """The summary shows the resources used by each step, most I/O first"""
+    testdir.makepyfile(TEST_MODULE)
+    result = testdir.runpytest('--steps-resources', '-k', 'not synthesis')
+    result.assert_outcomes(passed=6)
+    lines = ["*= steps resources (--steps-resources) =*",
+             "*max rss*maj flt*min flt*vol cs*invol cs*read*written*count*step"]
+    if HAS_PROC_IO:
+        lines += ["*MiB*      2  test_steps_resources_summary.py::test_gen_mode?write?",
+                  "*MiB*      2  test_steps_resources_summary.py::test_gen_mode?read?"]
+    lines += ["*      1  test_steps_resources_summary.py::test_no_results_bag?b?"]
+    result.stdout.fnmatch_lines(lines)
+
+
+def test_steps_resources_disabled(testdir):
+    """Without the option, nothing is measured"""
+    testdir.makepyfile(TEST_MODULE)
+    assert_disabled(testdir, 'steps_resources', 'steps resources', args=('-k', 'not synthesis'))
+
+
+def test_steps_resources_registry():
+    registry = StepsResources()
+    registry.reset(enabled=True)
+    registry.add(dict(zip(RESOURCES_FIELDS, (100, 1, 10, 2, 3, None, None)), step='s'))
+    registry.add(dict(zip(RESOURCES_FIELDS, (300, 0, 5, 1, 1, None, None)), step='s'))
+    registry.add(dict(zip(RESOURCES_FIELDS, (200, 0, 1, 0, 0, 10, 20)), step='t'))
+    assert registry.get_summary() == [('t', 1, 200, 0, 1, 0, 0, 10, 20),
+                                      ('s', 2, 300, 1, 15, 3, 4, None, None)]
@@ -0,0 +1,83 @@
+import pytest
+
+from pytest_steps.steps_measures import measure_step
+from pytest_steps.steps_timing import _percentile
+from pytest_steps.tests.utils import make_raw_module, get_call_reports, assert_disabled
+
+RAW_MODULE = 'test_steps_timing_module.py'
+
+
+def test_steps_timing(testdir):
+    """The duration of the body of each step is attached to the report"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.inline_run('--steps-durations=0')
+    timings = get_call_reports(result, 'steps_timing')
+    assert len(timings) == 10
+
+    t = timings['test_gen_mode[1-b[2]]']
+    assert t['step'] == 'test_steps_timing.py::test_gen_mode[b]'
+    assert t['instance'] == 'test_steps_timing.py::test_gen_mode[1]'
+    assert t['wall_time'] >= 0.1
+    # the step sleeps
+    assert t['cpu_time'] < t['wall_time']
+    assert timings['test_gen_mode[1-a]']['wall_time'] >= 0.01
+
+    # the failed steps are timed too, without the setup of the fixtures
+    t = timings['test_params_mode[2-step_b]']
+    assert t['step'] == 'test_steps_timing.py::test_params_mode[step_b]'
+    assert t['instance'] == 'test_steps_timing.py::test_params_mode[2]'
+    setup = [r for r in result.getreports('pytest_runtest_logreport')
+             if r.when == 'setup' and r.nodeid.endswith('test_params_mode[2-step_b]')][0]
+    assert t['wall_time'] < setup.duration
+
+
+def test_steps_timing_summary(testdir):
+    """The summary shows the steps and the test instances, slowest first"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest('--steps-durations=2')
+    result.stdout.fnmatch_lines([
+        "*= slowest 2 steps =*",
+        "*total*p50*p95*max*cpu*count*step",
+        "*s *s *s *s *s      4  test_steps_timing_summary.py::test_gen_mode?b?",
+        "*s *s *s *s *s      2  test_steps_timing_summary.py::test_gen_mode?a?",
+        "*= slowest 2 test instances =*",
+        "*total*cpu*steps*test instance",
+        "*s *s      3  test_steps_timing_summary.py::test_gen_mode?2?",
+        "*s *s      3  test_steps_timing_summary.py::test_gen_mode?1?",
+    ])
+    summary = result.stdout.str().split('slowest 2 steps')[1].split('short test summary info')[0]
+    assert 'test_params_mode' not in summary
+
+
+def test_steps_timing_disabled(testdir):
+    """Without the option, nothing is measured and there is no summary"""
+    make_raw_module(testdir, RAW_MODULE)
+    assert_disabled(testdir, 'steps_timing', 'slowest')
+
+
+def test_measure_step_disabled(request):
+    """When no measure is enabled, the same context manager doing nothing is used for all steps"""
+    measures = measure_step(request.node)
+    assert measures is measure_step(None)
+    with measures:
+        pass
+    assert measures.timing is None
+
+
+def test_steps_timing_xdist(testdir):
+    """The durations are received from the pytest-xdist workers"""
+    pytest.importorskip('xdist')
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest_subprocess('-n', '2', '--steps-durations=0')
+    result.stdout.fnmatch_lines([
+        "*= slowest steps =*",
+        "*s      4  test_steps_timing_xdist.py::test_gen_mode?b?",
+        "*s      2  test_steps_timing_xdist.py::test_params_mode?step_a?",
+    ])
+
+
+def test_percentile():
+    assert _percentile([1], .5) == 1
+    assert _percentile([1, 2, 3, 4], .5) == 2
+    assert _percentile(list(range(1, 21)), .95) == 19
+    assert _percentile(list(range(1, 21)), 1) == 20
@@ -0,0 +1,66 @@
+import pytest
+
+from pytest_steps import test_steps, depends_on
+from pytest_steps.steps_parametrizer import _sort_steps
+
+
+def step_a():
+    pass
+
+
+@depends_on(step_a)
+def step_b():
+    pass
+
+
+@depends_on(step_b, step_a)
+def step_c():
+    pass
+
+
+def step_d():
+    pass
+
+
+executed = []
+
+
+@test_steps(step_c, step_d, step_b, step_a)
+def test_reversed_order(test_step):
+    """The steps are declared in any order, they are executed after their dependencies"""
+    executed.append(test_step.__name__)
+    test_step()
+
+
+def test_reversed_order_synthesis():
+    assert executed == ['step_a', 'step_b', 'step_c', 'step_d']
+
+
+def test_sort_is_stable():
+    """Steps that are already correctly ordered are not moved, and repeated steps are kept"""
+    assert _sort_steps([step_d, step_a, step_b, step_c]) == [step_d, step_a, step_b, step_c]
+    assert _sort_steps([step_a, step_b, step_d, step_b]) == [step_a, step_b, step_d, step_b]
+    assert _sort_steps([step_b, step_d, step_a]) == [step_a, step_b, step_d]
+
+
+def test_cycle():
+    """A cycle in the dependencies is detected at decoration time"""
+    def step_x():
+        pass
+
+    @depends_on(step_x)
+    def step_y():
+        pass
+
+    @depends_on(step_y)
+    def step_z():
+        pass
+
+    step_x = depends_on(step_z)(step_x)
+
+    with pytest.raises(ValueError) as exc_info:
+        @test_steps(step_x, step_y, step_z)
+        def test_foo(test_step):
+            pass
+
+    assert "contain a cycle: step_x -> step_z -> step_y -> step_x" in str(exc_info.value)
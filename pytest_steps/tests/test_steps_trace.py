@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from pytest_steps.tests.utils import make_raw_module, assert_disabled
+
+RAW_MODULE = 'test_steps_trace_module.py'
+
+
+def _load_trace(path):
+    with open(path) as f:
+        trace = json.load(f)
+    events = trace['traceEvents']
+    tracks = {e['tid']: e['args']['name'] for e in events if e['name'] == 'thread_name'}
+    processes = {e['pid']: e['args']['name'] for e in events if e['name'] == 'process_name'}
+    spans = [e for e in events if e['ph'] == 'X']
+    return tracks, processes, spans
+
+
+def test_steps_trace(testdir):
+    """Each test instance is a track, and the phases of the steps are spans"""
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest('--steps-trace=traces/trace.json')
+    result.assert_outcomes(passed=5, failed=1, skipped=1)
+
+    tracks, processes, spans = _load_trace(str(testdir.tmpdir.join('traces', 'trace.json')))
+    assert sorted(tracks.values()) == ['test_steps_trace.py::test_gen_mode[1]', 'test_steps_trace.py::test_gen_mode[2]',
+                                       'test_steps_trace.py::test_params_mode[]']
+    assert list(processes.values()) == ['pytest']
+
+    # one span per phase of each step, in order
+    track = [t for t, name in tracks.items() if name == 'test_steps_trace.py::test_gen_mode[1]'][0]
+    track_spans = [s for s in spans if s['tid'] == track]
+    assert [(s['name'], s['cat']) for s in track_spans] == [('setup load', 'setup'), ('load', 'call'),
+                                                            ('teardown load', 'teardown'), ('setup fit', 'setup'),
+                                                            ('fit', 'call'), ('teardown fit', 'teardown')]
+    assert track_spans[0]['args'] == {'step': 'test_steps_trace.py::test_gen_mode[load]', 'outcome': 'passed'}
+    assert track_spans[0]['dur'] >= 50000
+    assert track_spans[4]['dur'] >= 30000
+    assert track_spans[5]['dur'] >= 20000
+    assert track_spans[0]['ts'] + track_spans[0]['dur'] <= track_spans[1]['ts']
+
+    # the failed and skipped steps
+    track = [t for t, name in tracks.items() if name == 'test_steps_trace.py::test_params_mode[]'][0]
+    track_spans = [(s['name'], s['args']['outcome']) for s in spans if s['tid'] == track]
+    assert track_spans == [('setup step_a', 'passed'), ('step_a', 'failed'), ('teardown step_a', 'passed'),
+                           ('step_b (skipped)', 'skipped'), ('teardown step_b', 'passed')]
+
+
+def test_steps_trace_xdist(testdir):
+    """The spans are received from the pytest-xdist workers"""
+    pytest.importorskip('xdist')
+    make_raw_module(testdir, RAW_MODULE)
+    result = testdir.runpytest_subprocess('-n', '2', '--steps-trace=trace.json')
+    result.assert_outcomes(passed=5, failed=1, skipped=1)
+
+    tracks, processes, spans = _load_trace(str(testdir.tmpdir.join('trace.json')))
+    assert len(tracks) == 3
+    assert set(processes.values()) <= {'gw0', 'gw1'}
+    assert len(spans) == 17
+    assert min(s['ts'] for s in spans) == 0
+
+
+def test_steps_trace_disabled(testdir):
+    """Without the option, no trace is written"""
+    make_raw_module(testdir, RAW_MODULE)
+    assert_disabled(testdir, 'steps_trace')
@@ -0,0 +1,99 @@
+import pytest
+
+
+pytest.importorskip('xdist')
+
+
+def test_steps_run_on_same_worker(testdir):
+    """All steps of a test instance should be sent to the same worker, in both modes"""
+    testdir.makepyfile("""
+import os
+import pytest
+from pytest_steps import test_steps
+
+
+@test_steps('a', 'b', 'c', 'd')
+@pytest.mark.parametrize('p', range(10))
+def test_gen_mode(p):
+    pid = os.getpid()
+    yield
+    assert os.getpid() == pid
+    yield
+    assert os.getpid() == pid
+    yield
+    assert os.getpid() == pid
+    yield
+
+
+def step_a(steps_data):
+    steps_data.pid = os.getpid()
+
+
+def step_b(steps_data):
+    assert steps_data.pid == os.getpid()
+
+
+@test_steps(step_a, step_b, step_b, step_b)
+@pytest.mark.parametrize('p', range(10))
+def test_params_mode(p, test_step, steps_data):
+    test_step(steps_data)
+""")
+    result = testdir.runpytest_subprocess('-n', '4')
+    result.assert_outcomes(passed=80)
+
+
+def test_no_steps_items(testdir):
+    """When no step items are collected, the tests are distributed as with `--dist load`"""
+    testdir.makepyfile("""
+import pytest
+
+@pytest.mark.parametrize('p', range(10))
+def test_plain(p):
+    pass
+""")
+    result = testdir.runpytest_subprocess('-n', '2')
+    result.assert_outcomes(passed=10)
+    result.stdout.fnmatch_lines(["pytest-steps: --dist load will be replaced with --dist loadgroup if step items are "
+                                 "collected*"])
+    assert "step items were collected" not in result.stdout.str()
+
+    result = testdir.runpytest_subprocess('-n', '2', '--steps-no-xdist-group')
+    result.assert_outcomes(passed=10)
+    assert "pytest-steps" not in result.stdout.str()
+
+
+def test_not_collected_steps_same_worker(testdir):
+    """The steps that are added because a step with parameters was given in the command line are in the same group.
+    This relies on pytest-xdist suffixing their node ids with the group, see `add_xdist_group_suffix` (pytest-xdist
+    3.x)"""
+    testdir.makepyfile("""
+import os
+import pytest
+from pytest_steps import test_steps
+
+
+@test_steps('a', 'b', 'c')
+@pytest.mark.parametrize('p', range(10))
+def test_gen_mode(p):
+    pid = os.getpid()
+    yield
+    assert os.getpid() == pid
+    yield
+    assert os.getpid() == pid
+    yield
+""")
+    result = testdir.runpytest_subprocess('-n', '2', '-v',
+                                          'test_not_collected_steps_same_worker.py::test_gen_mode[3-c]')
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines(["*step items were collected, using --dist loadgroup instead of --dist load*"])
+    for step in 'abc':
+        result.stdout.fnmatch_lines(["*PASSED test_not_collected_steps_same_worker.py::test_gen_mode?3-%s?"
+                                     "@test_not_collected_steps_same_worker.py::test_gen_mode#0*" % step])
+
+
+def test_is_steps_nodeid():
+    """The node ids of the steps suffixed with the group of their test instance are recognized"""
+    from pytest_steps.steps_xdist import is_steps_nodeid
+    assert is_steps_nodeid('test_a.py::test_suite[step_b-1]@test_a.py::test_suite#0')
+    assert not is_steps_nodeid('test_a.py::test_suite[step_b-1]')
+    assert not is_steps_nodeid('test_a.py::test_suite[1]@my_group')
@@ -0,0 +1,64 @@
+"""
+Helpers shared by the meta-tests that run a test module of the 'tests_raw' folder with the options of the plugin.
+"""
+from os.path import join, dirname, pardir
+
+TESTS_RAW_DIR = join(dirname(__file__), pardir, 'tests_raw')
+
+
+def make_raw_module(testdir, file_name):
+    """
+    Creates in `testdir` a test module with the contents of file `file_name` of the 'tests_raw' folder. As usual with
+    `testdir`, the module is named after the current test.
+
+    :param testdir:
+    :param file_name:
+    :return:
+    """
+    with open(join(TESTS_RAW_DIR, file_name)) as f:
+        return testdir.makepyfile(f.read())
+
+
+def get_call_reports(result, attr=None):
+    """
+    Returns a dict item name -> report of the 'call' phase of the item, in the results of `testdir.inline_run`. If
+    `attr` is provided the value of this attribute of the reports is returned instead, for the reports that have it.
+
+    :param result:
+    :param attr:
+    :return:
+    """
+    reports = {r.nodeid.split('::')[-1]: r for r in result.getreports('pytest_runtest_logreport') if r.when == 'call'}
+    if attr is None:
+        return reports
+    return {name: getattr(r, attr) for name, r in reports.items() if hasattr(r, attr)}
+
+
+def get_outcomes(result):
+    """
+    Returns a dict item name -> outcome, in the results of `testdir.inline_run`. The outcome is the one of the 'call'
+    phase, or of the phase that did not pass (for example the setup of a skipped item).
+
+    :param result:
+    :return:
+    """
+    return {r.nodeid.split('::')[-1]: r.outcome for r in result.getreports('pytest_runtest_logreport')
+            if r.when == 'call' or not r.passed}
+
+
+def assert_disabled(testdir, report_attr, summary_title=None, args=()):
+    """
+    Checks that when pytest is run on the module of `testdir` without the option of a measure, the reports do not have
+    the `report_attr` attribute and the terminal summary does not contain `summary_title`.
+
+    :param testdir:
+    :param report_attr: the attribute of the test reports set by the option
+    :param summary_title: the title of the terminal summary written by the option, if any
+    :param args: other command line arguments
+    :return:
+    """
+    result = testdir.inline_run(*args)
+    assert all(not hasattr(r, report_attr) for r in result.getreports('pytest_runtest_logreport'))
+    if summary_title is not None:
+        result = testdir.runpytest(*args)
+        assert summary_title not in result.stdout.str()
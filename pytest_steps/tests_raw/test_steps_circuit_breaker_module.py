@@ -0,0 +1,49 @@
+# META
+# {'passed': 11, 'skipped': 14, 'failed': 14}
+# END META
+import pytest
+from pytest_steps import test_steps, step_params, depends_on
+
+
+@pytest.mark.parametrize('p', range(4))
+@test_steps('a', 'b', 'c')
+def test_gen_mode(p):
+    yield
+    assert False
+    yield
+    yield
+
+
+def step_a(steps_data):
+    assert False
+
+
+def step_b(steps_data):
+    pass
+
+
+@depends_on(step_a)
+def step_c(steps_data):
+    pass
+
+
+@test_steps(step_a, step_b, step_c)
+@pytest.mark.parametrize('p', range(4))
+def test_params_mode(p, test_step, steps_data):
+    test_step(steps_data)
+
+
+@test_steps('a', step_params('b', q=[1, 2, 3]), 'c')
+@pytest.mark.parametrize('p', range(2))
+def test_gen_branches(p):
+    params = yield
+    assert params['q'] == 0
+    yield
+    yield
+
+
+def test_synthesis():
+    # all monitors and holders were evicted
+    assert len(getattr(test_gen_mode, '__steps_monitors__')) == 0
+    assert len(getattr(test_gen_branches, '__steps_monitors__')) == 0
+    assert len(getattr(test_params_mode, '__steps_holders__')) == 0
@@ -0,0 +1,37 @@
+# META
+# {'passed': 10, 'skipped': 0, 'failed': 0}
+# END META
+import pytest
+from pytest_steps import test_steps
+
+
+@pytest.fixture
+def big_fixture():
+    # the setup of the fixtures is not measured
+    return bytearray(3000000)
+
+
+@test_steps('load', 'fit', 'evaluate')
+@pytest.mark.parametrize('p', [1, 2])
+def test_gen_mode(p, big_fixture):
+    data = bytearray(1000000 * p)
+    yield
+    tmp = bytearray(2000000)
+    del tmp
+    yield
+    del data
+    yield
+
+
+def step_a(steps_data):
+    steps_data.data = bytearray(500000)
+
+
+def step_b(steps_data):
+    pass
+
+
+@test_steps(step_a, step_b)
+@pytest.mark.parametrize('p', [1, 2])
+def test_params_mode(p, test_step, steps_data, big_fixture):
+    test_step(steps_data)
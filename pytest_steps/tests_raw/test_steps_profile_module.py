@@ -0,0 +1,46 @@
+# META
+# {'passed': 10, 'skipped': 0, 'failed': 0}
+# END META
+import pytest
+from pytest_steps import test_steps
+
+
+def fixture_helper():
+    return 1
+
+
+@pytest.fixture
+def my_fixture():
+    # the setup of the fixtures is not profiled
+    return fixture_helper()
+
+
+def load_helper(p):
+    return list(range(p))
+
+
+def fit_helper(data):
+    return sum(data)
+
+
+@test_steps('load', 'fit')
+@pytest.mark.parametrize('p', [1, 2, 3])
+def test_gen_mode(p, my_fixture):
+    data = load_helper(p)
+    yield
+    fit_helper(data)
+    yield
+
+
+def step_a(steps_data):
+    steps_data.data = load_helper(2)
+
+
+def step_b(steps_data):
+    fit_helper(steps_data.data)
+
+
+@test_steps(step_a, step_b)
+@pytest.mark.parametrize('p', [1, 2])
+def test_params_mode(p, test_step, steps_data, my_fixture):
+    test_step(steps_data)
@@ -0,0 +1,35 @@
+# META
+# {'passed': 8, 'skipped': 0, 'failed': 2}
+# END META
+import time
+import pytest
+from pytest_steps import test_steps, step_params
+
+
+@pytest.fixture
+def slow_fixture():
+    # the setup of the fixtures is not part of the duration of the steps
+    time.sleep(0.1)
+
+
+@test_steps('a', step_params('b', q=[1, 2]))
+@pytest.mark.parametrize('p', [1, 2])
+def test_gen_mode(p, slow_fixture):
+    time.sleep(0.01 * p)
+    params = yield
+    time.sleep(0.05 * params['q'])
+    yield
+
+
+def step_a(steps_data):
+    time.sleep(0.01)
+
+
+def step_b(steps_data):
+    assert False
+
+
+@test_steps(step_a, step_b)
+@pytest.mark.parametrize('p', [1, 2])
+def test_params_mode(p, test_step, steps_data, slow_fixture):
+    test_step(steps_data)
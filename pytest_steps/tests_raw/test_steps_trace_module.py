@@ -0,0 +1,40 @@
+# META
+# {'passed': 5, 'skipped': 1, 'failed': 1}
+# END META
+import time
+import pytest
+from pytest_steps import test_steps, depends_on
+
+
+@pytest.fixture
+def slow_fixture():
+    time.sleep(0.05)
+    yield
+    time.sleep(0.02)
+
+
+@test_steps('load', 'fit')
+@pytest.mark.parametrize('p', [1, 2])
+def test_gen_mode(p, slow_fixture):
+    time.sleep(0.01)
+    yield
+    time.sleep(0.03)
+    yield
+
+
+def step_a(steps_data):
+    assert False
+
+
+@depends_on(step_a)
+def step_b(steps_data):
+    pass
+
+
+@test_steps(step_a, step_b)
+def test_params_mode(test_step, steps_data):
+    test_step(steps_data)
+
+
+def test_not_steps():
+    pass